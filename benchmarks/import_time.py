@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时基准：每个目标在全新子进程中导入多次，报告耗时中位数和被连带加载的重量级依赖
+
+用法（仓库根目录）：
+    python benchmarks/import_time.py --repeat 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+
+# 纯计算任务不应加载的依赖
+HEAVY_MODULES = ('matplotlib', 'plotly', 'sqlalchemy', 'dynaconf', 'clickhouse_driver', 'oss2', 'minio', 'aliyun')
+
+# {名称: (导入语句, PYTHONPATH)}
+TARGETS = {
+    'cpi_calculator': ("import cpi_calculator", [SRC]),
+    'cpi_calculator.calculator': ("from cpi_calculator.calculator import PandasCPICalculator", [SRC]),
+    'cpi_calculator_ch.price_index': (
+        "from analysis.price_index import PriceIndexCalculator",
+        [SRC / "cpi_calculator_ch", SRC]
+    ),
+    'cpi_calculator_ch.data_cleaning': (
+        "from processing.data_cleaning import DataCleaner",
+        [SRC / "cpi_calculator_ch", SRC]
+    ),
+}
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def measure(statement: str, python_path, repeat: int) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(str(p) for p in python_path))
+    code = _PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        'median_ms': round(statistics.median(r['ms'] for r in runs), 1),
+        'min_ms': round(min(r['ms'] for r in runs), 1),
+        'heavy_modules': runs[-1]['heavy'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量各入口模块的冷启动导入耗时")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help="以 JSON 输出")
+    args = parser.parse_args(argv)
+
+    results = {name: measure(statement, path, args.repeat) for name, (statement, path) in TARGETS.items()}
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return results
+
+    print(f"{'target':<34}{'median ms':>10}{'min ms':>10}  heavy modules")
+    for name, r in results.items():
+        print(f"{name:<34}{r['median_ms']:>10}{r['min_ms']:>10}  {', '.join(r['heavy_modules']) or '-'}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
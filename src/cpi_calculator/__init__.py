@@ -1,12 +1,39 @@
 # -*- coding: utf-8 -*-
-from .config import init_logging  # 显式导出函数
-__all__ = ['init_logging', 'config', 'loader.py', 'calculator', 'visualizer']
+"""
+包级对象按需导入（PEP 562）：import cpi_calculator 不再加载 dynaconf、matplotlib、
+clickhouse_driver 等重量级依赖，首次访问对应属性时才导入所在子模块
+"""
+import importlib
+
+# {导出名: 所在子模块}
+_LAZY_EXPORTS = {
+    'init_logging': '.config',
+    'settings': '.config',
+    'PandasCPICalculator': '.calculator',
+    'CategoryLogLevels': '.log_levels',
+    'CategoryTree': '.category_tree',
+    'ScenarioEvaluator': '.scenarios',
+    'create_calculator': '.engines',
+    'Visualizer': '.visualizer',
+    'SecureOSSDataLoader': '.loader',
+}
+
+__all__ = list(_LAZY_EXPORTS) + ['load_config']
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value  # 缓存，后续访问不再经过 __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
-# 在 config.py 末尾添加
-__all__ = ['init_logging', 'settings']  # 明确导出对象
 
 # 添加load_config兼容函数（如果主程序需要）
 def load_config():
     """兼容旧版调用的包装函数"""
-    return settings
-
+    return __getattr__('settings')
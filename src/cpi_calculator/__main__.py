@@ -1,58 +1,80 @@
 # -*- coding: utf-8 -*-
 """
 CPI 计算器主程序 - 实现数据加载、计算、可视化全流程
+
+    python -m cpi_calculator --data-dir data --start-date 2025-05-16 --end-date 2026-05-15 --profile sample
+
+命令行未指定的报告路径和绘图引擎从配置读取，配置只在需要时才加载
 """
+import argparse
 import logging
-from config import settings
-from loader import SecureOSSDataLoader
-from calculator import CPICalculator
-from visualizer import Visualizer
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from .calculator import PandasCPICalculator
+from .profiling import PROFILE_MODES, StageProfiler
+from .visualizer import Visualizer
 
 # 初始化日志
 LOGGER = logging.getLogger(__name__)
 
-def main():
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent.parent / 'data'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CPI 计算器：数据加载 → 指数计算 → 可视化")
+    parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR, help="数据目录")
+    parser.add_argument('--start-date', type=date.fromisoformat, required=True, help="基期日期 YYYY-MM-DD")
+    parser.add_argument('--end-date', type=date.fromisoformat, required=True, help="报告期末日期 YYYY-MM-DD")
+    parser.add_argument('--output', default=None, help="报告路径，缺省读取配置 OUTPUT.REPORT")
+    parser.add_argument('--plot-engine', default=None, help="绘图引擎，缺省读取配置 OUTPUT.PLOT_ENGINE")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help="分阶段剖析：cprofile（确定性）或 sample（采样调用栈）")
+    parser.add_argument('--profile-dir', default='profile', help="剖析报告输出目录")
+    parser.add_argument('--sample-interval', type=float, default=0.005, help="sample 模式的采样间隔（秒）")
+    return parser.parse_args(argv)
+
+
+def _setting(key: str, default):
+    """读取配置项；只有命令行未指定时才调用，届时才加载 dynaconf"""
+    from .config import settings
+
+    return settings.get(key, default)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = StageProfiler(args.profile, args.profile_dir, sample_interval=args.sample_interval)
     try:
-        # 1. 初始化配置
-        LOGGER.info("CPI 计算器启动，运行模式：%s", settings.ENV_FOR_DYNACONF)
-
-        # 2. 数据加载
-        loader = SecureOSSDataLoader(
-            oss_conf={
-                'endpoint': settings.OSS.ENDPOINT,
-                'bucket': settings.OSS.BUCKET,
-                'sts_role_arn': settings.OSS.get('STS_ROLE_ARN', '')
-            },
-            ch_conf={
-                'host': settings.DATABASE.HOST,
-                'port': settings.DATABASE.PORT,
-                'user': settings.DATABASE.USER,
-                'password': settings.DATABASE.get('PASSWORD', '')
-            }
-        )
-
-        # 加载价格数据和分类映射
-        start_date = '2023-01-01'
-        end_date = '2025-01-31'
-        price_data = loader.load_price_data(start_date, end_date)
-        category_mapping = loader.load_category_mapping()
-
-        # 3. 核心计算
-        calculator = CPICalculator(db_config=settings.DATABASE)
-        cpi_result = calculator.compute_cpi(price_data, category_mapping, start_date, end_date)
-
-        # 4. 结果输出
+        # 1. 数据加载：分类、商品表和区间内的全部价格文件，价格面板在这一阶段建好
+        with profiler.stage('load'):
+            calculator = PandasCPICalculator(args.data_dir)
+            price_panel = calculator.load_prices(args.start_date, args.end_date)
+
+        # 2. 核心计算：只做指数运算，不再读取文件
+        with profiler.stage('compute'):
+            cpi_series = calculator.compute_daily_cpi(args.start_date, args.end_date, price_panel=price_panel)
+
+        # 3. 结果输出
         LOGGER.debug("生成可视化报告...")
-        visualizer = Visualizer(engine=settings.OUTPUT.PLOT_ENGINE)
-        output_path = settings.OUTPUT.REPORT.format(date=end_date)
-        visualizer.plot_cpi_trend(cpi_result, output_path)
+        plot_engine = args.plot_engine or _setting('OUTPUT.PLOT_ENGINE', 'matplotlib')
+        output_path = args.output or _setting('OUTPUT.REPORT', './reports/daily_cpi_{date}.png')
+        output_path = output_path.format(date=args.end_date.isoformat())
+        with profiler.stage('visualize'):
+            cpi_df = pd.DataFrame({'date': cpi_series.index, 'cpi_index': cpi_series.to_numpy()})
+            Visualizer(engine=plot_engine).plot_cpi_trend(cpi_df, output_path)
 
-        LOGGER.info("处理成功 | 报告路径: %s | 可视化引擎: %s",
-                    output_path, settings.OUTPUT.PLOT_ENGINE)
+        LOGGER.info("处理成功 | 报告路径: %s | 可视化引擎: %s", output_path, plot_engine)
+        return cpi_series
 
-    except Exception as e:
+    except Exception:
         LOGGER.exception("流程异常终止")
         raise
+    finally:
+        # 失败时也写出已完成阶段的剖析结果，便于定位
+        profiler.write_report()
 
 
 if __name__ == '__main__':
@@ -1,92 +1,125 @@
-# import clickhouse_driver
-# import numpy as np
-# from sqlalchemy import create_engine
-# from sqlalchemy.orm import sessionmaker
-# from .schemas import Category, Price
-# from .config import settings
-#
-# class CPICalculator:
-#     def __init__(self, db_config):
-#         self.db_config = db_config
-#         self.clickhouse_client = self._connect_clickhouse()
-#         self.sqlalchemy_engine = self._connect_sqlalchemy()
-#         self.Session = sessionmaker(bind=self.sqlalchemy_engine)
-#
-#     def _connect_clickhouse(self):
-#         """连接到 ClickHouse 数据库"""
-#         return clickhouse_driver.Client(
-#             host=self.db_config['CLICKHOUSE_HOST'],
-#             port=self.db_config['CLICKHOUSE_PORT'],
-#             user=self.db_config['CLICKHOUSE_USER'],
-#             password=self.db_config['CLICKHOUSE_PASSWORD']
-#         )
-#
-#     def _connect_sqlalchemy(self):
-#         """连接到 SQLAlchemy 引擎"""
-#         return create_engine(self.db_config['SQLALCHEMY_DATABASE_URI'])
-#
-#     def compute_cpi(self, start_date, end_date):
-#         """计算指定日期范围内的消费者价格指数 (CPI)"""
-#         # 使用 ClickHouse SQL 查询计算 CPI
-#         sql_query = f"""
-#         WITH
-#         -- 获取所有叶子类别的ID和权重（没有子类别的类别）
-#         leaf_categories AS (
-#             SELECT id, weight
-#             FROM category
-#             WHERE NOT EXISTS (
-#                 SELECT 1
-#                 FROM category c2
-#                 WHERE c2.parent = category.id
-#             )
-#         ),
-#         -- 获取基期和报告期的价格（假设基期为上月，报告期为本月）
-#         price_data AS (
-#             SELECT
-#                 product_id,
-#                 MAX(CASE WHEN date = '{start_date}' THEN price END) AS base_price,
-#                 MAX(CASE WHEN date = '{end_date}' THEN price END) AS report_price
-#             FROM price
-#             WHERE date IN ('{start_date}', '{end_date}')  -- 替换为实际日期
-#             GROUP BY product_id
-#         ),
-#         -- 计算每个叶子类别的价格指数
-#         category_cpi AS (
-#             SELECT
-#                 p.category_id,
-#                 EXP(AVG(LN(pd.report_price / pd.base_price))) AS price_index  -- 几何平均数
-#             FROM product p
-#             JOIN price_data pd ON p.id = pd.product_id
-#             JOIN leaf_categories lc ON p.category_id = lc.id
-#             WHERE pd.base_price > 0  -- 确保分母不为零
-#               AND pd.report_price IS NOT NULL
-#             GROUP BY p.category_id
-#         )
-#         -- 计算加权CPI
-#         SELECT
-#             SUM(cc.price_index * lc.weight) AS CPI
-#         FROM category_cpi cc
-#         JOIN leaf_categories lc ON cc.category_id = lc.id;
-#         """
-#
-#         result = self._execute_clickhouse_query(sql_query)
-#         return result[0][0] if result else None
-#
-#     def _execute_clickhouse_query(self, query):
-#         """执行 ClickHouse 查询"""
-#         return self.clickhouse_client.execute(query)
-#
+# 原基于 ClickHouse 的 CPICalculator 已移到 sql_engine.py：同一段 SQL 在嵌入式 DuckDB 中直接查询 data/ 下的文件，
+# 也可原样提交给 ClickHouse；各引擎通过 engines.create_calculator 按配置选择
 
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Optional, Sequence, Tuple
 from datetime import date
-import matplotlib.pyplot as plt
+import hashlib
+import warnings
 
-class PandasCPICalculator:
-    def __init__(self, data_dir: Path):
+# 紧凑矩阵向前填充时每块的单元格数：临时的 int32 下标和 float32 结果都只按块分配
+FFILL_BLOCK_CELLS = 1 << 22
+
+
+def category_segments(category_codes: np.ndarray, n_categories: int) -> Tuple[np.ndarray, list]:
+    """按类别编号稳定排序后的行顺序，以及每个类别在排序后矩阵中的 (起始行, 结束行) 区间"""
+    order = np.argsort(category_codes, kind='stable')
+    bounds = np.searchsorted(category_codes[order], np.arange(n_categories + 1))
+    return order, [(int(bounds[k]), int(bounds[k + 1])) for k in range(n_categories)]
+
+
+def category_geo_means(prices: np.ndarray, segments: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """
+    计算每个行区间（一个类别）的每日几何平均价格比
+
+    参数:
+        prices: 商品 × 日期 的价格矩阵，第 0 列为基期（float32 矩阵按区间升为 float64 计算）
+        segments: 每个类别在矩阵中的行区间
+    返回:
+        类别 × 日期 的指数矩阵；基期价格无效（<= 0 或缺失）或当日无价格的商品不参与，无有效商品时为 NaN
+    """
+    result = np.full((len(segments), prices.shape[1]), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全为 NaN 的列 nanmean 会告警
+        for k, (start, stop) in enumerate(segments):
+            block = prices[start:stop].astype(np.float64, copy=False)
+            base = block[:, :1]
+            log_ratios = np.where(base > 0, np.log(block / base), np.nan)
+            result[k] = np.exp(np.nanmean(log_ratios, axis=0))
+    return result
+
+
+def leaf_categories(categories: pd.DataFrame) -> pd.DataFrame:
+    """叶子类别（没有子类别的分类）的 id 和权重"""
+    return categories[~categories['category_id'].isin(categories['parent'].dropna())][['category_id', 'weight']]
+
+
+def weighted_cpi(leaf_index: pd.DataFrame, weights: pd.Series) -> pd.Series:
+    """
+    叶子指数矩阵按权重加权求和为每日 CPI，当日无有效数据（NaN）的类别不参与；
+    列先按 weights 的顺序排列，各引擎、各分片的求和顺序一致，结果逐位相同
+    """
+    cpi_series = leaf_index.reindex(columns=weights.index).mul(weights, axis=1).sum(axis=1)
+    return cpi_series.astype('float64').round(4)
+
+
+class LeafIndexCalculator:
+    """
+    各计算引擎的公共部分：子类提供分类表 categories 和 compute_leaf_index_matrix，
+    叶子权重、每日 CPI 和各层级指数都由这两者派生
+    """
+
+    def _leaf_categories(self) -> pd.DataFrame:
+        """叶子类别（没有子类别的分类）的 id 和权重"""
+        return leaf_categories(self.categories)
+
+    def leaf_weights(self) -> pd.Series:
+        """以 category_id 为索引的叶子类别权重"""
+        return self._leaf_categories().set_index('category_id')['weight']
+
+    def _leaf_index(self, start_date: date, end_date: date) -> pd.DataFrame:
+        return self.compute_leaf_index_matrix(start_date, end_date)
+
+    def compute_daily_cpi(self, start_date: date, end_date: date) -> pd.Series:
+        """计算每日CPI数组（相对基期的累计变化）"""
+        return weighted_cpi(self._leaf_index(start_date, end_date), self.leaf_weights())
+
+    def compute_hierarchy_cpi(self, start_date: date, end_date: date) -> pd.DataFrame:
+        """
+        计算所有层级分类的每日指数（行为日期、列为 category_id，按分类树 DFS 顺序排列）
+
+        叶子类别为类内几何平均指数；上级分类为其下叶子按叶子权重的加权平均，
+        所有层级由同一个叶子指数矩阵经 CategoryTree.rollup 一次汇总得到
+        """
+        from .category_tree import CategoryTree
+
+        return CategoryTree(self.categories).rollup(self._leaf_index(start_date, end_date))
+
+
+class PandasCPICalculator(LeafIndexCalculator):
+    def __init__(self, data_dir: Path, price_format: str = 'daily', cache_dir: Optional[Path] = None,
+                 workers: int = 1, category_ids: Optional[Sequence[int]] = None, panel: str = 'dense',
+                 compact: bool = False):
+        """
+        参数:
+            data_dir: 数据目录
+            price_format: 价格数据格式
+                - 'daily': daily_price/daily_prices_YYYYMMDD.csv 每日全量快照
+                - 'changes': price_changes.csv 变更日志 (product_id, effective_date, price)，
+                  价格在下一条记录前一直有效，price 为空表示商品出样
+            cache_dir: 叶子指数矩阵的缓存目录；数据文件未变化时直接读取缓存，不再扫描价格
+            workers: 叶子指数计算的进程数；大于 1 时按类别分区并行，价格矩阵经内存映射文件共享
+            category_ids: 只计算这些叶子类别（分布式计算中的一个分片），价格数据读入时即按商品过滤
+            panel: 价格面板结构
+                - 'dense': 商品 × 日期 的 float64 透视表（可配合 workers 并行）
+                - 'sparse': 按商品的恒定价格区段（int32 日期偏移、float32 价格），
+                  每日快照逐个文件并入区段，长时间窗口下峰值内存远低于稠密表，见 sparse_panel.py
+            compact: 紧凑内存模式：product_id 读为 int64 后映射为连续的 int32 商品编码，价格读为 float32，
+                日期以 int32 日偏移代替 date 对象，以数组下标代替透视和 merge，每条价格记录约 12 字节
+        """
+        if price_format not in ('daily', 'changes'):
+            raise ValueError(f"Unsupported price format: {price_format}")
+        if panel not in ('dense', 'sparse'):
+            raise ValueError(f"Unsupported panel: {panel}")
         self.data_dir = data_dir
+        self.price_format = price_format
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.workers = workers
+        self.panel = panel
+        self.compact = compact
+        self.category_ids = None if category_ids is None else [int(c) for c in category_ids]
         self._load_data()
 
     def _load_data(self) -> None:
@@ -94,106 +127,371 @@ class PandasCPICalculator:
         # 分类数据：只需要id, parent和weight
         self.categories = pd.read_csv(
             self.data_dir / 'categories.csv',
-            usecols=['category_id', 'parent', 'weight']
+            usecols=['category_id', 'parent', 'weight'],
+            dtype={'category_id': 'int32'} if self.compact else None
         )
 
         # 产品数据：只需要id和category_id
         # （价格从daily_price获取，不需要products中的price）
         self.products = pd.read_csv(
             self.data_dir / 'products.csv',
-            usecols=['product_id', 'category_id']
+            usecols=['product_id', 'category_id'],
+            dtype={'product_id': 'int64', 'category_id': 'int32'} if self.compact else None
         )
 
+        # 分片模式：只保留本分片类别的商品，价格文件读入后立即按这些商品过滤
+        self._shard_products = None
+        if self.category_ids is not None:
+            self.products = self.products[self.products['category_id'].isin(self.category_ids)]
+            self._shard_products = pd.Index(self.products['product_id'].unique())
+
+        # 紧凑模式：商品按出现顺序编码为 0..n-1（int32），编码即价格矩阵的行号；
+        # 原始 product_id 可能超出 int32（如 12 位商品编号），只在读入时用 int64 比对一次
+        if self.compact:
+            self.product_index = pd.Index(self.products['product_id'].unique())
+            self.products = self.products.assign(
+                product_code=self.product_index.get_indexer(self.products['product_id']).astype(np.int32)
+            )
+
         # 价格数据目录
         self.prices_dir = self.data_dir / 'daily_price'
+        self.changes_path = self.data_dir / 'price_changes.csv'
 
-    def _load_prices_for_dates(self, dates: Tuple[date, date]) -> pd.DataFrame:
-        """加载指定日期的价格数据（自动添加日期列）"""
-        price_dfs = []
+    def _load_prices_for_dates(self, dates: Tuple[date, date], day_offsets: bool = False) -> pd.DataFrame:
+        """
+        加载指定日期的价格数据（自动添加日期列）
+        day_offsets=True 时不加 date 列，改为相对首个日期的 int32 日偏移列 day；
+        紧凑模式下同时把 product_id 换成 int32 的 product_code
+        """
+        return pd.concat(self._iter_daily_prices(dates, day_offsets), ignore_index=day_offsets)
 
-        for target_date in dates:
+    def _iter_daily_prices(self, dates: Tuple[date, date], day_offsets: bool = False) -> Iterator[pd.DataFrame]:
+        """逐日读取价格快照，每次只产出一天的数据，列与 _load_prices_for_dates 相同"""
+        for offset, target_date in enumerate(dates):
             file_name = f"daily_prices_{target_date.strftime('%Y%m%d')}.csv"
             file_path = self.prices_dir / file_name
 
             if not file_path.exists():
                 raise FileNotFoundError(f"Price file missing: {file_path}")
 
-            df = pd.read_csv(file_path, usecols=['product_id', 'price'])
-            df['date'] = target_date
-            price_dfs.append(df)
+            df = pd.read_csv(file_path, usecols=['product_id', 'price'], dtype=self._price_dtypes())
+            if self._shard_products is not None:
+                df = df[df['product_id'].isin(self._shard_products)]
+            if day_offsets:
+                if self.compact:
+                    df = self._encode_products(df)
+                df['day'] = np.int32(offset)
+            else:
+                df['date'] = target_date
+            yield df
 
-        return pd.concat(price_dfs)
+    def _price_dtypes(self) -> Optional[dict]:
+        """紧凑模式下价格文件的读取类型"""
+        return {'product_id': 'int64', 'price': 'float32'} if self.compact else None
 
-    def compute_daily_cpi(self, start_date: date, end_date: date) -> pd.Series:
-        """计算每日CPI数组（相对基期的累计变化）"""
+    def _encode_products(self, df: pd.DataFrame) -> pd.DataFrame:
+        """product_id 换成 int32 的 product_code（首列），不在商品表中的记录不参与计算，直接丢弃"""
+        codes = self.product_index.get_indexer(df['product_id'])
+        known = codes >= 0
+        encoded = df.loc[known].drop(columns='product_id')
+        encoded.insert(0, 'product_code', codes[known].astype(np.int32))
+        return encoded
+
+    @property
+    def _product_key(self) -> str:
+        """价格观测中标识商品的列：紧凑模式为 product_code，否则为 product_id"""
+        return 'product_code' if self.compact else 'product_id'
+
+    def _load_price_changes(self, end_date: date) -> pd.DataFrame:
+        """加载截至 end_date 的价格变更日志"""
+        if not self.changes_path.exists():
+            raise FileNotFoundError(f"Price change log missing: {self.changes_path}")
+
+        changes = pd.read_csv(
+            self.changes_path,
+            usecols=['product_id', 'effective_date', 'price'],
+            dtype=self._price_dtypes()
+        )
+        if self._shard_products is not None:
+            changes = changes[changes['product_id'].isin(self._shard_products)]
+        changes['effective_date'] = pd.to_datetime(changes['effective_date']).dt.date
+        return changes[changes['effective_date'] <= end_date]
+
+    def _build_price_pivot(self, all_dates) -> pd.DataFrame:
+        """
+        构建 商品 × 日期 的价格透视表，缺失日期沿用此前最后一个价格
+
+        变更日志格式下按日期顺序扫描：基期之前（含基期）的记录折叠为每个商品的期初状态，
+        区间内的记录按生效日落到对应列，再向前填充；出样记录（空价格）不覆盖已有价格，
+        与全量快照透视后 ffill 的结果一致
+        """
+        if self.price_format == 'daily':
+            price_data = self._load_prices_for_dates(tuple(all_dates))
+            return price_data.pivot_table(
+                index='product_id',
+                columns='date',
+                values='price',
+                aggfunc='first'
+            ).ffill(axis=1)  # 向前填充缺失价格
+
+        events = self._fold_price_changes(all_dates)
+        price_pivot = events.pivot(index='product_id', columns='effective_date', values='price')
+        return price_pivot.reindex(columns=all_dates).ffill(axis=1)
+
+    def _fold_price_changes(self, all_dates) -> pd.DataFrame:
+        """变更日志中与区间相关的记录：基期及以前折叠为期初状态，区间内每个商品每天保留最后一条"""
+        start_date = all_dates[0]
+        changes = self._load_price_changes(all_dates[-1]).sort_values('effective_date', kind='stable')
+
+        # 期初状态：每个商品在基期当天及以前的最后一条记录，出样商品不进入基期
+        opening = changes[changes['effective_date'] <= start_date].drop_duplicates('product_id', keep='last')
+        opening = opening.assign(effective_date=start_date)
+
+        in_range = changes[changes['effective_date'] > start_date].drop_duplicates(
+            ['product_id', 'effective_date'], keep='last'
+        )
+        return pd.concat([opening, in_range])
+
+    def _price_observations(self, all_dates) -> pd.DataFrame:
+        """
+        区间内的价格观测 (product_id, day, price)，day 为相对首日的 int32 偏移，
+        每个商品每天一行（快照取第一条，变更日志取最后一条，与透视表一致）；
+        紧凑模式下商品列为 product_code
+        """
+        if self.price_format == 'daily':
+            return self._load_prices_for_dates(tuple(all_dates), day_offsets=True).drop_duplicates(
+                [self._product_key, 'day'], keep='first'
+            )
+
+        observations = self._fold_price_changes(all_dates)
+        if self.compact:
+            observations = self._encode_products(observations)
+        days = (pd.to_datetime(observations['effective_date']) - pd.Timestamp(all_dates[0])).dt.days
+        return pd.DataFrame({
+            self._product_key: observations[self._product_key].to_numpy(),
+            'day': days.to_numpy(dtype=np.int32),
+            'price': observations['price'].to_numpy()
+        })
+
+    def _build_sparse_panel(self, all_dates) -> 'SparsePricePanel':
+        """
+        构建稀疏价格面板，不经过 商品 × 日期 的稠密透视表；
+        每日快照逐个文件并入区段，不先拼接成覆盖全部天数的长表
+        """
+        from .sparse_panel import SparsePricePanel
+
+        # 紧凑模式下面板的商品标识即 product_code
+        if self.price_format == 'daily':
+            frames = (
+                frame.rename(columns={'product_code': 'product_id'})
+                for frame in self._iter_daily_prices(tuple(all_dates), day_offsets=True)
+            )
+            return SparsePricePanel.from_daily_frames(frames, all_dates)
+
+        observations = self._price_observations(all_dates).rename(columns={'product_code': 'product_id'})
+        return SparsePricePanel.from_observations(observations, all_dates)
+
+    def _build_compact_matrix(self, all_dates) -> np.ndarray:
+        """
+        紧凑模式的 商品 × 日期 float32 价格矩阵（行号为 product_code，已向前填充）
+        观测按 (商品编码, 日偏移) 直接写入矩阵，不经过 pivot_table
+        """
+        observations = self._price_observations(all_dates)
+        codes = observations['product_code'].to_numpy()
+        days = observations['day'].to_numpy(dtype=np.int64)
+        prices = observations['price'].to_numpy(dtype=np.float32)
+
+        matrix = np.full((len(self.product_index), len(all_dates)), np.nan, dtype=np.float32)
+        matrix[codes, days] = prices
+
+        # 向前填充：每格取本行此前最后一个有值的列；按行分块原地填充，额外内存只有一块的大小
+        columns = np.arange(matrix.shape[1], dtype=np.int32)
+        block = max(1, FFILL_BLOCK_CELLS // max(matrix.shape[1], 1))
+        for start in range(0, matrix.shape[0], block):
+            part = matrix[start:start + block]
+            last_valid = np.where(np.isnan(part), np.int32(0), columns)
+            np.maximum.accumulate(last_valid, axis=1, out=last_valid)
+            part[...] = np.take_along_axis(part, last_valid, axis=1)
+        return matrix
+
+    def _leaf_categories(self) -> pd.DataFrame:
+        """叶子类别（没有子类别的分类）的 id 和权重，分片模式下只含本分片的类别"""
+        leaves = super()._leaf_categories()
+        if self.category_ids is not None:
+            leaves = leaves[leaves['category_id'].isin(self.category_ids)]
+        return leaves
+
+    def build_log_levels(self, start_date: date, end_date: date) -> 'CategoryLogLevels':
+        """
+        预计算叶子类别的累计对数价格水平，之后任意基期/报告期的 CPI 可直接查表：
+
+            levels = calculator.build_log_levels(start, end)
+            levels.series(base_date, calculator.leaf_weights())
+        """
+        # 本模块也会作为脚本直接运行，包内依赖在用到时再导入
+        from .log_levels import CategoryLogLevels
+
+        all_dates = pd.date_range(start_date, end_date, freq='D').date
+        price_pivot = self._build_price_pivot(all_dates)
+
+        leaf_products = self.products[self.products['category_id'].isin(self._leaf_categories()['category_id'])]
+        product_categories = leaf_products.drop_duplicates('product_id').set_index('product_id')['category_id']
+        return CategoryLogLevels.from_price_pivot(price_pivot, product_categories)
+
+    def load_prices(self, start_date: date, end_date: date):
+        """
+        读取区间内的价格文件并构建价格面板：稠密模式为 商品 × 日期 透视表，紧凑模式为 float32 矩阵，
+        稀疏模式为 SparsePricePanel。价格 I/O 都在这里完成，结果可作为 price_panel 传给
+        compute_leaf_index_matrix / compute_daily_cpi，读取与计算的耗时、内存即可分开统计
+        """
+        all_dates = pd.date_range(start_date, end_date, freq='D').date
+        if self.panel == 'sparse':
+            return self._build_sparse_panel(all_dates)
+        if self.compact:
+            return self._build_compact_matrix(all_dates)
+        return self._build_price_pivot(all_dates)
+
+    def compute_leaf_index_matrix(self, start_date: date, end_date: date, price_panel=None) -> pd.DataFrame:
+        """
+        计算叶子类别每日指数矩阵（行为日期、列为叶子 category_id）
+
+        每个叶子类别当日指数为类内基期价格有效（> 0）且当日有价格的商品价格比的几何平均，
+        没有有效商品的类别为 NaN；CPI 和各层级汇总都从这一矩阵派生，只需计算一次。
+        price_panel 为同一区间 load_prices 的结果，缺省时在这里读取
+        """
         # 获取叶子类别（没有子类别的分类）
-        leaf_categories = self.categories[
-            ~self.categories['category_id'].isin(self.categories['parent'].dropna())
-        ][['category_id', 'weight']]
+        leaf_categories = self._leaf_categories()
 
-        # 加载完整时间范围的价格数据
         all_dates = pd.date_range(start_date, end_date, freq='D').date
-        price_data = self._load_prices_for_dates(tuple(all_dates))
-
-        # 创建完整价格透视表（填充缺失日期）
-        price_pivot = price_data.pivot_table(
-            index='product_id',
-            columns='date',
-            values='price',
-            aggfunc='first'
-        ).ffill(axis=1)  # 向前填充缺失价格
-
-        # 获取基期价格（首日价格）
-        base_prices = price_pivot[start_date].rename('base_price')
-
-        # 合并产品信息
-        merged_data = self.products.merge(
-            base_prices,
-            left_on='product_id',
-            right_index=True
-        ).merge(
-            leaf_categories,
-            on='category_id'
-        )
+        if price_panel is None:
+            price_panel = self.load_prices(start_date, end_date)
+
+        if self.panel == 'sparse':
+            # 稀疏面板：按商品的恒定价格区段直接累加，不展开为稠密矩阵
+            merged_data = self.products[
+                self.products[self._product_key].isin(price_panel.product_ids)
+            ].merge(leaf_categories[['category_id']], on='category_id')
+            codes, category_ids = pd.factorize(merged_data['category_id'])
+            category_index = price_panel.category_geo_means(
+                merged_data[self._product_key].to_numpy(), codes, len(category_ids)
+            )
+            return pd.DataFrame(category_index.T, index=all_dates, columns=category_ids).reindex(
+                columns=leaf_categories['category_id'].to_numpy()
+            )
 
-        # 初始化结果存储
-        cpi_series = pd.Series(index=all_dates, dtype='float64')
-
-        # 逐日计算CPI
-        for current_date in all_dates:
-            # 合并当前日期价格
-            current_prices = price_pivot[current_date].rename('current_price')
-            daily_data = merged_data.merge(
-                current_prices,
-                left_on='product_id',
-                right_index=True
+        if self.compact:
+            # 紧凑模式：商品编码直接作为价格矩阵的行号，不构建透视表，也不按 product_id 做 merge
+            prices = price_panel
+            is_leaf = self.products['category_id'].isin(leaf_categories['category_id']).to_numpy()
+            rows = self.products['product_code'].to_numpy()[is_leaf]
+            member_categories = self.products['category_id'].to_numpy()[is_leaf]
+
+            # 只保留区间内出现过价格的商品，与透视表路径的 isin(price_pivot.index) 一致
+            observed = ~np.isnan(prices[rows]).all(axis=1)
+            codes, category_ids = pd.factorize(member_categories[observed])
+            category_index = self._category_geo_means(prices[rows[observed]], codes, len(category_ids))
+            return pd.DataFrame(category_index.T, index=all_dates, columns=category_ids).reindex(
+                columns=leaf_categories['category_id'].to_numpy()
             )
 
-            # 过滤有效数据
-            valid_data = daily_data[
-                (daily_data['base_price'] > 0) &
-                (daily_data['current_price'].notnull())
-                ].copy()
+        # 完整时间范围的价格透视表（已填充缺失日期）
+        price_pivot = price_panel
+
+        # 合并产品信息：只保留有价格记录的叶子类别商品
+        merged_data = self.products[
+            self.products['product_id'].isin(price_pivot.index)
+        ].merge(leaf_categories[['category_id']], on='category_id')
+
+        # 商品 × 日期 的价格矩阵，按 merged_data 行顺序排列
+        prices = price_pivot.loc[merged_data['product_id']].to_numpy(dtype=float)
+        codes, category_ids = pd.factorize(merged_data['category_id'])
+
+        # 按类别计算相对基期（首日）的几何平均，基期无效或当日无价格的商品不参与
+        category_index = self._category_geo_means(prices, codes, len(category_ids))
+        return pd.DataFrame(category_index.T, index=all_dates, columns=category_ids).reindex(
+            columns=leaf_categories['category_id'].to_numpy()
+        )
 
-            # 计算价格比率
-            valid_data['price_ratio'] = valid_data['current_price'] / valid_data['base_price']
-            valid_data['log_ratio'] = np.log(valid_data['price_ratio'])
+    def _category_geo_means(self, prices: np.ndarray, codes: np.ndarray, n_categories: int) -> np.ndarray:
+        """
+        按类别编号计算几何平均，返回 n_categories × 日期 的矩阵
+        workers > 1 时才导入 parallel 分区并行；单进程直接串行计算，以脚本方式运行本文件时也可用
+        """
+        if self.workers > 1:
+            from .parallel import partitioned_category_geo_means
 
-            # 按类别计算几何平均
-            category_index = valid_data.groupby('category_id')['log_ratio'].mean().apply(np.exp)
+            return partitioned_category_geo_means(prices, codes, n_categories, self.workers)
+        order, segments = category_segments(codes, n_categories)
+        return category_geo_means(prices[order], segments)
 
-            # 合并权重计算当日CPI
-            final_data = category_index.reset_index(name='price_index').merge(
-                leaf_categories,
-                on='category_id'
+    def _cache_key(self, start_date: date, end_date: date) -> str:
+        """决定叶子指数矩阵内容的计算参数摘要：价格格式、面板结构、紧凑模式、区间和类别分片"""
+        return hashlib.md5(
+            f"{self.price_format}:{self.panel}:{self.compact}:{start_date}:{end_date}:{self.category_ids}".encode()
+        ).hexdigest()
+
+    def _source_fingerprint(self, start_date: date, end_date: date) -> str:
+        """计算参数加上所用数据文件的修改时间和大小的摘要，任一文件变化即失效"""
+        if self.price_format == 'daily':
+            paths = [
+                self.prices_dir / f"daily_prices_{d.strftime('%Y%m%d')}.csv"
+                for d in pd.date_range(start_date, end_date, freq='D').date
+            ]
+        else:
+            paths = [self.changes_path]
+        paths += [self.data_dir / 'categories.csv', self.data_dir / 'products.csv']
+
+        digest = hashlib.md5(self._cache_key(start_date, end_date).encode())
+        for path in paths:
+            if path.exists():
+                stat = path.stat()
+                digest.update(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return digest.hexdigest()
+
+    def weight_scenarios(self, start_date: date, end_date: date) -> 'ScenarioEvaluator':
+        """
+        返回基于叶子指数矩阵的权重情景计算器：
+
+            scenarios = calculator.weight_scenarios(start, end)
+            scenarios.evaluate({'base': calculator.leaf_weights(), 'food_x2': alt_weights})
+
+        设置了 cache_dir 时矩阵持久化为 .npz，文件名包含计算参数摘要（_cache_key），
+        不同面板、紧凑模式或类别分片的结果互不覆盖；数据文件未变化时直接读取
+        """
+        from .scenarios import ScenarioEvaluator
+
+        fingerprint = self._source_fingerprint(start_date, end_date)
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = self.cache_dir / (
+                f"leaf_index_{start_date:%Y%m%d}_{end_date:%Y%m%d}_{self._cache_key(start_date, end_date)}.npz"
             )
-            cpi_series[current_date] = (final_data['price_index'] * final_data['weight']).sum()
+            if cache_path.exists():
+                cached = ScenarioEvaluator.from_npz(cache_path)
+                if cached.fingerprint == fingerprint:
+                    return cached
+
+        evaluator = ScenarioEvaluator(self.compute_leaf_index_matrix(start_date, end_date), fingerprint)
+        if cache_path is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            evaluator.to_npz(cache_path)
+        return evaluator
 
-        return cpi_series.astype('float64').round(4)
+    def _leaf_index(self, start_date: date, end_date: date, price_panel=None) -> pd.DataFrame:
+        """叶子指数矩阵；未传入已读取的价格面板且设置了 cache_dir 时经缓存读取"""
+        if price_panel is None and self.cache_dir is not None:
+            return self.weight_scenarios(start_date, end_date).leaf_index
+        return self.compute_leaf_index_matrix(start_date, end_date, price_panel)
+
+    def compute_daily_cpi(self, start_date: date, end_date: date, price_panel=None) -> pd.Series:
+        """计算每日CPI数组（相对基期的累计变化），price_panel 见 load_prices"""
+        return weighted_cpi(self._leaf_index(start_date, end_date, price_panel), self.leaf_weights())
 
 
 def plot_cpi_trend(cpi_series: pd.Series):
     """绘制CPI趋势图"""
+    import matplotlib.pyplot as plt  # 仅绘图时加载，纯计算任务不引入 matplotlib
+
     plt.figure(figsize=(15, 6))
 
     # 绘制折线图
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+分类树的扁平数组表示 - 一次深度优先遍历后，任意节点的子树都是连续区间
+
+    ids[i]        第 i 个节点（DFS 先序）的 category_id
+    parent[i]     父节点下标，根节点为 -1
+    level[i]      层级，根节点为 1（与 Category.hierarchy 一致）
+    end[i]        子树为 [i, end[i])
+    leaf_start[i] / leaf_end[i]
+                  子树内的叶子在叶子序列（DFS 顺序）中的区间 [leaf_start, leaf_end)
+
+有了叶子区间，所有节点的加权汇总都是叶子前缀和之差，一次 cumsum 完成全部层级。
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class CategoryTree:
+    def __init__(self, categories: pd.DataFrame):
+        """
+        参数:
+            categories: 含 category_id、parent（根节点为空）、weight 列；
+                父分类不在表中的节点视为根节点
+        """
+        category_ids = categories['category_id'].to_numpy()
+        known = set(category_ids.tolist())
+        children: Dict[Optional[int], List[int]] = {}
+        for category_id, parent in zip(category_ids, categories['parent']):
+            parent = int(parent) if pd.notna(parent) and int(parent) in known else None
+            children.setdefault(parent, []).append(int(category_id))
+
+        # 迭代式先序遍历，子节点按 category_id 排序保证结果确定
+        order, parents, levels = [], [], []
+        stack = [(category_id, -1, 1) for category_id in sorted(children.get(None, []), reverse=True)]
+        while stack:
+            category_id, parent_pos, level = stack.pop()
+            position = len(order)
+            order.append(category_id)
+            parents.append(parent_pos)
+            levels.append(level)
+            stack.extend(
+                (child, position, level + 1) for child in sorted(children.get(category_id, []), reverse=True)
+            )
+        if len(order) != len(known):
+            raise ValueError("分类父子关系存在环")
+
+        self.ids = np.array(order, dtype=np.int64)
+        self.parent = np.array(parents, dtype=np.int64)
+        self.level = np.array(levels, dtype=np.int64)
+        self.is_leaf = np.array([category_id not in children for category_id in order])
+
+        weights = categories.drop_duplicates('category_id').set_index('category_id')['weight']
+        self.weight = weights.reindex(self.ids).to_numpy(dtype=float)
+        self.leaf_ids = self.ids[self.is_leaf]
+
+        # 子树区间：逆序扫描，每个节点的 end 取其最后一个后代的位置 + 1
+        size = len(self.ids)
+        self.end = np.arange(1, size + 1)
+        for position in range(size - 1, 0, -1):
+            parent_pos = self.parent[position]
+            if parent_pos >= 0:
+                self.end[parent_pos] = max(self.end[parent_pos], self.end[position])
+
+        leaf_prefix = np.concatenate([[0], np.cumsum(self.is_leaf)])
+        self.leaf_start = leaf_prefix[np.arange(size)]
+        self.leaf_end = leaf_prefix[self.end]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nodes(self) -> pd.DataFrame:
+        """以 DataFrame 展示扁平数组，便于调试"""
+        return pd.DataFrame({
+            'category_id': self.ids,
+            'parent': np.where(self.parent >= 0, self.ids[np.maximum(self.parent, 0)], -1),
+            'level': self.level,
+            'is_leaf': self.is_leaf,
+            'leaf_start': self.leaf_start,
+            'leaf_end': self.leaf_end,
+        })
+
+    def rollup(self, leaf_index: pd.DataFrame) -> pd.DataFrame:
+        """
+        由叶子指数矩阵汇总出所有节点的指数
+
+        参数:
+            leaf_index: 行为日期、列为叶子 category_id 的指数矩阵，NaN 表示当日无有效数据
+        返回:
+            行为日期、列为全部 category_id（DFS 顺序）的矩阵；
+            非叶子节点为子树内当日有数据的叶子按叶子权重的加权平均，无数据时为 NaN
+        """
+        values = leaf_index.reindex(columns=self.leaf_ids).to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        leaf_weight = np.nan_to_num(self.weight[self.is_leaf])
+
+        weighted = np.where(valid, values, 0.0) * leaf_weight
+        weight_present = valid * leaf_weight
+
+        # 前缀和补一列 0，每个节点的区间和 = prefix[leaf_end] - prefix[leaf_start]
+        zeros = np.zeros((len(values), 1))
+        weighted_prefix = np.hstack([zeros, np.cumsum(weighted, axis=1)])
+        weight_prefix = np.hstack([zeros, np.cumsum(weight_present, axis=1)])
+
+        totals = weighted_prefix[:, self.leaf_end] - weighted_prefix[:, self.leaf_start]
+        weight_sums = weight_prefix[:, self.leaf_end] - weight_prefix[:, self.leaf_start]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(weight_sums > 0, totals / weight_sums, np.nan)
+
+        # 叶子节点直接取自身指数（权重为 0 的叶子也保留）
+        result[:, self.is_leaf] = values
+        return pd.DataFrame(result, index=leaf_index.index, columns=pd.Index(self.ids, name='category_id'))
+
+    def level_ids(self, level: int) -> np.ndarray:
+        """某一层级的全部 category_id（DFS 顺序）"""
+        return self.ids[self.level == level]
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+分布式 CPI 计算 - 协调者 / 工作节点
+
+每个工作节点负责一个叶子类别分片，只读入本分片商品的价格，
+计算各类别每日的对数均值 ln I(c, t)（类内价格比对数的平均）；
+协调者通过 multiprocessing.connection 向所有节点并发下发计算请求，
+收集对数均值向量，按权重加权汇总为 CPI，结果与单机 compute_daily_cpi 一致。
+
+协议（均为 pickle 后的元组）：
+    ('compute', start_date, end_date) -> ('ok', category_ids, dates, log_means) | ('error', 错误信息)
+    ('ping',)                         -> ('ok', category_ids)
+    ('stop',)                         -> 节点退出
+
+安全：消息经 pickle 反序列化，能通过认证的一方即可在节点上执行任意代码。
+authkey 没有默认值，须由调用方提供足够随机的密钥（start_local_workers 缺省时用 os.urandom 生成）；
+工作节点只应监听回环地址或可信的内网接口，不要暴露到公网。
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .calculator import PandasCPICalculator, leaf_categories, weighted_cpi
+
+LOGGER = logging.getLogger(__name__)
+
+Address = Tuple[str, int]
+
+
+def shard_categories(categories: pd.DataFrame, shards: int) -> List[List[int]]:
+    """把叶子类别按 category_id 排序后轮流分到各分片"""
+    leaf_ids = sorted(int(c) for c in leaf_categories(categories)['category_id'])
+    return [leaf_ids[k::shards] for k in range(shards)]
+
+
+class CategoryShardWorker:
+    """
+    工作节点：在 address 上监听，处理协调者的计算请求
+
+    参数:
+        data_dir: 数据目录（与单机计算相同的文件布局，可以是共享存储）
+        category_ids: 本节点负责的叶子类别
+        authkey: 连接认证密钥（非空），协调者须使用相同密钥
+        address: 监听地址，端口为 0 时由系统分配；只应绑定回环地址或可信内网接口
+        price_format: 同 PandasCPICalculator
+    """
+
+    def __init__(self, data_dir: Path, category_ids: Sequence[int], authkey: bytes,
+                 address: Address = ('127.0.0.1', 0), price_format: str = 'daily'):
+        _check_authkey(authkey)
+
+        self.calculator = PandasCPICalculator(Path(data_dir), price_format=price_format, category_ids=category_ids)
+        self.listener = Listener(address, authkey=authkey)
+
+    @property
+    def address(self) -> Address:
+        return self.listener.address
+
+    def compute(self, start_date: date, end_date: date):
+        """本分片各类别的每日对数均值，行为类别"""
+        leaf_index = self.calculator.compute_leaf_index_matrix(start_date, end_date)
+        with np.errstate(divide='ignore'):
+            log_means = np.log(leaf_index.to_numpy(dtype=float).T)
+        return [int(c) for c in leaf_index.columns], list(leaf_index.index), log_means
+
+    def serve_forever(self) -> None:
+        """逐个处理连接，收到 stop 后退出；认证失败的连接被拒绝，不影响后续请求"""
+        try:
+            while True:
+                try:
+                    conn = self.listener.accept()
+                except AuthenticationError:
+                    # 认证失败的连接直接丢弃，节点继续服务
+                    LOGGER.warning("Rejected connection with wrong authkey")
+                    continue
+                with conn:
+                    if not self._handle(conn):
+                        return
+        finally:
+            self.listener.close()
+
+    def _handle(self, conn) -> bool:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return True
+
+            command = message[0]
+            if command == 'stop':
+                return False
+            try:
+                if command == 'ping':
+                    conn.send(('ok', self.calculator.category_ids))
+                elif command == 'compute':
+                    conn.send(('ok', *self.compute(*message[1:])))
+                else:
+                    conn.send(('error', f"unknown command: {command}"))
+            except Exception as e:
+                LOGGER.error(f"Shard computation failed: {e}", exc_info=True)
+                conn.send(('error', str(e)))
+
+
+def _check_authkey(authkey: bytes) -> None:
+    if not isinstance(authkey, bytes) or not authkey:
+        raise ValueError("authkey 须为非空 bytes")
+
+
+def _run_worker(data_dir, category_ids, authkey, price_format, address_queue) -> None:
+    worker = CategoryShardWorker(data_dir, category_ids, authkey, price_format=price_format)
+    address_queue.put(worker.address)
+    worker.serve_forever()
+
+
+def start_local_workers(data_dir: Path, shards: int, authkey: Optional[bytes] = None, price_format: str = 'daily'):
+    """
+    在本机启动 shards 个工作进程（用于测试和单机多进程运行），只监听 127.0.0.1
+    参数:
+        authkey: 连接认证密钥，缺省时用 os.urandom 生成随机密钥
+    返回:
+        (进程列表, 地址列表, 认证密钥)
+    """
+    if authkey is None:
+        authkey = os.urandom(32)
+    _check_authkey(authkey)
+    categories = pd.read_csv(Path(data_dir) / 'categories.csv', usecols=['category_id', 'parent', 'weight'])
+    context = multiprocessing.get_context()
+    address_queue = context.Queue()
+
+    processes = []
+    for category_ids in shard_categories(categories, shards):
+        process = context.Process(
+            target=_run_worker,
+            args=(data_dir, category_ids, authkey, price_format, address_queue),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    addresses = [address_queue.get(timeout=30) for _ in processes]
+    return processes, addresses, authkey
+
+
+class DistributedCPICoordinator:
+    """
+    协调者：并发请求所有工作节点，用 categories.csv 中的叶子权重汇总
+
+    参数:
+        addresses: 工作节点地址
+        data_dir: 读取 categories.csv 的目录（协调者不读取价格数据）
+        authkey: 连接认证密钥，与工作节点相同
+    """
+
+    def __init__(self, addresses: Sequence[Address], data_dir: Path, authkey: bytes):
+        _check_authkey(authkey)
+        self.addresses = list(addresses)
+        self.authkey = authkey
+        categories = pd.read_csv(Path(data_dir) / 'categories.csv', usecols=['category_id', 'parent', 'weight'])
+        self.weights = leaf_categories(categories).set_index('category_id')['weight']
+
+    def _request(self, address: Address, message: tuple):
+        with Client(address, authkey=self.authkey) as conn:
+            conn.send(message)
+            reply = conn.recv()
+        if reply[0] != 'ok':
+            raise RuntimeError(f"Worker {address} failed: {reply[1]}")
+        return reply[1:]
+
+    def compute_leaf_log_means(self, start_date: date, end_date: date) -> pd.DataFrame:
+        """收集所有分片的对数均值，行为日期、列为叶子 category_id"""
+        with ThreadPoolExecutor(max_workers=len(self.addresses)) as pool:
+            replies = list(pool.map(
+                lambda address: self._request(address, ('compute', start_date, end_date)),
+                self.addresses
+            ))
+
+        frames = [
+            pd.DataFrame(np.asarray(log_means).T, index=dates, columns=category_ids)
+            for category_ids, dates, log_means in replies
+        ]
+        combined = pd.concat(frames, axis=1)
+        if combined.columns.duplicated().any():
+            raise ValueError("工作节点的类别分片有重叠")
+        return combined
+
+    def compute_daily_cpi(self, start_date: date, end_date: date) -> pd.Series:
+        """与 PandasCPICalculator.compute_daily_cpi 相同的每日 CPI"""
+        return weighted_cpi(np.exp(self.compute_leaf_log_means(start_date, end_date)), self.weights)
+
+    def stop_workers(self, addresses: Optional[Sequence[Address]] = None) -> None:
+        for address in addresses or self.addresses:
+            with Client(address, authkey=self.authkey) as conn:
+                conn.send(('stop',))
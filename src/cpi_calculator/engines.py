@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+计算引擎选择 - 按配置创建接口相同的 CPI 计算器
+
+    calculator = create_calculator(data_dir)                   # 使用 settings.ENGINE，默认 pandas
+    calculator = create_calculator(data_dir, engine='polars', file_format='parquet')
+    calculator.compute_daily_cpi(start_date, end_date)
+
+各引擎所在模块只在选用时导入，未安装的可选依赖（如 polars）不影响其他引擎。
+"""
+import importlib
+from pathlib import Path
+from typing import Optional
+
+# {引擎名: (模块, 类名)}
+ENGINES = {
+    'pandas': ('.calculator', 'PandasCPICalculator'),
+    'polars': ('.polars_engine', 'PolarsCPICalculator'),
+    'duckdb': ('.sql_engine', 'DuckDBCPICalculator'),
+}
+
+# polars / duckdb 引擎共用的 Parquet 价格文件（product_id, date, price，按日期有序）
+PARQUET_FILE = 'daily_price.parquet'
+
+
+def create_calculator(data_dir: Path, engine: Optional[str] = None, **options):
+    """
+    参数:
+        data_dir: 数据目录
+        engine: 引擎名，缺省时读取配置项 ENGINE（环境变量 CPI_ENGINE 可覆盖）
+        options: 传给对应计算器构造函数的参数
+    """
+    if engine is None:
+        from .config import settings  # 只有依赖配置选择引擎时才加载 dynaconf
+
+        engine = settings.get('ENGINE', 'pandas')
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported engine: {engine}")
+
+    module_name, class_name = ENGINES[engine]
+    calculator_class = getattr(importlib.import_module(module_name, __package__), class_name)
+    return calculator_class(Path(data_dir), **options)
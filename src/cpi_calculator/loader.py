@@ -1,6 +1,3 @@
-from clickhouse_driver import Client
-from aliyun.oss import OssClient
-from aliyun.sts import StsClient  # 阿里云STS SDK
 import pandas as pd
 import ssl
 
@@ -14,6 +11,11 @@ class SecureOSSDataLoader:
         }
         :param ch_conf: ClickHouse连接配置
         """
+        # 云端 SDK 在创建加载器时才导入
+        from clickhouse_driver import Client
+        from aliyun.oss import OssClient
+        from aliyun.sts import StsClient  # 阿里云STS SDK
+
         # 1. 获取临时安全凭证
         sts_client = StsClient()
         credentials = sts_client.assume_role(
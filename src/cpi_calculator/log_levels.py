@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+分类累计对数价格水平 - 一次预计算，之后任意 (基期, 报告期) 的指数只需按分类查表
+
+对每个分类 c，逐日计算相邻两天都有价格的商品（匹配样本）的平均对数价格变动，
+累加得到对数水平：
+
+    L(c, t) = L(c, t-1) + mean_{i 在 t-1 和 t 都有价格} [ln p(i, t) - ln p(i, t-1)]
+
+分类指数 I(c, b, r) = exp(L(c, r) - L(c, b))，总指数为 Σ w(c) · I(c, b, r)。
+这是逐日环比连乘的链式几何平均指数：样本不变时与按基期直接计算的结果相同；
+样本有进出时，新入样商品从其第二天起参与环比，结果与定基直接计算略有差异。
+"""
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+class CategoryLogLevels:
+    """
+    分类 × 日期的累计对数价格水平
+
+    参数:
+        levels: 索引为日期、列为 category_id 的对数水平表；分类当天没有任何商品价格时为 NaN
+    """
+
+    def __init__(self, levels: pd.DataFrame):
+        self.levels = levels.sort_index()
+
+    @classmethod
+    def from_price_pivot(cls, price_pivot: pd.DataFrame, product_categories: pd.Series) -> 'CategoryLogLevels':
+        """
+        由价格透视表构建
+        参数:
+            price_pivot: 商品 × 日期 的价格表（列按日期排序），缺失为 NaN
+            product_categories: 以商品为索引的 category_id，不在其中的商品被忽略
+        """
+        categories = product_categories.reindex(price_pivot.index)
+        known = categories.notna().to_numpy()
+        prices = price_pivot.to_numpy(dtype=float)[known]
+        categories = categories[known].to_numpy()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_prices = np.log(np.where(prices > 0, prices, np.nan))
+
+        # 相邻两天都有价格的商品才参与当日环比，其余为 NaN，分组均值自动跳过
+        links = pd.DataFrame(np.diff(log_prices, axis=1)).groupby(categories).mean()
+        present = pd.DataFrame(~np.isnan(log_prices)).groupby(categories).any()
+
+        # 首日水平为 0；没有匹配商品的日期环比记为 0，水平沿用前一天
+        levels = np.zeros(present.shape)
+        levels[:, 1:] = np.nancumsum(links.reindex(present.index).to_numpy(), axis=1)
+        levels[~present.to_numpy()] = np.nan
+
+        return cls(pd.DataFrame(levels.T, index=pd.Index(price_pivot.columns, name='date'), columns=present.index))
+
+    def category_index(self, base_date, report_date) -> pd.Series:
+        """各分类报告期相对基期的指数，任一日期无价格的分类为 NaN"""
+        return np.exp(self.levels.loc[report_date] - self.levels.loc[base_date])
+
+    def index(self, base_date, report_date, weights: pd.Series, normalize: bool = False) -> float:
+        """
+        加权总指数 Σ w(c) · I(c, b, r)，只用查表，与商品数量无关
+        参数:
+            weights: 以 category_id 为索引的权重
+            normalize: 按有指数的分类的权重之和归一化
+        """
+        category_index = self.category_index(base_date, report_date)
+        weights = weights.reindex(category_index.index)
+        valid = category_index.notna() & weights.notna()
+        total = (category_index[valid] * weights[valid]).sum()
+        if normalize:
+            weight_sum = weights[valid].sum()
+            return float(total / weight_sum) if weight_sum > 0 else float('nan')
+        return float(total)
+
+    def series(self, base_date, weights: pd.Series, dates: Optional[Iterable] = None,
+               normalize: bool = False) -> pd.Series:
+        """
+        以 base_date 为基期重算整条指数序列（换基期不需要重新读取价格）
+        参数:
+            dates: 报告期，默认全部日期
+        """
+        levels = self.levels if dates is None else self.levels.loc[list(dates)]
+        category_index = np.exp(levels - self.levels.loc[base_date])
+        weights = weights.reindex(category_index.columns)
+
+        weighted = category_index.mul(weights, axis=1)
+        total = weighted.sum(axis=1, min_count=1)
+        if normalize:
+            total = total / category_index.notna().mul(weights.fillna(0), axis=1).sum(axis=1)
+        return total.rename('CPI')
+
+    def to_csv(self, path: Union[str, Path]) -> None:
+        """以 date 为行、category_id 为列保存"""
+        self.levels.to_csv(path)
+
+    @classmethod
+    def read_csv(cls, path: Union[str, Path]) -> 'CategoryLogLevels':
+        levels = pd.read_csv(path, index_col='date')
+        levels.index = pd.to_datetime(levels.index).date
+        levels.index.name = 'date'
+        levels.columns = levels.columns.astype(int)
+        return cls(levels)
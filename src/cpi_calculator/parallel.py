@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+按分类分区的并行叶子指数计算
+
+各叶子类别的几何平均在最终加权之前互不依赖：父进程把商品按 category_id 排序，
+使每个类别的商品在价格矩阵中占连续的行区间，矩阵写入内存映射文件；
+进程池中的每个工作进程只接收文件路径和若干 (起始行, 结束行) 区间，
+直接映射同一份数据计算这些类别的每日指数，价格矩阵不经过 pickle 传输。
+"""
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# 串行内核放在 calculator.py 中，单进程计算不必导入本模块
+from .calculator import category_geo_means, category_segments
+
+LOGGER = logging.getLogger(__name__)
+
+Segment = Tuple[int, int]
+
+
+def _worker(path: str, shape: Tuple[int, int], segments: Sequence[Segment]) -> np.ndarray:
+    prices = np.memmap(path, dtype=np.float64, mode='r', shape=shape)
+    try:
+        return category_geo_means(prices, segments)
+    finally:
+        del prices
+
+
+def _partition(segments: Sequence[Segment], workers: int) -> List[List[int]]:
+    """按商品数贪心分配类别：每次把最大的类别分给当前负载最小的工作进程"""
+    order = sorted(range(len(segments)), key=lambda k: segments[k][1] - segments[k][0], reverse=True)
+    loads = [0] * workers
+    parts: List[List[int]] = [[] for _ in range(workers)]
+    for k in order:
+        target = loads.index(min(loads))
+        parts[target].append(k)
+        loads[target] += segments[k][1] - segments[k][0]
+    return [part for part in parts if part]
+
+
+def partitioned_category_geo_means(
+        prices: np.ndarray,
+        category_codes: np.ndarray,
+        n_categories: int,
+        workers: int
+) -> np.ndarray:
+    """
+    category_geo_means 的多进程版本
+
+    参数:
+        prices: 商品 × 日期 的价格矩阵（行顺序任意）
+        category_codes: 每行商品的类别编号 0..n_categories-1
+        n_categories: 类别数
+        workers: 进程数，<= 1 时在当前进程计算
+    返回:
+        n_categories × 日期 的指数矩阵，行号即类别编号
+    """
+    order, segments = category_segments(category_codes, n_categories)
+    if workers <= 1:
+        return category_geo_means(prices[order], segments)
+
+    parts = _partition(segments, workers)
+
+    result = np.full((n_categories, prices.shape[1]), np.nan)
+    with tempfile.TemporaryDirectory(prefix='cpi_parallel_') as tmp:
+        path = str(Path(tmp) / 'prices.f64')
+        shape = (len(order), prices.shape[1])
+        mapped = np.memmap(path, dtype=np.float64, mode='w+', shape=shape)
+        mapped[:] = prices[order]
+        mapped.flush()
+        del mapped
+
+        LOGGER.info(f"Computing {n_categories} categories with {len(parts)} processes")
+        with ProcessPoolExecutor(max_workers=len(parts)) as pool:
+            futures = [
+                (part, pool.submit(_worker, path, shape, [segments[k] for k in part]))
+                for part in parts
+            ]
+            for part, future in futures:
+                result[part] = future.result()
+    return result
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Polars 计算引擎 - 与 PandasCPICalculator 接口相同的惰性、多线程实现
+
+价格文件以 LazyFrame 扫描，只投影 product_id、price 两列：
+    - csv: daily_price/daily_prices_YYYYMMDD.csv，按日期只扫描区间内的文件
+    - parquet: daily_price.parquet（product_id, date, price，由 write_price_parquet 生成），
+      日期条件下推到扫描，按行组统计信息跳过区间外的数据
+补全 商品 × 日期 网格、向前填充、按类别求对数均值都在同一个查询计划里，
+collect() 时由 Polars 的线程池并行执行，不受 GIL 限制。
+
+polars 为可选依赖，只有选用该引擎时才导入本模块。
+"""
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from .calculator import LeafIndexCalculator
+from .engines import PARQUET_FILE
+
+LOGGER = logging.getLogger(__name__)
+
+
+def write_price_parquet(data_dir: Path, path: Optional[Path] = None) -> Path:
+    """
+    把 daily_price/ 下的每日 CSV 合并为一个按日期有序的 Parquet 文件（增加 date 列）
+
+    返回:
+        写入的文件路径，默认为 data_dir/daily_price.parquet
+    """
+    data_dir = Path(data_dir)
+    path = Path(path) if path is not None else data_dir / PARQUET_FILE
+    files = sorted((data_dir / 'daily_price').glob('daily_prices_*.csv'))
+    if not files:
+        raise FileNotFoundError(f"No daily price files in {data_dir / 'daily_price'}")
+
+    frames = [
+        _scan_daily_csv(file_path, pd.to_datetime(file_path.stem.rsplit('_', 1)[-1], format='%Y%m%d').date())
+        for file_path in files
+    ]
+    # 文件名按日期排序，合并后即按日期有序，行组的 min/max 统计可用于日期过滤
+    pl.concat(frames).sink_parquet(path)
+    LOGGER.info(f"Wrote {len(files)} daily price files to {path}")
+    return path
+
+
+def _scan_daily_csv(file_path: Path, target_date: date) -> pl.LazyFrame:
+    return pl.scan_csv(
+        file_path,
+        schema_overrides={'product_id': pl.Int64, 'price': pl.Float64}
+    ).select(
+        'product_id', pl.lit(target_date, dtype=pl.Date).alias('date'), 'price'
+    )
+
+
+class PolarsCPICalculator(LeafIndexCalculator):
+    def __init__(self, data_dir: Path, file_format: str = 'csv'):
+        """
+        参数:
+            data_dir: 数据目录（与 PandasCPICalculator 相同的文件布局）
+            file_format: 价格文件格式
+                - 'csv': daily_price/daily_prices_YYYYMMDD.csv 每日全量快照
+                - 'parquet': data_dir/daily_price.parquet，见 write_price_parquet
+        """
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported file format: {file_format}")
+        self.data_dir = Path(data_dir)
+        self.file_format = file_format
+        self.prices_dir = self.data_dir / 'daily_price'
+        self.parquet_path = self.data_dir / PARQUET_FILE
+
+        # 分类表很小，直接读入（CategoryTree 和权重都基于它）；商品表保持惰性扫描
+        self.categories = pd.read_csv(self.data_dir / 'categories.csv', usecols=['category_id', 'parent', 'weight'])
+        self.products = pl.scan_csv(
+            self.data_dir / 'products.csv',
+            schema_overrides={'product_id': pl.Int64, 'category_id': pl.Int64}
+        ).select('product_id', 'category_id')
+
+    def _scan_prices(self, start_date: date, end_date: date) -> pl.LazyFrame:
+        """区间内的价格记录 (product_id, date, price)，同一商品同一天保留第一条非空价格"""
+        if self.file_format == 'parquet':
+            if not self.parquet_path.exists():
+                raise FileNotFoundError(f"Price file missing: {self.parquet_path}")
+            prices = pl.scan_parquet(self.parquet_path).select('product_id', 'date', 'price').filter(
+                pl.col('date').is_between(start_date, end_date)
+            )
+        else:
+            frames = []
+            for target_date in pd.date_range(start_date, end_date, freq='D').date:
+                file_path = self.prices_dir / f"daily_prices_{target_date.strftime('%Y%m%d')}.csv"
+                if not file_path.exists():
+                    raise FileNotFoundError(f"Price file missing: {file_path}")
+                frames.append(_scan_daily_csv(file_path, target_date))
+            prices = pl.concat(frames)
+
+        return prices.drop_nulls('price').unique(subset=['product_id', 'date'], keep='first', maintain_order=True)
+
+    def _leaf_log_means(self, start_date: date, end_date: date) -> pl.LazyFrame:
+        """各叶子类别每日的对数均值 (category_id, date, log_mean) 的查询计划"""
+        prices = self._scan_prices(start_date, end_date)
+        all_dates = pl.LazyFrame(
+            {'date': list(pd.date_range(start_date, end_date, freq='D').date)}, schema={'date': pl.Date}
+        )
+
+        # 基期价格：只有首日有价格且 > 0 的商品参与，与 pandas 引擎透视表第 0 列的判断一致
+        base = prices.filter(pl.col('date') == start_date).select(
+            'product_id', pl.col('price').alias('base_price')
+        ).filter(pl.col('base_price') > 0)
+
+        # 商品 × 日期 网格，缺失日期沿用此前最后一个价格
+        filled = base.join(all_dates, how='cross').join(
+            prices, on=['product_id', 'date'], how='left'
+        ).sort('product_id', 'date').with_columns(
+            pl.col('price').forward_fill().over('product_id')
+        )
+
+        leaf_ids = pl.LazyFrame(
+            {'category_id': self._leaf_categories()['category_id'].tolist()}, schema={'category_id': pl.Int64}
+        )
+        members = self.products.join(leaf_ids, on='category_id', how='semi')
+
+        # 价格为 0 时对数为 -inf，类别指数为 0；负价格不参与，与 np.nanmean 的语义一致
+        log_ratio = pl.when(pl.col('price') > 0).then(
+            (pl.col('price') / pl.col('base_price')).log()
+        ).when(pl.col('price') == 0).then(float('-inf')).otherwise(None)
+
+        return members.join(filled, on='product_id', how='inner').group_by('category_id', 'date').agg(
+            log_ratio.mean().alias('log_mean')
+        )
+
+    def compute_leaf_index_matrix(self, start_date: date, end_date: date) -> pd.DataFrame:
+        """计算叶子类别每日指数矩阵（行为日期、列为叶子 category_id），与 PandasCPICalculator 相同"""
+        result = self._leaf_log_means(start_date, end_date).collect()
+
+        long = pd.DataFrame({
+            'category_id': result.get_column('category_id').to_numpy(),
+            'date': result.get_column('date').to_list(),
+            'index': np.exp(result.get_column('log_mean').to_numpy().astype(float))
+        })
+        all_dates = pd.date_range(start_date, end_date, freq='D').date
+        leaf_index = long.pivot(index='date', columns='category_id', values='index').reindex(
+            index=all_dates, columns=self._leaf_categories()['category_id'].to_numpy()
+        )
+        return leaf_index.rename_axis(index=None, columns=None)
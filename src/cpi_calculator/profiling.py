@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段性能剖析 - 为主流程的 加载 / 计算 / 可视化 各阶段记录耗时、峰值内存和调用栈
+
+两种模式：
+    cprofile: 每个阶段一个 cProfile，输出 <stage>.prof（可用 snakeviz / pstats 查看）
+    sample:   后台线程按固定间隔采样主线程调用栈，输出 flame graph 可用的 collapsed stack 文件
+两种模式都会用 tracemalloc 记录每个阶段的 Python 内存分配峰值，并写出 profile_report.json
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+
+class StackSampler:
+    """采样线程：定时抓取目标线程的调用栈并按 collapsed 格式累计"""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.stage = 'main'
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            names.append(self.stage)
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def write_collapsed(self, path: Path) -> None:
+        """每行 "根;...;叶 样本数"，可直接交给 flamegraph.pl / speedscope"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class StageProfiler:
+    """
+    分阶段剖析器，mode 为 None 时所有操作均为空操作
+
+    用法：
+        profiler = StageProfiler('sample', 'profile')
+        with profiler.stage('load'):
+            ...
+        profiler.write_report()
+    """
+
+    def __init__(self, mode: Optional[str] = None, output_dir: str = 'profile',
+                 sample_interval: float = 0.005, top_n: int = 20):
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的剖析模式: {mode}，可选 {PROFILE_MODES}")
+        self.mode = mode
+        self.output_dir = Path(output_dir)
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.stages: List[Dict] = []
+        self._sampler: Optional[StackSampler] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    @contextmanager
+    def stage(self, name: str):
+        """剖析一个阶段"""
+        if not self.enabled:
+            yield
+            return
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+        profile = None
+        if self.mode == 'cprofile':
+            profile = cProfile.Profile()
+        elif self._sampler is None:
+            self._sampler = StackSampler(self.sample_interval)
+            self._sampler.start()
+        if self._sampler is not None:
+            self._sampler.stage = name
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            if self._sampler is not None:
+                self._sampler.stage = 'main'
+
+            record = {
+                'stage': name,
+                'wall_s': round(wall, 4),
+                'cpu_s': round(cpu, 4),
+                'peak_mem_mb': round(peak / 1024 ** 2, 3),
+            }
+            if profile is not None:
+                prof_path = self.output_dir / f"{name}.prof"
+                profile.dump_stats(prof_path)
+                record['prof_file'] = str(prof_path)
+                record['top_functions'] = self._top_functions(profile)
+            self.stages.append(record)
+            LOGGER.info("阶段 %s | 耗时 %.3fs | CPU %.3fs | 峰值内存 %.1fMB",
+                        name, wall, cpu, record['peak_mem_mb'])
+
+    def _top_functions(self, profile: cProfile.Profile) -> List[Dict]:
+        """按累计耗时取前 top_n 个函数"""
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f"{Path(filename).name}:{line}({func})",
+                'calls': ncalls,
+                'tottime_s': round(tottime, 4),
+                'cumtime_s': round(cumtime, 4),
+            })
+        rows.sort(key=lambda r: r['cumtime_s'], reverse=True)
+        return rows[:self.top_n]
+
+    def write_report(self) -> Optional[Path]:
+        """写出 profile_report.json（sample 模式同时写出 stacks.collapsed），返回报告路径"""
+        if not self.enabled:
+            return None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        report = {
+            'mode': self.mode,
+            'total_wall_s': round(sum(s['wall_s'] for s in self.stages), 4),
+            'stages': self.stages,
+        }
+
+        if self._sampler is not None:
+            self._sampler.stop()
+            collapsed_path = self.output_dir / 'stacks.collapsed'
+            self._sampler.write_collapsed(collapsed_path)
+            report['collapsed_stacks'] = str(collapsed_path)
+            report['samples'] = sum(self._sampler.stacks.values())
+            self._sampler = None
+
+        report_path = self.output_dir / 'profile_report.json'
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        LOGGER.info("剖析报告已保存至: %s", report_path)
+        return report_path
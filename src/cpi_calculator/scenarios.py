@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+权重情景 - 在缓存的 日期 × 叶子类别 指数矩阵上批量重算 CPI
+
+compute_daily_cpi 的结果是叶子指数矩阵按权重的加权和（无数据的类别不参与），
+因此 k 组权重的 CPI 序列就是一次矩阵乘法 nan_to_num(M) @ W.T，
+与商品数量无关，几百组情景也只需毫秒级。
+"""
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+WeightsLike = Union[pd.Series, pd.DataFrame, Dict[str, pd.Series]]
+
+
+class ScenarioEvaluator:
+    """
+    参数:
+        leaf_index: PandasCPICalculator.compute_leaf_index_matrix 的结果（行为日期、列为叶子 category_id）
+    """
+
+    def __init__(self, leaf_index: pd.DataFrame, fingerprint: Optional[str] = None):
+        self.leaf_index = leaf_index
+        self.fingerprint = fingerprint
+        # 预先把 NaN 置 0，每次情景计算只剩矩阵乘法
+        self._matrix = np.nan_to_num(leaf_index.to_numpy(dtype=float))
+
+    @property
+    def categories(self) -> pd.Index:
+        return self.leaf_index.columns
+
+    def evaluate(self, weights: WeightsLike) -> Union[pd.Series, pd.DataFrame]:
+        """
+        按给定权重计算 CPI 序列
+
+        参数:
+            weights: 单组权重（以 category_id 为索引的 Series），
+                或多组权重（行为情景、列为 category_id 的 DataFrame，或 {情景名: Series}）；
+                未给出的类别权重视为 0，不在叶子矩阵中的类别被忽略
+        返回:
+            单组权重返回 Series，多组返回行为日期、列为情景的 DataFrame
+        """
+        if isinstance(weights, pd.Series):
+            return self.evaluate(weights.to_frame().T).iloc[:, 0].rename('CPI')
+        if isinstance(weights, dict):
+            weights = pd.DataFrame(weights).T
+
+        weight_matrix = weights.reindex(columns=self.categories).fillna(0.0).to_numpy(dtype=float)
+        return pd.DataFrame(self._matrix @ weight_matrix.T, index=self.leaf_index.index, columns=weights.index)
+
+    def to_npz(self, path: Union[str, Path]) -> None:
+        """保存为 .npz（矩阵、日期、类别和数据源指纹）"""
+        np.savez(
+            path,
+            values=self.leaf_index.to_numpy(dtype=float),
+            dates=np.array([str(d) for d in self.leaf_index.index]),
+            categories=self.categories.to_numpy(dtype=np.int64),
+            fingerprint=np.array(self.fingerprint or '')
+        )
+
+    @classmethod
+    def from_npz(cls, path: Union[str, Path]) -> 'ScenarioEvaluator':
+        with np.load(path) as data:
+            leaf_index = pd.DataFrame(
+                data['values'],
+                index=pd.to_datetime(data['dates']).date,
+                columns=data['categories']
+            )
+            fingerprint = str(data['fingerprint']) or None
+        return cls(leaf_index, fingerprint)
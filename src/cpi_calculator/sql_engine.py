@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+SQL 计算引擎 - 在嵌入式 DuckDB 中执行与 ClickHouse 相同的 CPI 查询
+
+查询只引用三张逻辑表，列名与 ClickHouse 中的表一致：
+    category(id, parent, weight)
+    product(id, category_id)
+    price(product_id, date, price)
+本地运行时分类、商品是 data/ 下 CSV 文件上的视图，价格是按计算区间物化的临时表。
+查询逻辑（LEAF_INDEX_SQL / CPI_SQL）与生产环境的 ClickHouse 一致，但要求 price 中每个商品每天只有一条记录：
+本地物化时按文件顺序保留首条非空价格（与 pandas / polars 引擎相同）；ClickHouse 表没有插入顺序列，
+any / argMin 都复现不了"首条"，提交前须在入库时去重，否则两边结果不一致。
+DuckDB 按列向量化、多线程执行，数据超过内存时自动落盘。
+
+duckdb 为可选依赖，只有选用该引擎时才导入本模块。
+"""
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+import pandas as pd
+
+from .calculator import LeafIndexCalculator
+from .engines import PARQUET_FILE
+
+LOGGER = logging.getLogger(__name__)
+
+# 公共部分：叶子类别 → 每日价格 → 基期 → 向前填充 → 叶子类别几何平均
+# 只使用 DuckDB 与 ClickHouse 都支持的语法（非相关子查询、ASOF JOIN、CASE）
+_CATEGORY_CPI_CTES = """
+WITH
+-- 获取所有叶子类别的ID和权重（没有子类别的类别）
+leaf_categories AS (
+    SELECT id, weight
+    FROM category
+    WHERE id NOT IN (SELECT parent FROM category WHERE parent IS NOT NULL)
+),
+-- 区间内的价格，空价格不参与；price 每个商品每天只有一条（见模块说明）
+daily_price AS (
+    SELECT product_id, date, price
+    FROM price
+    WHERE date BETWEEN '{start_date}' AND '{end_date}' AND price IS NOT NULL
+),
+-- 基期价格：首日有价格且大于零的商品才参与计算
+base_price AS (
+    SELECT product_id, price AS base_price
+    FROM daily_price
+    WHERE date = '{start_date}' AND price > 0
+),
+-- 商品 × 日期 网格，报告期价格取当日及以前最后一个价格（向前填充）
+price_data AS (
+    SELECT g.product_id AS product_id, g.date AS date, g.base_price AS base_price, p.price AS report_price
+    FROM (
+        SELECT b.product_id AS product_id, b.base_price AS base_price, d.date AS date
+        FROM base_price b
+        CROSS JOIN (SELECT DISTINCT date FROM daily_price) d
+    ) g
+    ASOF LEFT JOIN daily_price p ON g.product_id = p.product_id AND g.date >= p.date
+),
+-- 计算每个叶子类别每日的价格指数（几何平均数）；当日有零价格时指数为 0，负价格不参与
+category_cpi AS (
+    SELECT
+        p.category_id AS category_id,
+        pd.date AS date,
+        CASE
+            WHEN SUM(CASE WHEN pd.report_price = 0 THEN 1 ELSE 0 END) > 0 THEN 0
+            ELSE EXP(AVG(CASE WHEN pd.report_price > 0 THEN LN(pd.report_price / pd.base_price) END))
+        END AS price_index
+    FROM product p
+    JOIN price_data pd ON p.id = pd.product_id
+    JOIN leaf_categories lc ON p.category_id = lc.id
+    GROUP BY p.category_id, pd.date
+)
+"""
+
+LEAF_INDEX_SQL = _CATEGORY_CPI_CTES + """
+SELECT category_id, date, price_index
+FROM category_cpi
+"""
+
+# 计算加权CPI，当日无有效数据的类别不参与
+CPI_SQL = _CATEGORY_CPI_CTES + """
+SELECT
+    cc.date AS date,
+    SUM(cc.price_index * lc.weight) AS cpi
+FROM category_cpi cc
+JOIN leaf_categories lc ON cc.category_id = lc.id
+GROUP BY cc.date
+ORDER BY cc.date
+"""
+
+
+def _quote(path: Path) -> str:
+    """SQL 字符串字面量"""
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+class DuckDBCPICalculator(LeafIndexCalculator):
+    def __init__(self, data_dir: Path, file_format: str = 'csv', threads: Optional[int] = None,
+                 memory_limit: Optional[str] = None):
+        """
+        参数:
+            data_dir: 数据目录（与 PandasCPICalculator 相同的文件布局）
+            file_format: 价格文件格式
+                - 'csv': daily_price/daily_prices_YYYYMMDD.csv 每日全量快照
+                - 'parquet': data_dir/daily_price.parquet（product_id, date, price）
+            threads: DuckDB 线程数，缺省为全部核心
+            memory_limit: DuckDB 内存上限（如 '4GB'），超出部分落盘
+        """
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported file format: {file_format}")
+        self.data_dir = Path(data_dir)
+        self.file_format = file_format
+        self.prices_dir = self.data_dir / 'daily_price'
+        self.parquet_path = self.data_dir / PARQUET_FILE
+
+        self.connection = duckdb.connect()
+        if threads is not None:
+            self.connection.execute(f"SET threads = {int(threads)}")
+        if memory_limit is not None:
+            self.connection.execute(f"SET memory_limit = {_quote(memory_limit)}")
+
+        # 分类表很小，另读一份供权重和 CategoryTree 使用
+        self.categories = pd.read_csv(self.data_dir / 'categories.csv', usecols=['category_id', 'parent', 'weight'])
+        self._create_table_views()
+
+    def _create_table_views(self) -> None:
+        """把分类、商品文件映射为 ClickHouse 同名同列的视图"""
+        self.connection.execute(f"""
+            CREATE OR REPLACE VIEW category AS
+            SELECT category_id AS id, CAST(parent AS BIGINT) AS parent, weight
+            FROM read_csv({_quote(self.data_dir / 'categories.csv')}, header = true)
+        """)
+        self.connection.execute(f"""
+            CREATE OR REPLACE VIEW product AS
+            SELECT product_id AS id, category_id
+            FROM read_csv({_quote(self.data_dir / 'products.csv')}, header = true)
+        """)
+
+    def _create_price_table(self, start_date: date, end_date: date) -> None:
+        """
+        价格临时表：CSV 格式只列出区间内的每日文件（日期取自文件名），
+        Parquet 格式由日期条件下推到扫描
+
+        同一商品同一天有多条记录时按文件顺序保留首条非空价格，与 pandas / polars 引擎一致。
+        去重结果物化为表：留作视图时每次 ASOF JOIN 探测都会重算去重，耗时随商品数平方增长
+        """
+        if self.file_format == 'parquet':
+            if not self.parquet_path.exists():
+                raise FileNotFoundError(f"Price file missing: {self.parquet_path}")
+            source = f"""
+                SELECT product_id, CAST(date AS DATE) AS date, price, file_row_number AS row_order
+                FROM read_parquet({_quote(self.parquet_path)}, file_row_number = true)
+                WHERE CAST(date AS DATE) BETWEEN '{start_date}' AND '{end_date}'
+            """
+        else:
+            files = []
+            for target_date in pd.date_range(start_date, end_date, freq='D').date:
+                file_path = self.prices_dir / f"daily_prices_{target_date.strftime('%Y%m%d')}.csv"
+                if not file_path.exists():
+                    raise FileNotFoundError(f"Price file missing: {file_path}")
+                files.append(_quote(file_path))
+            source = f"""
+                SELECT
+                    product_id,
+                    CAST(strptime(regexp_extract(filename, 'daily_prices_([0-9]{{8}})', 1), '%Y%m%d') AS DATE) AS date,
+                    price,
+                    -- 无排序的 row_number() 按扫描顺序流式编号，即文件列表顺序 + 文件内行序
+                    row_number() OVER () AS row_order
+                FROM read_csv(
+                    [{', '.join(files)}], header = true, filename = true, union_by_name = true,
+                    types = {{'product_id': 'BIGINT', 'price': 'DOUBLE'}}
+                )
+            """
+        self.connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE price AS
+            SELECT product_id, date, arg_min(price, row_order) AS price
+            FROM ({source}) AS raw_price
+            WHERE price IS NOT NULL
+            GROUP BY product_id, date
+        """)
+
+    def _query(self, sql: str, start_date: date, end_date: date) -> pd.DataFrame:
+        self._create_price_table(start_date, end_date)
+        result = self.connection.execute(sql.format(start_date=start_date, end_date=end_date)).df()
+        result['date'] = pd.to_datetime(result['date']).dt.date
+        return result
+
+    def compute_leaf_index_matrix(self, start_date: date, end_date: date) -> pd.DataFrame:
+        """计算叶子类别每日指数矩阵（行为日期、列为叶子 category_id），与 PandasCPICalculator 相同"""
+        result = self._query(LEAF_INDEX_SQL, start_date, end_date)
+        all_dates = pd.date_range(start_date, end_date, freq='D').date
+        leaf_index = result.pivot(index='date', columns='category_id', values='price_index').reindex(
+            index=all_dates, columns=self._leaf_categories()['category_id'].to_numpy()
+        )
+        return leaf_index.astype('float64').rename_axis(index=None, columns=None)
+
+    def compute_daily_cpi(self, start_date: date, end_date: date) -> pd.Series:
+        """计算每日CPI数组（相对基期的累计变化），加权汇总在 SQL 中完成"""
+        result = self._query(CPI_SQL, start_date, end_date)
+        all_dates = pd.date_range(start_date, end_date, freq='D').date
+
+        # 当日没有任何有效类别时与 pandas 引擎一致，取 0
+        cpi_series = result.set_index('date')['cpi'].reindex(all_dates).fillna(0.0)
+        return cpi_series.rename_axis(None).rename(None).astype('float64').round(4)
+
+    def close(self) -> None:
+        self.connection.close()
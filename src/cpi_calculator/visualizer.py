@@ -1,5 +1,3 @@
-import matplotlib.pyplot as plt
-import plotly.express as px
 import pandas as pd
 from pathlib import Path
 import logging
@@ -30,4 +28,29 @@ class Visualizer:
 
         self.logger.info(f"图表已保存至: {output_path}")
 
-
+    def _validate_data(self, df: pd.DataFrame, required_columns: list) -> None:
+        missing = [col for col in required_columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"缺少必要字段: {missing}")
+
+    def _matplotlib_trend(self, cpi_df: pd.DataFrame, output_path: str) -> None:
+        from matplotlib.figure import Figure  # 绘图引擎按需加载
+
+        fig = Figure(figsize=(12, 6))
+        ax = fig.subplots()
+        ax.plot(pd.to_datetime(cpi_df['date']), cpi_df['cpi_index'], color='steelblue')
+        ax.set_title('CPI Trend')
+        ax.grid(True)
+        fig.autofmt_xdate()
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        fig.savefig(output_path, bbox_inches='tight')
+
+    def _plotly_trend(self, cpi_df: pd.DataFrame, output_path: str) -> None:
+        import plotly.express as px  # 绘图引擎按需加载
+
+        fig = px.line(cpi_df, x='date', y='cpi_index', title='CPI Trend')
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        if str(output_path).endswith('.html'):
+            fig.write_html(output_path)
+        else:
+            fig.write_image(output_path)
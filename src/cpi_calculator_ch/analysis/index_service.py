@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from typing import Dict, List, NamedTuple, Optional, Union
+
+from analysis.price_index import PriceIndexCalculator
+from storage.async_connectors import AsyncClickHouseConnector
+
+
+class IndexConfig(NamedTuple):
+    method: str = 'cavallo'  # cavallo / tmall
+    base_mode: str = 'auto'
+    base_date: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.method}:{self.base_mode}" + (f":{self.base_date}" if self.base_date else "")
+
+
+class AsyncIndexService:
+    """
+    并发计算多组指数配置：每组配置借用连接池中的一个连接，在线程中运行 PriceIndexCalculator，
+    并发度受连接池大小限制
+    """
+
+    def __init__(self, ch: AsyncClickHouseConnector = None, use_item_keys: bool = False,
+                 save_results: bool = False):
+        self.logger = logging.getLogger('index_service')
+        self.ch = ch or AsyncClickHouseConnector()
+        self.use_item_keys = use_item_keys
+        self.save_results = save_results
+
+    async def compute(self, config: IndexConfig) -> List[Dict[str, Union[str, float]]]:
+        """计算单组配置的指数序列"""
+        if config.method not in ('cavallo', 'tmall'):
+            raise ValueError(f"不支持的指数方法: {config.method}")
+
+        async with self.ch.connection() as connector:
+            calculator = PriceIndexCalculator(
+                connector,
+                save_results=self.save_results,
+                use_item_keys=self.use_item_keys
+            )
+            method = getattr(calculator, f"calculate_{config.method}_index")
+            return await asyncio.to_thread(method, config.base_mode, config.base_date)
+
+    async def compute_many(self, configs: List[IndexConfig]) -> Dict[str, List[Dict[str, Union[str, float]]]]:
+        """并发计算多组配置，返回 {配置键: 指数序列}"""
+        results = await asyncio.gather(*(self.compute(config) for config in configs))
+        return {config.key: result for config, result in zip(configs, results)}
@@ -1,16 +1,60 @@
 import logging
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional, Union
 from storage.clickhouse_connector import ClickHouseConnector
+from storage.query_registry import QueryRegistry
+from analysis.queries import INDEX_QUERIES
+from monitoring.spans import span
 from pathlib import Path
 import os
 
 
+def _sweep(groups: np.ndarray, starts: np.ndarray, ends: np.ndarray, values: np.ndarray,
+           n_groups: int, n_days: int) -> np.ndarray:
+    """差分数组累加：每个区段的 value 计入所属分组 [start, end) 内的每一天，返回 分组 × 日期 的合计"""
+    width = n_days + 1
+    flat = np.concatenate([groups * width + starts, groups * width + ends])
+    diff = np.bincount(flat, weights=np.concatenate([values, -values]), minlength=n_groups * width)
+    return np.cumsum(diff.reshape(n_groups, width), axis=1)[:, :-1]
+
+
 class PriceIndexCalculator:
-    def __init__(self, ch_connector: ClickHouseConnector = None):
+    def __init__(
+            self,
+            ch_connector: ClickHouseConnector = None,
+            save_results: bool = True,
+            use_item_keys: bool = False,
+            queries: QueryRegistry = INDEX_QUERIES,
+            output_dir: str = "data",
+            price_format: str = "daily",
+            as_of: Optional[str] = None
+    ):
+        """
+        参数:
+            ch_connector: ClickHouse 连接（或实现相同接口的替身）
+            save_results: 是否把计算结果写入 data/ 下的 CSV
+            use_item_keys: 表结构为字典编码模式（initialize_tables(item_keys=True)）时，
+                按 UInt32 的 item_key 关联和查找基期价格
+            queries: 具名查询注册表，默认使用 analysis.queries.INDEX_QUERIES
+            output_dir: 指数 CSV 的输出目录
+            price_format: 'daily' 读取每日全量的 price 表；'changes' 读取变更日志表 price_change，
+                每条记录的价格沿用到同商品下一条记录前一天，按价格区段以差分数组直接累加出每日指数，
+                结果与读取 price 表相同，但不在客户端展开 商品 × 日期 的每日价格
+            as_of: 变更日志格式下指数的截止日期(YYYY-MM-DD)，默认取最后一条变更的日期
+        """
+        if price_format not in ('daily', 'changes'):
+            raise ValueError(f"不支持的价格格式: {price_format}")
         self.logger = logging.getLogger('price_index')
         self.ch = ch_connector or ClickHouseConnector()
+        self.save_results = save_results
+        self.use_item_keys = use_item_keys
+        self.queries = queries
+        self.output_dir = Path(output_dir)
+        self.price_format = price_format
+        self.as_of = as_of
+        self._log_levels: Optional[pd.DataFrame] = None
 
     def calculate_cavallo_index(
             self,
@@ -33,65 +77,77 @@ class PriceIndexCalculator:
         try:
             self.logger.info(f"Calculating Cavallo index with mode: {base_mode}")
 
+            if self.price_format == 'changes':
+                results = self._cavallo_from_changes(base_mode, base_date)
+                if results is None:
+                    self.logger.warning("No price data available for Cavallo index")
+                    return []
+                if self.save_results:
+                    self._save_indices_to_csv(results, "cavallo_index.csv")
+                return results
+
             # 获取所有价格数据
             price_data = self._get_all_price_data()
             if not price_data:
                 self.logger.warning("No price data available for Cavallo index")
                 return []
 
-            df = pd.DataFrame(price_data)
-            df['date'] = pd.to_datetime(df['date'])
+            with span('price_index.cavallo', base_mode=base_mode) as s:
+                df = pd.DataFrame(price_data)
+                df['date'] = pd.to_datetime(df['date'])
 
-            results = []
+                results = []
 
-            if base_mode == 'auto':
-                # 模式1：整个周期使用首日作为基期
-                base_date = df['date'].min()
-                base_prices = self._get_base_prices(df, base_date)
-
-                for date, group in df.groupby('date'):
-                    index_value = self._calculate_geo_mean_index(group, base_prices)
-                    results.append({
-                        'date': date.strftime('%Y-%m-%d'),
-                        'index': index_value,
-                        'base_date': base_date.strftime('%Y-%m-%d')
-                    })
+                if base_mode == 'auto':
+                    # 模式1：整个周期使用首日作为基期
+                    base_date = df['date'].min()
+                    base_prices = self._get_base_prices(df, base_date)
 
-            elif base_mode == 'monthly':
-                # 模式2：每月首日作为新基期
-                monthly_bases = self._get_monthly_base_dates(df)
+                    for date, group in df.groupby('date'):
+                        index_value = self._calculate_geo_mean_index(group, base_prices)
+                        results.append({
+                            'date': date.strftime('%Y-%m-%d'),
+                            'index': index_value,
+                            'base_date': base_date.strftime('%Y-%m-%d')
+                        })
+
+                elif base_mode == 'monthly':
+                    # 模式2：每月首日作为新基期
+                    monthly_bases = self._get_monthly_base_dates(df)
+
+                    for base_start in monthly_bases:
+                        base_prices = self._get_base_prices(df, base_start)
+                        month_end = (base_start + pd.offsets.MonthEnd(0)).date()
+
+                        period_df = df[df['date'] >= base_start]
+                        for date, group in period_df.groupby('date'):
+                            if pd.to_datetime(date).date() > month_end:
+                                continue
 
-                for base_start in monthly_bases:
-                    base_prices = self._get_base_prices(df, base_start)
-                    month_end = (base_start + pd.offsets.MonthEnd(0)).date()
+                            index_value = self._calculate_geo_mean_index(group, base_prices)
+                            results.append({
+                                'date': date.strftime('%Y-%m-%d'),
+                                'index': index_value,
+                                'base_date': base_start.strftime('%Y-%m-%d')
+                            })
 
-                    period_df = df[df['date'] >= base_start]
-                    for date, group in period_df.groupby('date'):
-                        if pd.to_datetime(date).date() > month_end:
-                            continue
+                elif base_mode == 'fixed' and base_date:
+                    # 模式3：固定基期
+                    base_date = pd.to_datetime(base_date)
+                    base_prices = self._get_base_prices(df, base_date)
 
+                    for date, group in df.groupby('date'):
                         index_value = self._calculate_geo_mean_index(group, base_prices)
                         results.append({
                             'date': date.strftime('%Y-%m-%d'),
                             'index': index_value,
-                            'base_date': base_start.strftime('%Y-%m-%d')
+                            'base_date': base_date.strftime('%Y-%m-%d')
                         })
-
-            elif base_mode == 'fixed' and base_date:
-                # 模式3：固定基期
-                base_date = pd.to_datetime(base_date)
-                base_prices = self._get_base_prices(df, base_date)
-
-                for date, group in df.groupby('date'):
-                    index_value = self._calculate_geo_mean_index(group, base_prices)
-                    results.append({
-                        'date': date.strftime('%Y-%m-%d'),
-                        'index': index_value,
-                        'base_date': base_date.strftime('%Y-%m-%d')
-                    })
+                s.set(rows_in=len(df), rows_out=len(results))
 
             # 保存指数数据
-            self._save_indices_to_csv(results, "cavallo_index.csv")
+            if self.save_results:
+                self._save_indices_to_csv(results, "cavallo_index.csv")
 
             return sorted(results, key=lambda x: x['date'])
 
@@ -132,59 +188,62 @@ class PriceIndexCalculator:
                 self.logger.warning("No daily aggregated data found")
                 return []
 
-            df = pd.DataFrame(daily_data)
-            df['date'] = pd.to_datetime(df['date'])
+            with span('price_index.tmall', base_mode=base_mode) as s:
+                df = pd.DataFrame(daily_data)
+                df['date'] = pd.to_datetime(df['date'])
 
-            results = []
+                results = []
 
-            if base_mode == 'auto':
-                # 模式1：整个周期使用首日作为基期
-                base_date = df['date'].min()
-                base_values = self._get_base_category_values(df, base_date)
-
-                for date, group in df.groupby('date'):
-                    index_value = self._calculate_weighted_index(group, base_values, weights)
-                    results.append({
-                        'date': date.strftime('%Y-%m-%d'),
-                        'index': index_value,
-                        'base_date': base_date.strftime('%Y-%m-%d')
-                    })
+                if base_mode == 'auto':
+                    # 模式1：整个周期使用首日作为基期
+                    base_date = df['date'].min()
+                    base_values = self._get_base_category_values(df, base_date)
 
-            elif base_mode == 'monthly':
-                # 模式2：每月首日作为新基期
-                monthly_bases = self._get_monthly_base_dates(df)
+                    for date, group in df.groupby('date'):
+                        index_value = self._calculate_weighted_index(group, base_values, weights)
+                        results.append({
+                            'date': date.strftime('%Y-%m-%d'),
+                            'index': index_value,
+                            'base_date': base_date.strftime('%Y-%m-%d')
+                        })
+
+                elif base_mode == 'monthly':
+                    # 模式2：每月首日作为新基期
+                    monthly_bases = self._get_monthly_base_dates(df)
+
+                    for base_start in monthly_bases:
+                        base_values = self._get_base_category_values(df, base_start)
+                        month_end = (base_start + pd.offsets.MonthEnd(0)).date()
 
-                for base_start in monthly_bases:
-                    base_values = self._get_base_category_values(df, base_start)
-                    month_end = (base_start + pd.offsets.MonthEnd(0)).date()
+                        period_df = df[df['date'] >= base_start]
+                        for date, group in period_df.groupby('date'):
+                            if pd.to_datetime(date).date() > month_end:
+                                continue
 
-                    period_df = df[df['date'] >= base_start]
-                    for date, group in period_df.groupby('date'):
-                        if pd.to_datetime(date).date() > month_end:
-                            continue
+                            index_value = self._calculate_weighted_index(group, base_values, weights)
+                            results.append({
+                                'date': date.strftime('%Y-%m-%d'),
+                                'index': index_value,
+                                'base_date': base_start.strftime('%Y-%m-%d')
+                            })
 
+                elif base_mode == 'fixed' and base_date:
+                    # 模式3：固定基期
+                    base_date = pd.to_datetime(base_date)
+                    base_values = self._get_base_category_values(df, base_date)
+
+                    for date, group in df.groupby('date'):
                         index_value = self._calculate_weighted_index(group, base_values, weights)
                         results.append({
                             'date': date.strftime('%Y-%m-%d'),
                             'index': index_value,
-                            'base_date': base_start.strftime('%Y-%m-%d')
+                            'base_date': base_date.strftime('%Y-%m-%d')
                         })
-
-            elif base_mode == 'fixed' and base_date:
-                # 模式3：固定基期
-                base_date = pd.to_datetime(base_date)
-                base_values = self._get_base_category_values(df, base_date)
-
-                for date, group in df.groupby('date'):
-                    index_value = self._calculate_weighted_index(group, base_values, weights)
-                    results.append({
-                        'date': date.strftime('%Y-%m-%d'),
-                        'index': index_value,
-                        'base_date': base_date.strftime('%Y-%m-%d')
-                    })
+                s.set(rows_in=len(df), rows_out=len(results))
 
             # 保存指数数据
-            self._save_indices_to_csv(results, "tmall_index.csv")
+            if self.save_results:
+                self._save_indices_to_csv(results, "tmall_index.csv")
 
             return sorted(results, key=lambda x: x['date'])
 
@@ -192,6 +251,63 @@ class PriceIndexCalculator:
             self.logger.error(f"Failed to calculate Tmall index: {str(e)}", exc_info=True)
             return []
 
+    def build_log_levels(self) -> pd.DataFrame:
+        """
+        预计算各分类的累计对数价格水平（日期 × category_id，分类当天没有价格为 NaN），
+        结果缓存在实例上；数据更新后需重新调用
+
+            L(c, t) = L(c, t-1) + mean_{i 在上一日期和 t 都有价格} [ln p(i, t) - ln p(i, t-1)]
+
+        任意基期 b、报告期 r 的分类指数为 exp(L(c, r) - L(c, b))。每日环比由 category_daily_links
+        在 ClickHouse 中按商品窗口计算，客户端只累加 日期 × 分类 的汇总，不取回价格明细
+        """
+        if self.price_format == 'changes':
+            self._log_levels = self._log_levels_from_changes()
+            return self._log_levels
+
+        with span('price_index.log_levels') as s:
+            links = pd.DataFrame(
+                self._run_query('category_daily_links', keyed=True),
+                columns=['date', 'category_id', 'link', 'item_count']
+            )
+            links['date'] = pd.to_datetime(links['date'])
+            link_table = links.pivot(index='date', columns='category_id', values='link').sort_index()
+            present = links.pivot(index='date', columns='category_id', values='item_count').sort_index().notna()
+
+            # 首日及没有匹配商品的日期环比记为 0，水平沿用前一天
+            self._log_levels = link_table.astype(float).fillna(0.0).cumsum().where(present)
+            self._log_levels.columns.name = None
+            s.set(rows_in=len(links), rows_out=self._log_levels.size)
+        return self._log_levels
+
+    def calculate_chained_index(
+            self,
+            base_date: str,
+            report_date: Optional[str] = None
+    ) -> List[Dict[str, Union[str, float]]]:
+        """
+        按分类权重加权的链式几何平均指数，基期、报告期任意，只查累计对数水平表，不重读价格
+
+        参数:
+            base_date: 基期(YYYY-MM-DD)
+            report_date: 只计算该报告期，默认输出全部日期
+        返回:
+            [{'date': '2025-01-01', 'index': 100.0, 'base_date': '2025-01-01'}, ...]
+        """
+        levels = self._log_levels if self._log_levels is not None else self.build_log_levels()
+        weights = pd.Series(self._get_category_weights(), dtype=float).reindex(levels.columns)
+        base = pd.Timestamp(base_date)
+        report_levels = levels.loc[[pd.Timestamp(report_date)]] if report_date else levels
+
+        # 按当日有指数的分类的权重之和归一化
+        category_index = np.exp(report_levels - levels.loc[base])
+        weighted = category_index.mul(weights, axis=1).sum(axis=1, min_count=1)
+        series = weighted / category_index.notna().mul(weights.fillna(0), axis=1).sum(axis=1) * 100
+        return [
+            {'date': date.strftime('%Y-%m-%d'), 'index': round(float(value), 4), 'base_date': base.strftime('%Y-%m-%d')}
+            for date, value in series.items()
+        ]
+
     def _save_indices_to_csv(self, indices: List[Dict], filename: str) -> bool:
         """
         将指数数据保存到CSV文件
@@ -206,9 +322,9 @@ class PriceIndexCalculator:
                 self.logger.warning(f"No indices to save for {filename}")
                 return False
 
-            # 确保data目录存在
-            data_dir = Path("data")
-            data_dir.mkdir(exist_ok=True)
+            # 确保输出目录存在
+            data_dir = self.output_dir
+            data_dir.mkdir(parents=True, exist_ok=True)
 
             # 转换为DataFrame
             df = pd.DataFrame(indices)
@@ -224,45 +340,219 @@ class PriceIndexCalculator:
             return False
 
     # [其余工具方法保持不变...]
+    def _run_query(self, name: str, keyed: bool = False, **params) -> List[Dict]:
+        """执行 analysis.queries 中登记的具名查询，keyed 查询按当前键模式选择版本"""
+        if keyed and self.use_item_keys:
+            name = f"{name}_keyed"
+        return self.queries.run(self.ch, name, **params)
+
+    def query_stats(self) -> Dict[str, Dict[str, float]]:
+        """各指数查询的调用次数与耗时统计"""
+        return self.queries.stats()
+
     def _get_all_price_data(self) -> List[Dict]:
-        """获取所有价格数据"""
-        query = """
-                SELECT toDate(date) as date,
-                item_id,
-                price
-                FROM price
-                ORDER BY date \
-                """
-        return self.ch.execute_query(query)
+        """获取所有价格数据（每日全量格式）"""
+        return self._run_query('all_prices', keyed=True)
 
     def _get_daily_category_data(self) -> List[Dict]:
-        """获取每日分类聚合数据（移除注释）"""
-        query = """
-                SELECT toDate(p.date) as date,
-                i.category_id as category_id,  -- 使用SQL标准注释
-                c.name as category_name,
-                c.weight,
-                avg(p.price) as avg_price,
-                count(p.item_id) as item_count
-                FROM price p
-                    JOIN item i \
-                ON p.item_id = i.item_id
-                    JOIN category c ON i.category_id = c.category_id
-                GROUP BY p.date, i.category_id, c.name, c.weight
-                ORDER BY p.date \
-                """
-        return self.ch.execute_query(query)
+        """获取每日分类聚合数据"""
+        if self.price_format == 'changes':
+            return self._daily_category_from_changes()
+        return self._run_query('daily_category', keyed=True)
+
+    def _change_intervals(self) -> Tuple[pd.DataFrame, pd.DatetimeIndex]:
+        """
+        把变更日志整理为有价区段，不展开为每日价格
+
+        记录按 (商品, 生效日) 排序，每条非空记录的价格覆盖 [生效日, 同商品下一条记录) 区间，
+        商品最后一条记录覆盖到截止日期；空价格（出样）记录不产生区段
+        返回:
+            (区段, 日期轴)
+            区段: 商品键、price、start、end（相对日期轴首日的偏移，end 不含）、
+                previous（紧接的同商品上一个有价区段的价格，中间有出样或是商品首条记录时为 NaN）
+        """
+        key = 'item_key' if self.use_item_keys else 'item_id'
+        events = pd.DataFrame(self._run_query('price_changes', keyed=True), columns=['date', key, 'price'])
+        events['date'] = pd.to_datetime(events['date'])
+        events = events.sort_values([key, 'date'], kind='stable').drop_duplicates([key, 'date'], keep='last')
+        if self.as_of:
+            events = events[events['date'] <= pd.Timestamp(self.as_of)]
+        if events.empty:
+            return pd.DataFrame(columns=[key, 'price', 'start', 'end', 'previous']), pd.DatetimeIndex([])
+
+        with span('price_index.change_intervals') as s:
+            origin = events['date'].min()
+            end = pd.Timestamp(self.as_of) if self.as_of else events['date'].max()
+            n_days = (end - origin).days + 1
+
+            keys = events[key].to_numpy()
+            starts = (events['date'] - origin).dt.days.to_numpy(dtype=np.int64)
+            last_of_item = np.append(keys[1:] != keys[:-1], True)
+            ends = np.append(starts[1:], n_days)
+            ends[last_of_item] = n_days
+
+            price = events['price'].to_numpy(dtype=float)
+            previous = np.append(np.nan, price[:-1])
+            previous[np.append(True, last_of_item[:-1])] = np.nan
+
+            intervals = pd.DataFrame({
+                key: keys,
+                'price': price,
+                'start': starts,
+                'end': ends,
+                'previous': previous
+            })[~np.isnan(price)].reset_index(drop=True)
+            s.set(rows_in=len(events), rows_out=len(intervals))
+        return intervals, pd.date_range(origin, periods=n_days, freq='D')
+
+    def _interval_categories(self, intervals: pd.DataFrame, unique: bool = False) -> Tuple[pd.DataFrame, pd.Index]:
+        """
+        为区段附上分类编号 code（按 category_id 排序），没有分类的商品被忽略
+        unique=True 时每个商品只取 item 表中的第一条分类
+        """
+        key = 'item_key' if self.use_item_keys else 'item_id'
+        categories = pd.DataFrame(self._run_query('item_categories', keyed=True), columns=[key, 'category_id'])
+        if unique:
+            categories = categories.drop_duplicates(key)
+        merged = intervals.merge(categories, on=key)
+        codes, category_ids = pd.factorize(merged['category_id'], sort=True)
+        return merged.assign(code=codes.astype(np.int64)), pd.Index(category_ids)
+
+    def _daily_category_from_changes(self) -> List[Dict]:
+        """变更日志格式下每日各分类的平均价格和商品数，与对每日价格分组聚合的结果相同"""
+        intervals, dates = self._change_intervals()
+        if intervals.empty:
+            return []
+
+        with span('price_index.daily_category_changes') as s:
+            merged, category_ids = self._interval_categories(intervals)
+            args = (merged['code'].to_numpy(), merged['start'].to_numpy(), merged['end'].to_numpy())
+            price_sum = _sweep(*args, merged['price'].to_numpy(), len(category_ids), len(dates))
+            count = np.rint(_sweep(*args, np.ones(len(merged)), len(category_ids), len(dates))).astype(np.int64)
+
+            # 按日期、分类排序输出当天有价格的 (日期, 分类)
+            day, code = np.nonzero(count.T)
+            grouped = pd.DataFrame({
+                'date': dates[day],
+                'category_id': category_ids[code],
+                'avg_price': price_sum[code, day] / count[code, day],
+                'item_count': count[code, day]
+            })
+            s.set(rows_in=len(intervals), rows_out=len(grouped))
+        return grouped.to_dict('records')
+
+    def _cavallo_from_changes(self, base_mode: str, base_date: Optional[str]) -> Optional[List[Dict]]:
+        """
+        变更日志格式下的 Cavallo 指数：每个基期先取覆盖基期的区段作为各商品基期价格，
+        再把区段的对数价格比按差分数组累加到每一天，结果与按每日价格分组计算相同
+        没有价格数据时返回 None
+        """
+        intervals, dates = self._change_intervals()
+        if intervals.empty:
+            return None
+
+        key = 'item_key' if self.use_item_keys else 'item_id'
+        with span('price_index.cavallo', base_mode=base_mode, price_format='changes') as s:
+            keys = intervals[key].to_numpy()
+            prices = intervals['price'].to_numpy()
+            starts, ends = intervals['start'].to_numpy(), intervals['end'].to_numpy()
+            n_days = len(dates)
+            groups = np.zeros(len(intervals), dtype=np.int64)
+
+            # 至少有一个商品有价格的日期，即每日价格表中出现的日期
+            present = np.flatnonzero(_sweep(groups, starts, ends, np.ones(len(intervals)), 1, n_days)[0] > 0.5)
+
+            def index_from(base_day: int) -> np.ndarray:
+                covering = (starts <= base_day) & (ends > base_day)
+                base = pd.Series(prices[covering], index=keys[covering]).reindex(keys).to_numpy()
+                valid = base > 0  # NaN 比较结果为 False，基期缺失的商品自动排除
+                args = (groups[valid], starts[valid], ends[valid])
+                log_sum = _sweep(*args, np.log(prices[valid] / base[valid]), 1, n_days)[0]
+                count = _sweep(*args, np.ones(valid.sum()), 1, n_days)[0]
+                with np.errstate(invalid='ignore'):
+                    return np.where(count > 0.5, np.round(np.exp(log_sum / count) * 100, 4), 0.0)
+
+            # [(基期偏移, 报告日偏移)]
+            periods = []
+            if base_mode == 'auto':
+                periods.append((present[0], present))
+            elif base_mode == 'monthly':
+                months = dates[present].to_period('M')
+                for month in months.unique():
+                    days = present[months == month]
+                    periods.append((days[0], days))
+            elif base_mode == 'fixed' and base_date:
+                periods.append(((pd.Timestamp(base_date) - dates[0]).days, present))
+
+            results = []
+            for base_day, days in periods:
+                index = index_from(base_day)
+                base_label = (dates[0] + pd.Timedelta(days=int(base_day))).strftime('%Y-%m-%d')
+                results.extend(
+                    {'date': dates[day].strftime('%Y-%m-%d'), 'index': float(index[day]), 'base_date': base_label}
+                    for day in days
+                )
+            s.set(rows_in=len(intervals), rows_out=len(results))
+        return sorted(results, key=lambda x: x['date'])
+
+    def _log_levels_from_changes(self) -> pd.DataFrame:
+        """
+        变更日志格式下的分类累计对数水平（定义见 build_log_levels）：
+        商品只在变价日产生非零环比，当日匹配商品数为前后两天都有价格的商品数，
+        二者都按区段累加，不构建 商品 × 日期 的价格透视表
+        """
+        intervals, dates = self._change_intervals()
+        # 与透视表路径一致：价格 <= 0 视为无价格，之后的区段也不与它衔接
+        intervals = intervals[intervals['price'] > 0]
+        merged, category_ids = self._interval_categories(intervals, unique=True)
+
+        with span('price_index.log_levels', price_format='changes') as s:
+            n_categories, n_days = len(category_ids), len(dates)
+            codes = merged['code'].to_numpy()
+            starts, ends = merged['start'].to_numpy(), merged['end'].to_numpy()
+            linked = (merged['previous'] > 0).to_numpy()
+
+            present = _sweep(codes, starts, ends, np.ones(len(merged)), n_categories, n_days) > 0.5
+            # 区段首日只有紧接上一区段时才算前后两天都有价格
+            matched = _sweep(codes, starts + ~linked, ends, np.ones(len(merged)), n_categories, n_days)
+
+            # 变价日的对数价格变动，计入该日的环比合计
+            change = np.log(merged['price'].to_numpy()[linked] / merged['previous'].to_numpy()[linked])
+            link_sum = np.bincount(codes[linked] * n_days + starts[linked], weights=change,
+                                   minlength=n_categories * n_days).reshape(n_categories, n_days)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                links = np.where(matched > 0.5, link_sum / matched, np.nan)
+            levels = np.zeros((n_categories, n_days))
+            levels[:, 1:] = np.nancumsum(links[:, 1:], axis=1)
+            levels[~present] = np.nan
+
+            # 与透视表一致，只保留有价格的日期
+            any_present = present.any(axis=0)
+            s.set(rows_in=len(merged), rows_out=int(any_present.sum()) * n_categories)
+        return pd.DataFrame(levels.T[any_present], index=pd.Index(dates[any_present], name='date'),
+                            columns=category_ids)
 
     def _get_category_weights(self) -> Dict[int, float]:
         """获取分类权重字典 {category_id: weight}"""
-        query = "SELECT category_id, weight FROM category"
-        rows = self.ch.execute_query(query)
+        rows = self._run_query('category_weights')
         return {row['category_id']: row['weight'] for row in rows}
 
-    def _get_base_prices(self, df: pd.DataFrame, base_date: datetime) -> Dict[str, float]:
-        """获取基期价格字典 {item_id: price}"""
+    def _get_base_prices(self, df: pd.DataFrame, base_date: datetime) -> Union[Dict[str, float], np.ndarray]:
+        """
+        获取基期价格
+        返回:
+            字符串键模式为 {item_id: price}；
+            字典编码模式为按 item_key 下标的价格数组，基期缺失的商品为 NaN
+        """
         base_df = df[df['date'] == base_date]
-        return dict(zip(base_df['item_id'], base_df['price']))
+        if not self.use_item_keys:
+            return dict(zip(base_df['item_id'], base_df['price']))
+
+        size = int(df['item_key'].max()) + 1 if not df.empty else 0
+        base_prices = np.full(size, np.nan)
+        base_prices[base_df['item_key'].to_numpy(dtype=np.int64)] = base_df['price'].to_numpy(dtype=float)
+        return base_prices
 
     def _get_base_category_values(self, df: pd.DataFrame, base_date: datetime) -> Dict[int, float]:
         """获取基期分类平均价格 {category_id: avg_price}"""
@@ -275,8 +565,17 @@ class PriceIndexCalculator:
 
     def _calculate_geo_mean_index(self,
                                   daily_group: pd.DataFrame,
-                                  base_prices: Dict[str, float]) -> float:
+                                  base_prices: Union[Dict[str, float], np.ndarray]) -> float:
         """计算几何平均指数"""
+        if isinstance(base_prices, np.ndarray):
+            # 字典编码模式：整数下标取基期价格，对数均值代替逐行连乘
+            base = base_prices[daily_group['item_key'].to_numpy(dtype=np.int64)]
+            valid = base > 0  # NaN 比较结果为 False，基期缺失的商品自动排除
+            if not valid.any():
+                return 0.0
+            ratios = daily_group['price'].to_numpy(dtype=float)[valid] / base[valid]
+            return round(float(np.exp(np.log(ratios).mean())) * 100, 4)
+
         ratios = []
         for _, row in daily_group.iterrows():
             if row['item_id'] in base_prices and base_prices[row['item_id']] > 0:
@@ -318,8 +617,9 @@ class PriceIndexCalculator:
         return all(checks)
 
     def _check_price_data_exists(self) -> bool:
-        """检查价格数据是否存在"""
-        count = self.ch.execute_query("SELECT count() FROM price")[0]['count()']
+        """检查价格数据是否存在（变更日志格式检查 price_change 表）"""
+        query = 'price_change_count' if self.price_format == 'changes' else 'price_count'
+        count = self._run_query(query)[0]['row_count']
         if count == 0:
             self.logger.error("No price data found in database")
             return False
@@ -340,14 +640,13 @@ class PriceIndexCalculator:
         return True
 
     def _check_base_date_coverage(self) -> bool:
-        """检查基期数据覆盖情况"""
-        earliest_date = self.ch.execute_query(
-            "SELECT toDate(min(date)) as min_date FROM price"
-        )[0]['min_date']
-
-        item_count = self.ch.execute_query(
-            f"SELECT count(DISTINCT item_id) FROM price WHERE date = '{earliest_date}'"
-        )[0]['count()']
+        """检查基期数据覆盖情况（变更日志格式按最早生效日入样的商品数）"""
+        if self.price_format == 'changes':
+            earliest_date = self._run_query('min_change_date')[0]['min_date']
+            item_count = self._run_query('items_on_change_date', keyed=True, day=earliest_date)[0]['item_count']
+        else:
+            earliest_date = self._run_query('min_price_date')[0]['min_date']
+            item_count = self._run_query('items_on_date', keyed=True, day=earliest_date)[0]['item_count']
 
         if item_count == 0:
             self.logger.error(f"No items found on base date {earliest_date}")
@@ -0,0 +1,90 @@
+from storage.query_registry import QueryRegistry
+
+# 指数计算用到的全部查询，只在此处定义一次；
+# 带 _keyed 后缀的版本用于字典编码模式（按 item_key 关联）
+INDEX_QUERIES = QueryRegistry()
+
+for _suffix, _key in (('', 'item_id'), ('_keyed', 'item_key')):
+    INDEX_QUERIES.register(f'all_prices{_suffix}', f"""
+        SELECT toDate(date) AS date,
+               {_key},
+               price
+        FROM price
+        ORDER BY date
+    """)
+
+    INDEX_QUERIES.register(f'daily_category{_suffix}', f"""
+        SELECT toDate(p.date) AS date,
+               i.category_id AS category_id,
+               c.name AS category_name,
+               c.weight,
+               avg(p.price) AS avg_price,
+               count(p.{_key}) AS item_count
+        FROM price p
+            JOIN item i ON p.{_key} = i.{_key}
+            JOIN category c ON i.category_id = c.category_id
+        GROUP BY p.date, i.category_id, c.name, c.weight
+        ORDER BY p.date
+    """)
+
+    INDEX_QUERIES.register(f'items_on_date{_suffix}', f"""
+        SELECT count(DISTINCT {_key}) AS item_count
+        FROM price
+        WHERE date = {{day:Date}}
+    """)
+
+    # 变更日志格式：按商品、生效日排序，由 PriceIndexCalculator 顺序扫描还原每日价格
+    INDEX_QUERIES.register(f'price_changes{_suffix}', f"""
+        SELECT toDate(effective_date) AS date,
+               {_key},
+               price
+        FROM price_change
+        ORDER BY {_key}, date
+    """)
+
+    # 变更日志格式的基期覆盖检查：最早生效日入样的商品数
+    INDEX_QUERIES.register(f'items_on_change_date{_suffix}', f"""
+        SELECT count(DISTINCT {_key}) AS item_count
+        FROM price_change
+        WHERE effective_date = {{day:Date}} AND price IS NOT NULL
+    """)
+
+    INDEX_QUERIES.register(f'item_categories{_suffix}', f"SELECT {_key}, category_id FROM item")
+
+    # 分类每日环比：商品在上一个有价格的日期和当天都有正价格时，计入 ln(p_t / p_t-1) 的类内均值；
+    # 商品内的前值由窗口函数取得，只返回 日期 × 分类 的汇总
+    INDEX_QUERIES.register(f'category_daily_links{_suffix}', f"""
+        SELECT l.date AS date,
+               l.category_id AS category_id,
+               avgIf(log(l.price / l.prev_price), l.prev_price > 0 AND l.prev_date = d.day_before) AS link,
+               count() AS item_count
+        FROM (
+            SELECT date, {_key}, category_id, price,
+                   lagInFrame(date) OVER w AS prev_date,
+                   lagInFrame(price) OVER w AS prev_price
+            FROM (
+                SELECT toDate(p.date) AS date, p.{_key} AS {_key}, i.category_id AS category_id, any(p.price) AS price
+                FROM price p
+                    JOIN item i ON p.{_key} = i.{_key}
+                WHERE p.price > 0
+                GROUP BY date, {_key}, category_id
+            )
+            WINDOW w AS (PARTITION BY {_key} ORDER BY date ROWS BETWEEN 1 PRECEDING AND CURRENT ROW)
+        ) l
+        JOIN (
+            SELECT date, lagInFrame(date) OVER (ORDER BY date ROWS BETWEEN 1 PRECEDING AND CURRENT ROW) AS day_before
+            FROM (SELECT DISTINCT toDate(date) AS date FROM price)
+        ) d ON l.date = d.date
+        GROUP BY l.date, l.category_id
+        ORDER BY date, category_id
+    """)
+
+INDEX_QUERIES.register('category_weights', "SELECT category_id, weight FROM category")
+
+INDEX_QUERIES.register('price_count', "SELECT count() AS row_count FROM price")
+
+INDEX_QUERIES.register('min_price_date', "SELECT toDate(min(date)) AS min_date FROM price")
+
+INDEX_QUERIES.register('price_change_count', "SELECT count() AS row_count FROM price_change")
+
+INDEX_QUERIES.register('min_change_date', "SELECT toDate(min(effective_date)) AS min_date FROM price_change")
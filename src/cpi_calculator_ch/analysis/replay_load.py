@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from analysis.price_index import PriceIndexCalculator
+from data_generator.price_generator import PriceGenerator, Product
+from processing.generator_stream import GeneratorStreamLoader
+
+
+class RateLimiter:
+    """按行数限速：累计写入行数不超过 rows_per_sec × 已用时间"""
+
+    def __init__(self, rows_per_sec: float):
+        self.rows_per_sec = rows_per_sec
+        self._start = None
+        self._sent = 0
+
+    def acquire(self, rows: int) -> None:
+        if self._start is None:
+            self._start = time.perf_counter()
+        if self.rows_per_sec > 0:
+            due = self._start + self._sent / self.rows_per_sec
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self._sent += rows
+
+
+def summarize_latencies(latencies: Sequence[float]) -> Dict[str, float]:
+    """延迟分位数统计（毫秒）"""
+    if not latencies:
+        return {'count': 0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    ms = np.asarray(latencies) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        'count': len(ms),
+        'p50': round(float(p50), 3),
+        'p90': round(float(p90), 3),
+        'p99': round(float(p99), 3),
+        'max': round(float(ms.max()), 3),
+    }
+
+
+class PriceReplayLoadTest:
+    """
+    持续写入压测：按目标速率回放 price_generator 模拟的逐日价格，
+    同时在后台循环计算 Cavallo / Tmall 指数，统计写入与指数查询的延迟分位数
+    """
+
+    def __init__(
+            self,
+            ch_connector,
+            rows_per_sec: float = 50_000,
+            block_rows: int = 5_000,
+            index_modes: Sequence[str] = ('cavallo', 'tmall'),
+            index_interval: float = 0.0
+    ):
+        """
+        参数:
+            ch_connector: ClickHouseConnector 或 InMemoryClickHouseConnector
+            rows_per_sec: 目标写入速率（行/秒），<=0 表示不限速
+            block_rows: 每次写入的行数
+            index_modes: 并发计算的指数类型
+            index_interval: 两次指数计算之间的间隔（秒）
+        """
+        self.logger = logging.getLogger('load_test')
+        self.ch = ch_connector
+        self.rows_per_sec = rows_per_sec
+        self.block_rows = block_rows
+        self.index_modes = list(index_modes)
+        self.index_interval = index_interval
+
+    def run(self, products: List[Product], days: int = 30, start_date: Optional[datetime] = None) -> Dict:
+        """执行压测并返回报告"""
+        start_date = start_date or datetime.now()
+        self.ch.initialize_tables()
+        self._insert_categories(products)
+
+        insert_latencies: List[float] = []
+        index_latencies: Dict[str, List[float]] = {mode: [] for mode in self.index_modes}
+        ingest_done = threading.Event()
+        errors: List[BaseException] = []
+
+        query_thread = threading.Thread(
+            target=self._query_loop, args=(index_latencies, ingest_done, errors), name='index-queries', daemon=True
+        )
+
+        loader = GeneratorStreamLoader(self.ch, block_rows=self.block_rows)
+        limiter = RateLimiter(self.rows_per_sec)
+        blocks = loader.iter_blocks(PriceGenerator(products).iter_days(start_date, days))
+
+        self.logger.info(f"Replaying {days} days at {self.rows_per_sec} rows/sec")
+        started = time.perf_counter()
+        query_thread.start()
+        try:
+            for block in blocks:
+                limiter.acquire(block.rows)
+                t0 = time.perf_counter()
+                self.ch.insert_columns('item', block.item)
+                self.ch.insert_columns('price', block.price)
+                insert_latencies.append(time.perf_counter() - t0)
+        finally:
+            ingest_done.set()
+            query_thread.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            raise errors[0]
+
+        report = {
+            'days': loader.stats['days'],
+            'rows': loader.stats['rows'],
+            'elapsed_sec': round(elapsed, 3),
+            'rows_per_sec': round(loader.stats['rows'] / elapsed, 1) if elapsed > 0 else 0.0,
+            'insert_latency_ms': summarize_latencies(insert_latencies),
+            'index_latency_ms': {mode: summarize_latencies(lat) for mode, lat in index_latencies.items()},
+        }
+        self.logger.info(f"Load test report: {report}")
+        return report
+
+    def _query_loop(self, latencies: Dict[str, List[float]], ingest_done: threading.Event,
+                    errors: List[BaseException]) -> None:
+        calculator = PriceIndexCalculator(self.ch, save_results=False)
+        calculate = {
+            'cavallo': calculator.calculate_cavallo_index,
+            'tmall': calculator.calculate_tmall_index,
+        }
+        try:
+            while not ingest_done.is_set():
+                for mode in self.index_modes:
+                    t0 = time.perf_counter()
+                    calculate[mode]()
+                    latencies[mode].append(time.perf_counter() - t0)
+                if self.index_interval > 0:
+                    ingest_done.wait(self.index_interval)
+        except BaseException as e:
+            errors.append(e)
+
+    def _insert_categories(self, products: List[Product]) -> None:
+        """按商品涉及的分类写入等权重分类表，供 Tmall 指数使用"""
+        category_ids = sorted({p.category_id for p in products})
+        weight = 1.0 / len(category_ids)
+        now = datetime.now().replace(microsecond=0)
+        self.ch.insert_category([(cat_id, str(cat_id), weight, now) for cat_id in category_ids])
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from data_generator.product_generator import Category, build_product_columns, columns_to_products
+
+    parser = argparse.ArgumentParser(description="按目标速率回放模拟价格并并发计算指数")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--products', type=int, default=20_000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--rows-per-sec', type=float, default=50_000)
+    parser.add_argument('--block-rows', type=int, default=5_000)
+    parser.add_argument('--in-process', action='store_true', help="使用进程内替身而不是 ClickHouse")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.in_process:
+        from storage.memory_connector import InMemoryClickHouseConnector
+        connector = InMemoryClickHouseConnector()
+    else:
+        from storage.clickhouse_connector import ClickHouseConnector
+        connector = ClickHouseConnector()
+
+    categories = [Category(i, f"类别{i}") for i in range(1, args.categories + 1)]
+    pool = columns_to_products(build_product_columns(categories, args.products))
+
+    load_test = PriceReplayLoadTest(connector, rows_per_sec=args.rows_per_sec, block_rows=args.block_rows)
+    print(json.dumps(load_test.run(pool, days=args.days), ensure_ascii=False, indent=2))
@@ -1,10 +1,8 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
 import logging
 from typing import Optional
 from datetime import datetime
-from matplotlib import rcParams
 import platform
 
 
@@ -16,6 +14,8 @@ class PriceIndexVisualizer:
 
     def _set_chinese_font(self):
         """配置中文字体支持"""
+        from matplotlib import rcParams  # matplotlib 在创建可视化器时才加载
+
         system = platform.system()
         font_map = {
             'Windows': 'SimHei',
@@ -40,13 +40,17 @@ class PriceIndexVisualizer:
 
     def plot_single_index(self, df: pd.DataFrame, title: str, save_path: Optional[str] = None):
         """绘制单个指数曲线"""
-        plt.figure(figsize=(12, 6))
-        plt.plot(df['date'], df['index'], 'b-', linewidth=2, label='价格指数')
+        # 使用面向对象的 Figure 接口而非 pyplot 全局状态，多个线程可同时绘图
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(12, 6))
+        ax = fig.subplots()
+        ax.plot(df['date'], df['index'], 'b-', linewidth=2, label='价格指数')
 
         base_date = pd.to_datetime(df['base_date'].iloc[0])
         base_value = df[df['date'] == base_date]['index'].values[0]
 
-        plt.scatter(
+        ax.scatter(
             base_date,
             base_value,
             color='r',
@@ -54,42 +58,43 @@ class PriceIndexVisualizer:
             label=f'基期 ({base_date.strftime("%Y-%m-%d")})'
         )
 
-        plt.title(f'{title}\n(基期: {base_date.strftime("%Y-%m-%d")}, 指数={base_value})')
-        plt.xlabel('日期')
-        plt.ylabel('价格指数')
-        plt.grid(True)
-        plt.legend()
+        ax.set_title(f'{title}\n(基期: {base_date.strftime("%Y-%m-%d")}, 指数={base_value})')
+        ax.set_xlabel('日期')
+        ax.set_ylabel('价格指数')
+        ax.grid(True)
+        ax.legend()
 
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            fig.savefig(save_path, dpi=300, bbox_inches='tight')
             self.logger.info(f"已保存图表到: {save_path}")
-        plt.close()
 
     def plot_dual_indices(self, cavallo_df: pd.DataFrame, tmall_df: pd.DataFrame, save_path: Optional[str] = None):
         """绘制双指数对比曲线"""
-        plt.figure(figsize=(14, 7))
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(14, 7))
+        ax = fig.subplots()
 
-        plt.plot(cavallo_df['date'], cavallo_df['index'], 'b-', linewidth=2, label='Cavallo指数')
-        plt.plot(tmall_df['date'], tmall_df['index'], 'g--', linewidth=2, label='Tmall指数')
+        ax.plot(cavallo_df['date'], cavallo_df['index'], 'b-', linewidth=2, label='Cavallo指数')
+        ax.plot(tmall_df['date'], tmall_df['index'], 'g--', linewidth=2, label='Tmall指数')
 
         base_date = pd.to_datetime(cavallo_df['base_date'].iloc[0])
-        plt.axvline(
+        ax.axvline(
             x=base_date,
             color='r',
             linestyle=':',
             label=f'共同基期 ({base_date.strftime("%Y-%m-%d")})'
         )
 
-        plt.title('价格指数对比\n(基期: {})'.format(base_date.strftime("%Y-%m-%d")))
-        plt.xlabel('日期')
-        plt.ylabel('价格指数')
-        plt.grid(True)
-        plt.legend()
+        ax.set_title('价格指数对比\n(基期: {})'.format(base_date.strftime("%Y-%m-%d")))
+        ax.set_xlabel('日期')
+        ax.set_ylabel('价格指数')
+        ax.grid(True)
+        ax.legend()
 
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            fig.savefig(save_path, dpi=300, bbox_inches='tight')
             self.logger.info(f"已保存对比图表到: {save_path}")
-        plt.close()
 
     def visualize_all(self):
         """可视化所有指数数据"""
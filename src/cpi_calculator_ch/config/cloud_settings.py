@@ -27,6 +27,13 @@ class CloudConfig:
     MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "localhost:9000")
     MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
     MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+    # ClickHouse 服务端访问 MinIO 的地址（容器部署时通常不是 localhost）
+    MINIO_SERVER_ENDPOINT = os.getenv("MINIO_SERVER_ENDPOINT", MINIO_ENDPOINT)
+
+    # ============ ClickHouse s3() 命名集合 ============
+    # 服务端预先定义（config.xml 或 CREATE NAMED COLLECTION），保存 access_key_id / secret_access_key
+    MINIO_S3_COLLECTION = os.getenv("MINIO_S3_COLLECTION", "minio_s3")
+    OSS_S3_COLLECTION = os.getenv("OSS_S3_COLLECTION", "oss_s3")
 
     # ============ ClickHouse配置 ============
     CH_HOST = os.getenv("CLICKHOUSE_HOST", "cc-bp143310x5229s4k4.public.clickhouse.ads.aliyuncs.com")
@@ -73,6 +80,22 @@ class CloudConfig:
             raise ValueError(f"配置验证失败: {', '.join(errors)}")
 
 
-# 初始化配置
-settings = CloudConfig()
-CloudConfig.validate()
+class _LazySettings:
+    """
+    配置访问代理：导入本模块时不做校验，首次读取任何配置项时才执行 CloudConfig.validate()，
+    只做本地计算、不连接云服务的任务不再因缺少凭证而无法导入
+    """
+
+    def __init__(self, config_cls):
+        self._config_cls = config_cls
+        self._validated = False
+
+    def __getattr__(self, name):
+        if not self._validated:
+            self._config_cls.validate()
+            self._validated = True
+        return getattr(self._config_cls, name)
+
+
+# 初始化配置（首次访问时校验）
+settings = _LazySettings(CloudConfig)
@@ -13,3 +13,27 @@ PRICE_SCHEMA = {
     "fields": ["date", "item_id", "price"],
     "types": ["Date", "String", "Float32"]
 }
+
+
+# 字典编码模式：item_key 为 item_dict 分配的 UInt32 代理键
+ITEM_KEYED_SCHEMA = {
+    "fields": ["item_key", "item_id", "category_id"],
+    "types": ["UInt32", "LowCardinality(String)", "UInt32"]
+}
+
+PRICE_KEYED_SCHEMA = {
+    "fields": ["date", "item_key", "item_id", "price"],
+    "types": ["Date", "UInt32", "LowCardinality(String)", "Float32"]
+}
+
+
+# 价格变更日志：只记录入样、变价和出样（price 为 NULL），价格在下一条记录前一直有效
+PRICE_CHANGE_SCHEMA = {
+    "fields": ["effective_date", "item_id", "price"],
+    "types": ["Date", "String", "Nullable(Float32)"]
+}
+
+PRICE_CHANGE_KEYED_SCHEMA = {
+    "fields": ["effective_date", "item_key", "item_id", "price"],
+    "types": ["Date", "UInt32", "LowCardinality(String)", "Nullable(Float32)"]
+}
@@ -0,0 +1,211 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+
+# 导出方式：空（默认，关闭）/ json / prometheus
+SPANS_EXPORTER = os.getenv("CPI_SPANS", "").strip().lower()
+# 输出文件：json 为逐行追加的 JSON Lines（为空则写入日志），prometheus 为文本格式快照
+SPANS_PATH = os.getenv("CPI_SPANS_PATH", "")
+
+
+class Span:
+    """
+    一次计时区间：记录墙钟耗时、输入/输出行数、传输字节数及附加属性
+    在 with 块内通过 set() 补充统计值
+    """
+
+    __slots__ = ('name', 'attrs', 'rows_in', 'rows_out', 'bytes', '_exporter', '_start', '_started_at')
+
+    def __init__(self, name: str, attrs: Dict, exporter):
+        self.name = name
+        self.attrs = attrs
+        self._exporter = exporter
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes = 0
+
+    def set(self, rows_in: int = None, rows_out: int = None, bytes: int = None, **attrs) -> None:
+        if rows_in is not None:
+            self.rows_in = int(rows_in)
+        if rows_out is not None:
+            self.rows_out = int(rows_out)
+        if bytes is not None:
+            self.bytes = int(bytes)
+        if attrs:
+            self.attrs.update(attrs)
+
+    def __enter__(self) -> 'Span':
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self._exporter.export(self, elapsed)
+        return False
+
+
+class _NoopSpan:
+    """关闭时使用的空区间，所有操作均为空操作"""
+
+    __slots__ = ()
+
+    def set(self, *args, **kwargs) -> None:
+        pass
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class JsonLinesExporter:
+    """每个区间结束时输出一行 JSON"""
+
+    def __init__(self, path: str = ""):
+        self.logger = logging.getLogger('spans')
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span, elapsed: float) -> None:
+        record = {
+            'span': span.name,
+            'start': datetime.fromtimestamp(span._started_at).isoformat(timespec='milliseconds'),
+            'wall_ms': round(elapsed * 1000, 3),
+            'rows_in': span.rows_in,
+            'rows_out': span.rows_out,
+            'bytes': span.bytes,
+            'thread': threading.current_thread().name,
+            **span.attrs
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        if not self.path:
+            self.logger.info(line)
+            return
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def flush(self) -> None:
+        pass
+
+
+class PrometheusExporter:
+    """
+    按区间名累计调用次数、耗时、行数和字节数，
+    以 Prometheus 文本格式写入文件（供 node_exporter textfile collector 采集）
+    """
+
+    METRICS = (
+        ('calls', 'cpi_span_calls_total', '区间调用次数'),
+        ('seconds', 'cpi_span_seconds_total', '区间累计墙钟耗时（秒）'),
+        ('rows_in', 'cpi_span_rows_in_total', '区间累计输入行数'),
+        ('rows_out', 'cpi_span_rows_out_total', '区间累计输出行数'),
+        ('bytes', 'cpi_span_bytes_total', '区间累计传输字节数'),
+    )
+
+    def __init__(self, path: str = "", flush_interval: float = 10.0):
+        self.path = path or "cpi_spans.prom"
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._last_flush = time.monotonic()
+
+    def export(self, span: Span, elapsed: float) -> None:
+        with self._lock:
+            totals = self._totals[span.name]
+            totals['calls'] += 1
+            totals['seconds'] += elapsed
+            totals['rows_in'] += span.rows_in
+            totals['rows_out'] += span.rows_out
+            totals['bytes'] += span.bytes
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def render(self) -> str:
+        with self._lock:
+            snapshot = {name: dict(values) for name, values in self._totals.items()}
+        lines = []
+        for key, metric, help_text in self.METRICS:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name in sorted(snapshot):
+                lines.append(f'{metric}{{span="{name}"}} {snapshot[name].get(key, 0):g}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self) -> None:
+        """原子写入：先写临时文件再替换，采集端不会读到半个文件"""
+        text = self.render()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+        with self._lock:
+            self._last_flush = time.monotonic()
+
+
+_exporter = None
+
+
+def configure(exporter: Optional[str] = None, path: str = "") -> None:
+    """
+    启用或关闭区间记录
+    参数:
+        exporter: 'json' / 'prometheus'，None 或空字符串表示关闭
+        path: 输出文件路径
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.flush()
+
+    if not exporter:
+        _exporter = None
+    elif exporter == 'json':
+        _exporter = JsonLinesExporter(path)
+    elif exporter == 'prometheus':
+        _exporter = PrometheusExporter(path)
+    else:
+        raise ValueError(f"不支持的区间导出方式: {exporter}")
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def span(name: str, **attrs):
+    """
+    创建计时区间，用法：
+
+        with span('clickhouse.query') as s:
+            rows = ...
+            s.set(rows_out=len(rows))
+
+    未启用时返回共享的空区间，只有一次全局变量判断的开销
+    """
+    exporter = _exporter
+    if exporter is None:
+        return _NOOP
+    return Span(name, attrs, exporter)
+
+
+def flush() -> None:
+    """把累计指标立即写出（prometheus 模式）"""
+    if _exporter is not None:
+        _exporter.flush()
+
+
+configure(SPANS_EXPORTER, SPANS_PATH)
+atexit.register(flush)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from processing.data_cleaning import DataCleaner
+from processing.id_dictionary import ItemIdDictionary
+from processing.transformer import DataTransformer
+from storage.async_connectors import AsyncClickHouseConnector, AsyncOSSConnector
+
+
+class AsyncDataPipeline:
+    """
+    DataPipeline 的异步版本：下载、清洗转换、写入分别受各自后端的并发上限约束，
+    多个对象的 ETL 可以相互重叠（一个在下载时另一个在写入）
+
+    参数:
+        storage / ch: 异步连接器，默认新建
+        cpu_concurrency: 同时进行清洗转换（在线程中执行）的对象数
+        use_item_keys: 同 DataPipeline
+    """
+
+    def __init__(
+            self,
+            storage: AsyncOSSConnector = None,
+            ch: AsyncClickHouseConnector = None,
+            cpu_concurrency: int = 2,
+            use_item_keys: bool = False
+    ):
+        self.logger = logging.getLogger('async_pipeline')
+        self.storage = storage or AsyncOSSConnector()
+        self.ch = ch or AsyncClickHouseConnector()
+        self.cleaner = DataCleaner()
+        self.id_dict = ItemIdDictionary() if use_item_keys else None
+        self.transformer = DataTransformer(id_dict=self.id_dict)
+        self._cpu_semaphore = asyncio.Semaphore(cpu_concurrency)
+        self._dict_loaded = False
+        self._dict_lock = asyncio.Lock()
+
+    async def run_etl(self, object_key: str = "raw/data.csv") -> int:
+        """单个对象的 ETL，返回写入 price 表的行数"""
+        if self.id_dict is not None:
+            # 编码前必须先加载已有字典，否则新分配的键会与库中已有键冲突
+            await self._load_item_keys()
+
+        df = await self.storage.download_dataframe(object_key)
+        if df is None:
+            raise IOError(f"下载失败: {object_key}")
+
+        async with self._cpu_semaphore:
+            df = await asyncio.to_thread(self._clean_and_transform, df)
+        if df is None:
+            self.logger.warning(f"{object_key} 无有效价格数据")
+            return 0
+
+        await self._sync_item_keys()
+        rows = await self.ch.insert_dataframe('price', df)
+        self.logger.info(f"Loaded {rows} rows from {object_key}")
+        return rows
+
+    async def run_etl_many(self, object_keys: List[str]) -> Dict[str, object]:
+        """
+        并发处理多个对象，单个对象失败不影响其他对象
+        返回:
+            {'rows': 写入总行数, 'loaded': {object_key: 行数}, 'failed': {object_key: 错误信息}}
+        """
+        results = await asyncio.gather(*(self.run_etl(key) for key in object_keys), return_exceptions=True)
+
+        loaded, failed = {}, {}
+        for key, result in zip(object_keys, results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"ETL failed for {key}: {result}")
+                failed[key] = str(result)
+            else:
+                loaded[key] = result
+        return {'rows': sum(loaded.values()), 'loaded': loaded, 'failed': failed}
+
+    def _clean_and_transform(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        df_clean, error = self.cleaner.clean_price_data(df)
+        if error:
+            self.logger.warning(error)
+            return None
+        return self.transformer.transform_price_data(df_clean)
+
+    async def _load_item_keys(self):
+        async with self._dict_lock:
+            if not self._dict_loaded:
+                async with self.ch.connection() as connector:
+                    await asyncio.to_thread(self.id_dict.load, connector)
+                self._dict_loaded = True
+
+    async def _sync_item_keys(self):
+        """写入价格前同步新分配的代理键（ItemIdDictionary 内部加锁，可并发调用）"""
+        if self.id_dict is None:
+            return
+        async with self.ch.connection() as connector:
+            await asyncio.to_thread(self.id_dict.sync, connector)
@@ -0,0 +1,126 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from storage.clickhouse_connector import ClickHouseConnector
+from storage.oss_connector import OSSConnector, require_parquet_engine
+
+
+class S3BulkLoader:
+    """
+    服务端批量导入：按月分区并行写 Parquet 到对象存储（本地 MinIO / 云上 OSS），
+    再对每个分区执行 INSERT ... SELECT FROM s3(...)，由 ClickHouse 直接拉取数据，
+    行数据不经过 Python 客户端的写入通道
+
+    分区先导入同结构的临时表，全部成功后再一次性写入目标表，任一分区失败时目标表不变；
+    s3() 通过服务端命名集合（named collection）取得访问凭证，SQL 文本和查询日志中不出现密钥；
+    命名集合须预先在 ClickHouse 服务端定义（见 README「ClickHouse 服务端导入」），缺失时导入前即报错
+    """
+
+    def __init__(
+            self,
+            storage: OSSConnector = None,
+            ch_connector: ClickHouseConnector = None,
+            prefix: str = "processed",
+            max_workers: int = 4
+    ):
+        self.logger = logging.getLogger('bulk_loader')
+        self.storage = storage or OSSConnector()
+        self.ch = ch_connector or ClickHouseConnector()
+        self.prefix = prefix
+        self.max_workers = max_workers
+
+    def load(self, df: pd.DataFrame, table: str, partition_by: str = "date") -> Dict[str, int]:
+        """
+        分区上传并导入
+
+        参数:
+            df: 已清洗、转换为目标表结构的数据
+            table: 目标表名
+            partition_by: 按月分区使用的日期列，不存在时整表作为一个分区
+        返回:
+            {'partitions': 分区数, 'rows': 行数}
+        """
+        if df is None or df.empty:
+            return {'partitions': 0, 'rows': 0}
+        # 在启动上传线程前检查，缺少 pyarrow 时给出明确的 ImportError
+        require_parquet_engine()
+        self._require_named_collection()
+
+        batch = uuid.uuid4().hex[:12]
+        partitions = self._partition(df, partition_by)
+        columns = list(df.columns)
+        object_keys = {name: f"{self.prefix}/{table}/{batch}/part-{name}.parquet" for name, _ in partitions}
+        staging = f"{table}_staging_{batch}"
+        staged: List[str] = []
+
+        self.ch.execute(f"CREATE TABLE {staging} AS {table}")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {
+                    pool.submit(self._upload, part, object_keys[name]): name
+                    for name, part in partitions
+                }
+                # 每个分区上传完成即导入临时表，上传与服务端导入重叠进行
+                try:
+                    for future in as_completed(futures):
+                        name = futures[future]
+                        self._insert_from_s3(staging, columns, future.result())
+                        staged.append(name)
+                except Exception:
+                    for future in futures:
+                        future.cancel()
+                    failed = sorted(set(object_keys) - set(staged))
+                    self.logger.error(
+                        f"Bulk load into {table} failed; staged partitions {sorted(staged)} discarded, "
+                        f"partitions {failed} not loaded, {table} unchanged"
+                    )
+                    raise
+
+            names = ', '.join(columns)
+            self.ch.execute(f"INSERT INTO {table} ({names}) SELECT {names} FROM {staging}")
+        finally:
+            self.ch.execute(f"DROP TABLE IF EXISTS {staging}")
+            for object_key in object_keys.values():
+                self.storage.delete_object(object_key)
+
+        self.logger.info(f"Bulk loaded {len(df)} rows into {table} via {len(partitions)} s3() partitions")
+        return {'partitions': len(partitions), 'rows': len(df)}
+
+    def _require_named_collection(self) -> None:
+        """确认 s3() 使用的命名集合已在服务端定义，缺失时抛出 RuntimeError，不上传任何分区"""
+        collection = self.storage.s3_named_collection()
+        rows = self.ch.execute_query(
+            "SELECT count() AS n FROM system.named_collections WHERE name = {name:String}",
+            {'name': collection}
+        )
+        if not rows or not rows[0]['n']:
+            raise RuntimeError(
+                f"ClickHouse 服务端缺少命名集合 {collection}（或当前用户无 SHOW NAMED COLLECTIONS 权限），"
+                f"s3() 无法取得对象存储凭证；请按 README「ClickHouse 服务端导入」创建后重试"
+            )
+
+    def _partition(self, df: pd.DataFrame, partition_by: str) -> List[Tuple[str, pd.DataFrame]]:
+        if partition_by not in df.columns:
+            return [("all", df)]
+        months = pd.to_datetime(df[partition_by]).dt.strftime("%Y%m")
+        return [(month, part) for month, part in df.groupby(months, sort=True)]
+
+    def _upload(self, part: pd.DataFrame, object_key: str) -> str:
+        if not self.storage.upload_parquet(part, object_key):
+            raise IOError(f"分区上传失败: {object_key}")
+        return object_key
+
+    def _insert_from_s3(self, table: str, columns: List[str], object_key: str) -> None:
+        names = ', '.join(columns)
+        self.ch.execute(f"""
+        INSERT INTO {table} ({names})
+        SELECT {names} FROM s3(
+            {self.storage.s3_named_collection()},
+            url = '{self.storage.object_url(object_key)}',
+            format = 'Parquet'
+        )
+        """)
@@ -1,45 +1,70 @@
 import pandas as pd
 from typing import Tuple, Optional
 
+from monitoring.spans import span
+
+
+def normalize_ids(ids: pd.Series) -> pd.Series:
+    """
+    ID 规范化（去空格、转大写）
+    先对去重后的取值做字符串处理，再按编码映射回整列，重复 ID 只处理一次
+    """
+    codes, uniques = pd.factorize(ids, use_na_sentinel=False)
+    normalized = pd.Index(uniques).astype(str).str.strip().str.upper()
+    return pd.Series(normalized.to_numpy()[codes], index=ids.index, name=ids.name)
+
 
 class DataCleaner:
-    def __init__(self, unit_conversion=False):
+    def __init__(self, unit_conversion=False, date_format: Optional[str] = "%Y-%m-%d"):
         self.unit_conversion = unit_conversion  # 是否将价格单位转换（如元转分）
+        self.date_format = date_format  # 日期格式，None 表示自动推断
 
     def clean_category_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[str]]:
         """清洗分类数据"""
-        df_clean = df.dropna()
+        with span('cleaner.category') as s:
+            df_clean = df.dropna()
 
-        # 限制权重在 0 ~ 1 之间
-        df_clean["weight"] = df_clean["weight"].clip(0, 1)
+            # 限制权重在 0 ~ 1 之间
+            df_clean["weight"] = df_clean["weight"].clip(0, 1)
+            s.set(rows_in=len(df), rows_out=len(df_clean))
 
         return df_clean, None
 
     def clean_item_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[str]]:
         """清洗商品数据"""
-        df_clean = df.dropna()
+        with span('cleaner.item') as s:
+            df_clean = df.dropna()
 
-        # item_id 强制转为字符串格式
-        df_clean["item_id"] = df_clean["item_id"].astype(str).str.strip().str.upper()
+            # item_id 强制转为字符串格式
+            df_clean["item_id"] = normalize_ids(df_clean["item_id"])
+            s.set(rows_in=len(df), rows_out=len(df_clean))
 
         return df_clean, None
 
     def clean_price_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[str]]:
         """清洗价格数据"""
-        df_clean = df.copy()
+        with span('cleaner.price') as s:
+            df_clean, error = self._clean_price_data(df)
+            s.set(rows_in=len(df), rows_out=0 if df_clean is None else len(df_clean))
+        return df_clean, error
 
-        # 价格必须大于0，不能为 NaN
-        df_clean = df_clean[(df_clean["price"].notna()) & (df_clean["price"] > 0)]
+    def _clean_price_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[str]]:
+        # 价格必须大于0，不能为 NaN；直接按掩码取行，不预先复制整表
+        price = df["price"]
+        df_clean = df.loc[price.notna() & (price > 0)]
 
-        # 转换 item_id 为大写，去空格
-        df_clean["item_id"] = df_clean["item_id"].astype(str).str.strip().str.upper()
+        if df_clean.empty:
+            return None, "清洗后无有效价格数据"
 
-        # 确保日期是日期类型
-        df_clean["date"] = pd.to_datetime(df_clean["date"])
+        # 转换 item_id 为大写，去空格
+        columns = {"item_id": normalize_ids(df_clean["item_id"])}
 
-        df_clean = df_clean.reset_index(drop=True)
+        # 确保日期是日期类型（指定格式，避免逐行推断）
+        if not pd.api.types.is_datetime64_any_dtype(df_clean["date"]):
+            columns["date"] = pd.to_datetime(df_clean["date"], format=self.date_format)
 
-        if df_clean.empty:
-            return None, "清洗后无有效价格数据"
+        # assign 返回新表，不对切片原地赋值
+        df_clean = df_clean.assign(**columns)
+        df_clean.index = pd.RangeIndex(len(df_clean))
 
         return df_clean, None
@@ -1,7 +1,40 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from config import config
+from processing.bulk_loader import S3BulkLoader
+from processing.data_cleaning import DataCleaner
+from processing.id_dictionary import ItemIdDictionary
+from processing.streaming import StagePipeline
+from processing.transformer import DataTransformer
+from storage.clickhouse_connector import ClickHouseConnector
+from storage.oss_connector import OSSConnector
+
+
 class DataPipeline:
-    def __init__(self):
+    def __init__(self, use_item_keys: bool = False, price_format: str = 'daily'):
+        """
+        参数:
+            use_item_keys: 按字典编码模式写入（price 表带 item_key 列），
+                需先以 initialize_tables(item_keys=True) 建表
+            price_format: 'daily' 每日全量价格写入 price 表；
+                'changes' 转为变更日志写入 price_change 表，需先以 initialize_tables(change_log=True) 建表
+        """
+        if price_format not in ('daily', 'changes'):
+            raise ValueError(f"不支持的价格格式: {price_format}")
+        self.logger = logging.getLogger('data_pipeline')
+        self.price_format = price_format
         self.storage = OSSConnector()
         self.ch = ClickHouseConnector()
+        self.cleaner = DataCleaner()
+        self.id_dict = None
+        if use_item_keys:
+            self.id_dict = ItemIdDictionary()
+            self.id_dict.load(self.ch)
+        self.transformer = DataTransformer(id_dict=self.id_dict)
+        self.bulk_loader = S3BulkLoader(self.storage, self.ch)
 
     def run_etl(self):
         """统一ETL流程"""
@@ -14,6 +47,8 @@ class DataPipeline:
         # 2. 数据处理（核心逻辑不变）
         df = self._clean_data(df)
         df = self._transform_data(df)
+        if self.price_format == 'changes':
+            df = self.transformer.to_change_log(df, previous_state=self._latest_change_state(df['date'].min()))
 
         # 3. 数据加载
         if config.is_local:
@@ -21,19 +56,99 @@ class DataPipeline:
         else:
             self._load_to_cloud(df)  # 云上优化导入
 
+    def run_etl_streaming(
+            self,
+            object_key: str = "raw/data.csv",
+            chunksize: int = 100_000,
+            queue_size: int = 2,
+            server_side: bool = False
+    ) -> Dict[str, int]:
+        """
+        流式ETL：分块读取原始对象，逐块清洗、转换并按列写入 price 表
+        读取、清洗、转换、写入各占一个线程，之间用有界队列连接，
+        内存占用只与 chunksize × queue_size 有关，与原始文件大小无关
+        server_side=True 时每块经 S3BulkLoader 由 ClickHouse 服务端导入
+
+        返回:
+            {'chunks': 写入块数, 'rows_in': 读取行数, 'rows_out': 写入行数}
+        """
+        if self.price_format == 'changes':
+            # 变更检测需要每个日期的完整样本，分块会把同一天的商品切到不同块里
+            raise ValueError("变更日志格式不支持流式ETL，请使用 run_etl")
+
+        stats = {'chunks': 0, 'rows_in': 0, 'rows_out': 0}
+        self.logger.info(f"Streaming ETL from {object_key} (chunksize={chunksize})")
+
+        def clean(chunk: pd.DataFrame) -> Optional[pd.DataFrame]:
+            stats['rows_in'] += len(chunk)
+            return self._clean_data(chunk)
+
+        def load(chunk: pd.DataFrame) -> None:
+            self._sync_item_keys()
+            if server_side:
+                stats['rows_out'] += self.bulk_loader.load(chunk, 'price')['rows']
+            else:
+                stats['rows_out'] += self.ch.insert_dataframe('price', chunk)
+
+        stats['chunks'] = StagePipeline(
+            source=self.storage.iter_dataframe_chunks(object_key, chunksize=chunksize),
+            stages=[clean, self._transform_data],
+            sinks=[load],
+            queue_size=queue_size,
+            name='data_pipeline'
+        ).run()
+
+        self.logger.info(f"Streaming ETL finished: {stats}")
+        return stats
+
+    def _clean_data(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """清洗价格数据，无有效数据时返回 None"""
+        df_clean, error = self.cleaner.clean_price_data(df)
+        if error:
+            self.logger.warning(error)
+        return df_clean
+
+    def _transform_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """转换为 price 表结构"""
+        return self.transformer.transform_price_data(df)
+
+    def _latest_change_state(self, before) -> pd.DataFrame:
+        """
+        price_change 中各商品在 before 之前的最后一条记录 (商品键, price)，出样商品 price 为空
+        供 to_change_log 与本批首日比较，增量运行时不重复记录未变价的商品
+        """
+        key = 'item_key' if self.id_dict is not None else 'item_id'
+        # tuple 包一层，argMax 不会跳过出样记录的 NULL 价格
+        return self.ch.execute_query(
+            f"""
+            SELECT {key}, argMax(tuple(price), effective_date).1 AS price
+            FROM price_change
+            WHERE effective_date < {{before:Date}}
+            GROUP BY {key}
+            """,
+            {'before': before},
+            return_dataframe=True
+        )
+
+    def _sync_item_keys(self):
+        """价格写入前先把新分配的代理键写入 item_dict，保证 price 中的 item_key 都可解码"""
+        if self.id_dict is not None:
+            self.id_dict.sync(self.ch)
+
+    def _price_target(self) -> Tuple[str, str]:
+        """价格写入的目标表及其日期列"""
+        if self.price_format == 'changes':
+            return 'price_change', 'effective_date'
+        return 'price', 'date'
+
     def _load_to_local_ch(self, df):
-        """本地快速加载实现"""
-        self.ch.execute("INSERT INTO table VALUES", df.to_dict('records'))
+        """本地加载实现：Parquet 写入 MinIO，ClickHouse 服务端 s3() 导入"""
+        self._sync_item_keys()
+        table, date_column = self._price_target()
+        self.bulk_loader.load(df, table, partition_by=date_column)
 
     def _load_to_cloud(self, df):
-        """云端批量加载实现"""
-        self.storage.upload_dataframe(df, "processed/data.parquet")
-        self.ch.execute(f"""
-        INSERT INTO table 
-        SELECT * FROM s3(
-            'https://{config.OSS_BUCKET}.{config.OSS_ENDPOINT}/processed/data.parquet',
-            '{config.OSS_ACCESS_KEY}',
-            '{config.OSS_SECRET_KEY}',
-            'Parquet'
-        )
-        """)
\ No newline at end of file
+        """云端批量加载实现：Parquet 写入 OSS，ClickHouse 服务端 s3() 导入"""
+        self._sync_item_keys()
+        table, date_column = self._price_target()
+        self.bulk_loader.load(df, table, partition_by=date_column)
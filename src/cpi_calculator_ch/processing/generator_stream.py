@@ -0,0 +1,128 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from data_generator.price_generator import PriceGenerator, Product
+from processing.streaming import StagePipeline
+from storage.clickhouse_connector import ClickHouseConnector
+
+
+class ColumnBlock(NamedTuple):
+    """一次列式写入的数据块"""
+    price: Dict[str, List]
+    item: Dict[str, List]
+
+    @property
+    def rows(self) -> int:
+        return len(self.price['item_id'])
+
+
+class GeneratorStreamLoader:
+    """模拟数据直写 ClickHouse：PriceGenerator 逐日产出价格，按列成块写入 item / price 表，不经过本地 CSV"""
+
+    def __init__(
+            self,
+            ch_connector: ClickHouseConnector = None,
+            block_rows: int = 100_000,
+            queue_size: int = 4,
+            inserters: int = 1
+    ):
+        """
+        参数:
+            ch_connector: 第一个写入线程使用的连接，其余写入线程各自新建连接
+            block_rows: 每个写入块的目标行数（按整天切分，可能略超）
+            queue_size: 生成线程与写入线程之间最多缓存的块数
+            inserters: 写入线程数
+        """
+        self.logger = logging.getLogger('generator_stream')
+        self.ch = ch_connector or ClickHouseConnector()
+        self.block_rows = block_rows
+        self.queue_size = queue_size
+        self.inserters = max(1, inserters)
+        self.stats = {'days': 0, 'rows': 0, 'items': 0, 'blocks': 0}
+
+    def run(
+            self,
+            products: List[Product],
+            start_date: Optional[datetime] = None,
+            days: int = 365
+    ) -> Dict[str, int]:
+        """
+        逐日模拟并写入 ClickHouse
+        返回:
+            {'days': 模拟天数, 'rows': 价格行数, 'items': 新商品数, 'blocks': 写入块数}
+        """
+        start_date = start_date or datetime.now()
+        self.stats = {'days': 0, 'rows': 0, 'items': 0, 'blocks': 0}
+        self.logger.info(f"Streaming {days} simulated days from {start_date:%Y-%m-%d} into ClickHouse")
+
+        gen = PriceGenerator(products)
+        connectors = [self.ch]
+        try:
+            for _ in range(self.inserters - 1):
+                connectors.append(ClickHouseConnector())
+
+            pipeline = StagePipeline(
+                source=self.iter_blocks(gen.iter_days(start_date, days)),
+                sinks=[self._make_sink(conn) for conn in connectors],
+                queue_size=self.queue_size,
+                name='generator_stream'
+            )
+            self.stats['blocks'] = pipeline.run()
+        finally:
+            # 额外的写入连接由本方法创建，出错时同样要关闭；第一个连接归调用方所有
+            for conn in connectors[1:]:
+                conn.close()
+
+        self.logger.info(f"Generator stream finished: {self.stats}")
+        return self.stats
+
+    def iter_blocks(self, daily: Iterable[Tuple[datetime, List[Product]]]) -> Iterator[ColumnBlock]:
+        """把逐日商品列表聚合成列式块；同一天重复出现的商品只保留第一条，新商品同时写入 item 表"""
+        seen_items = set()
+        block = self._empty_block()
+
+        for current, current_products in daily:
+            day = current.date() if isinstance(current, datetime) else current
+            day_seen = set()
+
+            for p in current_products:
+                if p.product_id in day_seen:
+                    continue
+                day_seen.add(p.product_id)
+                item_id = str(p.product_id)
+
+                block.price['date'].append(day)
+                block.price['item_id'].append(item_id)
+                block.price['price'].append(float(p.price))
+
+                if p.product_id not in seen_items:
+                    seen_items.add(p.product_id)
+                    block.item['item_id'].append(item_id)
+                    block.item['category_id'].append(p.category_id)
+
+            self.stats['days'] += 1
+            self.stats['rows'] += len(day_seen)
+
+            if block.rows >= self.block_rows:
+                self.stats['items'] += len(block.item['item_id'])
+                yield block
+                block = self._empty_block()
+
+        if block.rows:
+            self.stats['items'] += len(block.item['item_id'])
+            yield block
+
+    def _make_sink(self, conn: ClickHouseConnector):
+        def sink(block: ColumnBlock) -> None:
+            # 先写商品维表，保证价格行可以关联到分类
+            conn.insert_columns('item', block.item)
+            conn.insert_columns('price', block.price)
+        return sink
+
+    @staticmethod
+    def _empty_block() -> ColumnBlock:
+        return ColumnBlock(
+            price={'date': [], 'item_id': [], 'price': []},
+            item={'item_id': [], 'category_id': []}
+        )
@@ -0,0 +1,96 @@
+import logging
+import threading
+from typing import Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from processing.data_cleaning import normalize_ids
+
+
+class ItemIdDictionary:
+    """
+    item_id 字典编码：规范化后的 item_id 字符串 ↔ 稠密 UInt32 代理键（从 0 连续分配）
+
+    客户端以 NumPy/pandas 数组镜像整张字典：编码是一次哈希查找，解码是一次数组下标；
+    服务端保存在 item_dict 表中，ETL 过程中只追加新键
+
+    新键在客户端按“当前键数”顺序分配，因此同一时间只允许一个 ETL 进程写入 item_dict；
+    多个写入者同时运行会分配出相同的键。sync 写入前核对服务端键数与本地已同步数，
+    发现有其他写入者时抛出 RuntimeError（需重新 load 后再编码），而不是写入冲突的键
+    """
+
+    TABLE = 'item_dict'
+
+    def __init__(self):
+        self.logger = logging.getLogger('id_dictionary')
+        self._lock = threading.Lock()
+        self._ids = pd.Index([], dtype=object)  # 位置即代理键
+        self._synced = 0  # 已写入 ClickHouse 的键数
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def encode(self, ids: Union[pd.Series, Sequence[str]], add: bool = True) -> np.ndarray:
+        """
+        把 item_id 编码为代理键
+        参数:
+            ids: item_id 序列（编码前统一做去空格、转大写）
+            add: 是否为未见过的 item_id 分配新键；为 False 时遇到未知 ID 抛出 KeyError
+        """
+        normalized = normalize_ids(pd.Series(ids)).to_numpy()
+
+        with self._lock:
+            keys = self._ids.get_indexer(normalized)
+            missing = keys < 0
+            if missing.any():
+                if not add:
+                    raise KeyError(f"未知 item_id: {normalized[missing][:5].tolist()}")
+                new_ids = pd.Index(pd.unique(normalized[missing]))
+                keys[missing] = len(self._ids) + new_ids.get_indexer(normalized[missing])
+                self._ids = self._ids.append(new_ids)
+
+        return keys.astype(np.uint32)
+
+    def decode(self, keys: Union[np.ndarray, Sequence[int]]) -> np.ndarray:
+        """代理键还原为 item_id 字符串"""
+        return self._ids.to_numpy()[np.asarray(keys, dtype=np.int64)]
+
+    def load(self, ch_connector) -> int:
+        """从 ClickHouse 加载完整字典，返回键数"""
+        df = ch_connector.execute_query(
+            f"SELECT item_key, item_id FROM {self.TABLE} ORDER BY item_key",
+            return_dataframe=True
+        )
+        with self._lock:
+            if not df.empty and not np.array_equal(df['item_key'].to_numpy(), np.arange(len(df))):
+                raise ValueError(f"{self.TABLE} 中的代理键不连续")
+            self._ids = pd.Index(df['item_id'].to_numpy(dtype=object), dtype=object)
+            self._synced = len(self._ids)
+        self.logger.info(f"Loaded {len(self._ids)} item keys from {self.TABLE}")
+        return len(self._ids)
+
+    def sync(self, ch_connector) -> int:
+        """
+        把本地新分配的键追加写入 ClickHouse，返回写入条数
+        服务端键数与上次 load/sync 后不一致（有其他写入者）时抛出 RuntimeError
+        """
+        with self._lock:
+            start, end = self._synced, len(self._ids)
+            if start == end:
+                return 0
+            server_keys = ch_connector.execute_query(
+                f"SELECT uniqExact(item_key) AS key_count FROM {self.TABLE}",
+                return_dataframe=True
+            )['key_count'].iloc[0]
+            if server_keys != start:
+                raise RuntimeError(
+                    f"{self.TABLE} 已有 {server_keys} 个键，本地只同步到 {start}：存在其他写入者，请重新 load 后再编码"
+                )
+            new_ids = self._ids[start:end].tolist()
+            ch_connector.insert_columns(self.TABLE, {
+                'item_key': list(range(start, end)),
+                'item_id': new_ids
+            })
+            self._synced = end
+        return end - start
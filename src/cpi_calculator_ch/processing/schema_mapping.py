@@ -1,8 +1,88 @@
-from typing import Dict, Any
-from config.constants import CATEGORY_SCHEMA, PRICE_SCHEMA
+from typing import Dict, Any, Callable, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.constants import CATEGORY_SCHEMA, ITEM_SCHEMA, PRICE_SCHEMA
+
+UINT32_MAX = 2 ** 32 - 1
+
+# 整列转换函数：返回 (转换后的列, 转换成功掩码)
+ColumnCaster = Callable[[pd.Series], Tuple[pd.Series, pd.Series]]
+
+
+def _cast_uint(col: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    num = pd.to_numeric(col, errors='coerce')
+    ok = num.notna() & (num >= 0) & (num <= UINT32_MAX) & (num % 1 == 0)
+    return num.where(ok).astype('UInt32'), ok
+
+
+def _cast_int(col: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    num = pd.to_numeric(col, errors='coerce')
+    ok = num.notna() & (num % 1 == 0)
+    return num.where(ok).astype('Int64'), ok
+
+
+def _cast_float(col: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    # 超出 Float32 范围的值会变成 inf，与无法解析的值一样算转换失败
+    with np.errstate(over='ignore'):
+        num = pd.to_numeric(col, errors='coerce').astype('float32')
+    ok = pd.Series(np.isfinite(num.to_numpy()), index=col.index)
+    return num.where(ok), ok
+
+
+def _cast_date(col: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    dates = pd.to_datetime(col, errors='coerce', format='ISO8601').dt.normalize()
+    return dates, dates.notna()
+
+
+def _cast_datetime(col: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    dates = pd.to_datetime(col, errors='coerce', format='ISO8601')
+    return dates, dates.notna()
+
+
+def _cast_string(col: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    return col.astype(str).where(col.notna()), pd.Series(True, index=col.index)
+
+
+def _caster_for(target_type: str) -> ColumnCaster:
+    """按与 _convert_type 相同的优先级匹配类型，只在编译计划时执行一次"""
+    type_lower = target_type.lower()
+    if "uint" in type_lower:
+        return _cast_uint
+    elif "int" in type_lower:
+        return _cast_int
+    elif "float" in type_lower:
+        return _cast_float
+    elif "datetime" in type_lower:
+        return _cast_datetime
+    elif "date" in type_lower:
+        return _cast_date
+    elif "string" in type_lower:
+        return _cast_string
+    return lambda col: (col, pd.Series(True, index=col.index))
+
+
+class FieldPlan(NamedTuple):
+    field: str
+    type_: str
+    cast: ColumnCaster
+
+
+def compile_schema(schema: Dict[str, List[str]]) -> List[FieldPlan]:
+    """把 {fields, types} 模式编译为逐列转换计划"""
+    return [FieldPlan(field, type_, _caster_for(type_)) for field, type_ in zip(schema["fields"], schema["types"])]
 
 
 class SchemaMapper:
+    def __init__(self):
+        # 模式只编译一次，之后按整列转换
+        self._plans = {
+            'category': compile_schema(CATEGORY_SCHEMA),
+            'item': compile_schema(ITEM_SCHEMA),
+            'price': compile_schema(PRICE_SCHEMA),
+        }
+
     def map_category_schema(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """映射分类数据模式"""
         mapped = {}
@@ -19,6 +99,58 @@ class SchemaMapper:
                 mapped[field] = self._convert_type(data[field], type_)
         return mapped
 
+    def map_category_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """整表映射分类数据模式"""
+        return self.map_frame(df, 'category')
+
+    def map_item_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """整表映射商品数据模式"""
+        return self.map_frame(df, 'item')
+
+    def map_price_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """整表映射价格数据模式"""
+        return self.map_frame(df, 'price')
+
+    def map_frame(self, df: pd.DataFrame, schema: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        按编译好的计划整列转换类型
+
+        返回:
+            (mapped, errors)
+            mapped: 只含模式字段、转换全部成功的行
+            errors: 转换失败的单元格 [row, field, value, type]，行号为原 DataFrame 的索引
+        """
+        columns = {}
+        failed = np.zeros(len(df), dtype=bool)
+        error_frames = []
+
+        for plan in self._plans[schema]:
+            if plan.field not in df.columns:
+                continue
+            original = df[plan.field]
+            converted, ok = plan.cast(original)
+            # 空值保持为空，不算转换失败
+            bad = (~ok & original.notna()).to_numpy()
+            if bad.any():
+                failed |= bad
+                error_frames.append(pd.DataFrame({
+                    'row': df.index[bad],
+                    'field': plan.field,
+                    'value': original.to_numpy()[bad],
+                    'type': plan.type_
+                }))
+            columns[plan.field] = converted
+
+        mapped = pd.DataFrame(columns, index=df.index)
+        if failed.any():
+            mapped = mapped.loc[~failed]
+
+        if error_frames:
+            errors = pd.concat(error_frames, ignore_index=True)
+        else:
+            errors = pd.DataFrame(columns=['row', 'field', 'value', 'type'])
+        return mapped, errors
+
     def _convert_type(self, value, target_type: str):
         """类型转换"""
         if value is None:
@@ -37,4 +169,4 @@ class SchemaMapper:
         elif "string" in type_lower:
             return str(value)
         else:
-            return value
\ No newline at end of file
+            return value
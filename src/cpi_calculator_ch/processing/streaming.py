@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+_SENTINEL = object()
+
+
+class StagePipeline:
+    """多线程流水线：数据源、各处理阶段和写入端各占一个线程，之间用有界队列连接"""
+
+    def __init__(
+            self,
+            source: Iterable,
+            stages: Sequence[Callable[[Any], Any]] = (),
+            sinks: Sequence[Callable[[Any], None]] = (),
+            queue_size: int = 4,
+            name: str = 'pipeline'
+    ):
+        """
+        参数:
+            source: 产出数据块的可迭代对象（在独立线程中迭代）
+            stages: 依次作用于每个数据块的处理函数，返回 None 表示丢弃该块
+            sinks: 写入函数，每个函数一个线程，共同消费最后一个队列
+            queue_size: 每个队列最多缓存的数据块数，决定内存上限
+        """
+        if not sinks:
+            raise ValueError("至少需要一个写入端")
+
+        self.source = source
+        self.stages = list(stages)
+        self.sinks = list(sinks)
+        self.queue_size = queue_size
+        self.logger = logging.getLogger(name)
+
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+        self._consumed = 0
+        self._consumed_lock = threading.Lock()
+
+    def run(self) -> int:
+        """运行流水线直到数据源耗尽，返回写入端处理的数据块数；任一线程出错时停止并抛出该异常"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        # 每个队列的消费者数：最后一个队列由全部写入线程消费，每个消费者各需一个结束标记
+        consumers = [1] * len(self.stages) + [len(self.sinks)]
+
+        threads = [threading.Thread(
+            target=self._guard, args=(self._produce, queues[0], consumers[0]), name='source', daemon=True
+        )]
+        for i, stage in enumerate(self.stages):
+            threads.append(threading.Thread(
+                target=self._guard, args=(self._transform, stage, queues[i], queues[i + 1], consumers[i + 1]),
+                name=f'stage-{i}', daemon=True
+            ))
+        for i, sink in enumerate(self.sinks):
+            threads.append(threading.Thread(
+                target=self._guard, args=(self._consume, sink, queues[-1]),
+                name=f'sink-{i}', daemon=True
+            ))
+
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if self._error is not None:
+            raise self._error
+        return self._consumed
+
+    def _guard(self, target: Callable, *args) -> None:
+        try:
+            target(*args)
+        except BaseException as e:
+            with self._error_lock:
+                if self._error is None:
+                    self._error = e
+                    self.logger.error(f"流水线线程 {threading.current_thread().name} 失败: {str(e)}")
+            self._stop.set()
+
+    def _produce(self, out_q: queue.Queue, n_consumers: int) -> None:
+        for item in self.source:
+            if not self._put(out_q, item):
+                return
+        self._finish(out_q, n_consumers)
+
+    def _transform(self, fn: Callable, in_q: queue.Queue, out_q: queue.Queue, n_consumers: int) -> None:
+        while True:
+            item = self._get(in_q)
+            if item is _SENTINEL:
+                break
+            result = fn(item)
+            if result is not None and not self._put(out_q, result):
+                return
+        self._finish(out_q, n_consumers)
+
+    def _consume(self, sink: Callable, in_q: queue.Queue) -> None:
+        while True:
+            item = self._get(in_q)
+            if item is _SENTINEL:
+                return
+            sink(item)
+            with self._consumed_lock:
+                self._consumed += 1
+
+    def _finish(self, out_q: queue.Queue, n_consumers: int) -> None:
+        for _ in range(n_consumers):
+            self._put(out_q, _SENTINEL)
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _SENTINEL
@@ -1,8 +1,18 @@
+from typing import Optional
+
 import pandas as pd
-from config.constants import CATEGORY_SCHEMA, ITEM_SCHEMA, PRICE_SCHEMA
+from config.constants import (
+    CATEGORY_SCHEMA, ITEM_SCHEMA, PRICE_SCHEMA, ITEM_KEYED_SCHEMA, PRICE_KEYED_SCHEMA,
+    PRICE_CHANGE_SCHEMA, PRICE_CHANGE_KEYED_SCHEMA
+)
+from processing.data_cleaning import normalize_ids
 
 
 class DataTransformer:
+    def __init__(self, id_dict=None):
+        # 传入 ItemIdDictionary 时，商品和价格数据额外输出 item_key 代理键
+        self.id_dict = id_dict
+
     def transform_category_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """转换分类数据格式"""
         df["name"] = df["name"].astype(str).str.strip()
@@ -16,13 +26,16 @@ class DataTransformer:
 
     def transform_item_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """转换商品数据格式"""
-        df["item_id"] = df["item_id"].astype(str).str.strip().str.upper()
+        df["item_id"] = normalize_ids(df["item_id"])
+        if self.id_dict is not None:
+            df["item_key"] = self.id_dict.encode(df["item_id"])
+            return df[ITEM_KEYED_SCHEMA["fields"]]
         return df[ITEM_SCHEMA["fields"]]
 
     def transform_price_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """转换价格数据格式（修复版）"""
         df["date"] = pd.to_datetime(df["date"]).dt.date
-        df["item_id"] = df["item_id"].astype(str).str.upper()
+        df["item_id"] = normalize_ids(df["item_id"])
 
         # 修复点：保持原始浮点数值
         df["price"] = df["price"].astype(float).round(2)
@@ -31,4 +44,47 @@ class DataTransformer:
         if (df["price"] > 1000).any():
             raise ValueError("发现异常高价，请检查原始数据")
 
-        return df[PRICE_SCHEMA["fields"]]
\ No newline at end of file
+        if self.id_dict is not None:
+            df["item_key"] = self.id_dict.encode(df["item_id"])
+            return df[PRICE_KEYED_SCHEMA["fields"]]
+        return df[PRICE_SCHEMA["fields"]]
+
+    def to_change_log(self, df: pd.DataFrame, previous_state: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        把 transform_price_data 输出的每日全量价格转为变更日志：
+        商品入样、价格与前一观测日不同、或在前一观测日在样而当日缺失时各记一行，缺失（出样）行 price 为 NaN。
+        批次须包含所覆盖日期的完整样本，否则会误记出样
+        参数:
+            df: 本批每日全量价格
+            previous_state: 本批首日之前的最新状态（商品键, price），即 price_change 中各商品最后一条记录，
+                已出样商品的 price 为 NaN；为 None 时视为首次写入。本批首日与该状态比较，
+                未变价的商品不再重复记录，状态中在样而本批首日缺失的商品记为出样
+        """
+        key = "item_key" if self.id_dict is not None else "item_id"
+        schema = PRICE_CHANGE_KEYED_SCHEMA if self.id_dict is not None else PRICE_CHANGE_SCHEMA
+
+        prices = df.drop_duplicates(["date", key]).pivot(index="date", columns=key, values="price").sort_index()
+        previous = prices.shift(1)
+        if previous_state is not None and not previous_state.empty:
+            # price_change 以 Float32 保存，按 transform_price_data 的精度还原后再比较
+            state = previous_state.drop_duplicates(key, keep="last").set_index(key)["price"].astype(float).round(2)
+            state.index = state.index.astype(prices.columns.dtype)
+            columns = prices.columns.union(state.index)
+            prices = prices.reindex(columns=columns)
+            previous = previous.reindex(columns=columns)
+            previous.iloc[0] = state.reindex(columns).to_numpy(dtype=float)
+        present = prices.notna()
+
+        # 入样或变价：当日在样且与前一观测日价格不同（前一日缺失时 NaN != x 为真）
+        changed = present & (prices != previous)
+        # 出样：前一观测日在样、当日缺失
+        departed = ~present & previous.notna()
+
+        mask = (changed | departed).stack()
+        events = prices.stack(future_stack=True)[mask.to_numpy()].rename("price").reset_index()
+        events = events.rename(columns={"date": "effective_date"})
+
+        if self.id_dict is not None:
+            # 出样商品可能不在本批中，统一经字典解码
+            events["item_id"] = self.id_dict.decode(events[key].to_numpy())
+        return events[schema["fields"]].sort_values(["effective_date", key], kind="stable").reset_index(drop=True)
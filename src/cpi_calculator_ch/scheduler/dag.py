@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+
+class Resource(ABC):
+    """任务的输入/输出资源，fingerprint() 返回可比较的版本标识，资源不存在时返回 None"""
+
+    @property
+    @abstractmethod
+    def id(self) -> str:
+        pass
+
+    @abstractmethod
+    def fingerprint(self) -> Optional[str]:
+        pass
+
+
+class FileResource(Resource):
+    """本地文件：以修改时间和大小作为版本"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @property
+    def id(self) -> str:
+        return f"file:{self.path}"
+
+    def fingerprint(self) -> Optional[str]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class ObjectResource(Resource):
+    """对象存储中的对象：以 ETag 作为版本"""
+
+    def __init__(self, storage, object_key: str):
+        self.storage = storage
+        self.object_key = object_key
+
+    @property
+    def id(self) -> str:
+        return f"object:{self.object_key}"
+
+    def fingerprint(self) -> Optional[str]:
+        return self.storage.object_etag(self.object_key)
+
+
+class TableWatermark(Resource):
+    """
+    ClickHouse 表：以行数和水位列最大值作为版本
+    同一连接不能被多个线程同时使用，水位查询统一串行执行；连接不应与并行任务共用
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, ch_connector, table: str, column: Optional[str] = 'date'):
+        self.ch = ch_connector
+        self.table = table
+        self.column = column
+
+    @property
+    def id(self) -> str:
+        return f"table:{self.table}"
+
+    def fingerprint(self) -> Optional[str]:
+        watermark = f", max({self.column})" if self.column else ""
+        with self._lock:
+            row = self.ch.execute(f"SELECT count(){watermark} FROM {self.table}")[0]
+        return ':'.join(str(value) for value in row)
+
+
+class DateResource(Resource):
+    """运行日期：每个自然日一个版本，以它为输入的任务每天至多执行一次（today 可替换，便于测试）"""
+
+    def __init__(self, today: Callable[[], date] = date.today):
+        self.today = today
+
+    @property
+    def id(self) -> str:
+        return "date:today"
+
+    def fingerprint(self) -> Optional[str]:
+        return self.today().isoformat()
+
+
+class Task:
+    """
+    DAG 中的一个任务
+    参数:
+        name: 任务名（唯一）
+        func: 无参可调用对象
+        inputs / outputs: 输入、输出资源；输入版本与上次成功运行时相同且输出未被改动时跳过。
+            没有输入的根任务一旦成功就不会再执行，按日期重跑的任务应以 DateResource 为输入
+        deps: 上游任务名
+    """
+
+    def __init__(self, name: str, func: Callable[[], object], inputs: Sequence[Resource] = (),
+                 outputs: Sequence[Resource] = (), deps: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+
+    def __repr__(self):
+        return f"Task({self.name!r}, deps={self.deps})"
+
+
+def _fingerprints(resources: Iterable[Resource]) -> Dict[str, Optional[str]]:
+    return {resource.id: resource.fingerprint() for resource in resources}
+
+
+class DagScheduler:
+    """
+    本地 DAG 调度器
+
+    - 按依赖拓扑序调度，互不依赖的任务在线程池中并行执行
+    - 每个任务成功后把输入、输出的版本写入状态文件；下次运行时版本未变、且上游本轮都被跳过的任务直接跳过
+    - 任务失败时其下游标记为 upstream_failed，其余分支继续执行
+    """
+
+    RAN, SKIPPED, FAILED, UPSTREAM_FAILED = 'ran', 'skipped', 'failed', 'upstream_failed'
+
+    def __init__(self, state_path: str = "data/scheduler_state.json", max_workers: int = 4):
+        self.logger = logging.getLogger('scheduler')
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        self.tasks: Dict[str, Task] = {}
+
+    def add(self, task: Task) -> Task:
+        if task.name in self.tasks:
+            raise ValueError(f"任务重名: {task.name}")
+        self.tasks[task.name] = task
+        return task
+
+    def task(self, name: str, inputs: Sequence[Resource] = (), outputs: Sequence[Resource] = (),
+             deps: Sequence[str] = ()):
+        """装饰器形式注册任务"""
+        def decorator(func):
+            self.add(Task(name, func, inputs, outputs, deps))
+            return func
+        return decorator
+
+    def topological_order(self) -> List[str]:
+        """Kahn 拓扑排序，检测缺失依赖和环"""
+        for task in self.tasks.values():
+            missing = [dep for dep in task.deps if dep not in self.tasks]
+            if missing:
+                raise ValueError(f"任务 {task.name} 依赖不存在的任务: {missing}")
+
+        remaining = {name: len(task.deps) for name, task in self.tasks.items()}
+        order = [name for name, count in remaining.items() if count == 0]
+        for name in order:
+            for other in self.tasks.values():
+                if name in other.deps:
+                    remaining[other.name] -= 1
+                    if remaining[other.name] == 0:
+                        order.append(other.name)
+
+        if len(order) != len(self.tasks):
+            raise ValueError(f"任务依赖存在环: {sorted(set(self.tasks) - set(order))}")
+        return order
+
+    def run(self, targets: Optional[Sequence[str]] = None, force: bool = False) -> Dict[str, str]:
+        """
+        执行 DAG
+        参数:
+            targets: 只运行这些任务及其上游，默认全部
+            force: 忽略状态文件，全部重新执行
+        返回:
+            {任务名: ran / skipped / failed / upstream_failed}
+        """
+        order = self.topological_order()
+        selected = self._with_upstream(targets) if targets else set(order)
+        pending = [name for name in order if name in selected]
+
+        state = self._load_state()
+        status: Dict[str, str] = {}
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='dag') as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.tasks[name].deps
+                    if any(status.get(dep) in (self.FAILED, self.UPSTREAM_FAILED) for dep in deps):
+                        status[name] = self.UPSTREAM_FAILED
+                        pending.remove(name)
+                        self.logger.warning(f"Task {name} skipped: upstream failed")
+                    elif all(dep in status for dep in deps):
+                        pending.remove(name)
+                        upstream_ran = any(status[dep] == self.RAN for dep in deps)
+                        running[pool.submit(self._run_task, self.tasks[name], state, upstream_ran, force)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name], record = future.result()
+                    except Exception as e:
+                        status[name] = self.FAILED
+                        self.logger.error(f"Task {name} failed: {e}", exc_info=True)
+                        continue
+                    # 状态只在调度线程中更新
+                    if record is not None:
+                        state[name] = record
+                        self._save_state(state)
+
+        self.logger.info(f"DAG finished: {status}")
+        return status
+
+    def _run_task(self, task: Task, state: Dict, upstream_ran: bool, force: bool):
+        inputs = _fingerprints(task.inputs)
+        previous = state.get(task.name)
+        if (
+                not force
+                and not upstream_ran
+                and previous is not None
+                and previous.get('inputs') == inputs
+                and previous.get('outputs') == _fingerprints(task.outputs)
+        ):
+            self.logger.info(f"Task {task.name} up to date, skipped")
+            return self.SKIPPED, None
+
+        self.logger.info(f"Running task {task.name}")
+        task.func()
+        # 输入版本取执行前的值：若执行期间输入又有变化，下次运行会重新执行
+        return self.RAN, {'inputs': inputs, 'outputs': _fingerprints(task.outputs)}
+
+    def _with_upstream(self, targets: Sequence[str]) -> set:
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.tasks:
+                raise ValueError(f"未知任务: {name}")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.tasks[name].deps)
+        return selected
+
+    def _load_state(self) -> Dict:
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self, state: Dict) -> None:
+        """先写临时文件再替换，进程中断不会留下半个状态文件"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,105 @@
+import logging
+from pathlib import Path
+from typing import Callable, Optional
+
+from analysis.price_index import PriceIndexCalculator
+from analysis.visualization import PriceIndexVisualizer
+from scheduler.dag import DagScheduler, DateResource, FileResource, ObjectResource, TableWatermark, Task
+from storage.clickhouse_connector import ClickHouseConnector
+
+
+def build_daily_dag(
+        pipeline,
+        ch_factory: Callable[[], ClickHouseConnector] = ClickHouseConnector,
+        raw_key: str = "raw/data.csv",
+        data_dir: str = "data",
+        generate: Optional[Callable[[], object]] = None,
+        max_workers: int = 4
+) -> DagScheduler:
+    """
+    构建每日任务 DAG：
+
+        [generate] → etl → cavallo_index → plot_cavallo ─┐
+                         → tmall_index   → plot_tmall   ─┴→ plot_comparison
+
+    参数:
+        pipeline: DataPipeline 实例，etl 任务调用其 run_etl()
+        ch_factory: ClickHouse 连接工厂；两个指数任务并行执行，各用一个连接，水位查询另用一个
+        raw_key: 原始数据对象键
+        data_dir: 指数 CSV、图表和调度状态文件的目录
+        generate: 可选的模拟数据生成任务，需把数据写到 raw_key；以运行日期为输入，每天执行一次
+    """
+    logger = logging.getLogger('daily_jobs')
+    data_dir = Path(data_dir)
+    dag = DagScheduler(state_path=str(data_dir / "scheduler_state.json"), max_workers=max_workers)
+
+    meta_ch = ch_factory()
+    raw = ObjectResource(pipeline.storage, raw_key)
+    price = TableWatermark(meta_ch, 'price')
+    item = TableWatermark(meta_ch, 'item', column=None)
+    category = TableWatermark(meta_ch, 'category', column='timestamp')
+    cavallo_csv = FileResource(data_dir / "cavallo_index.csv")
+    tmall_csv = FileResource(data_dir / "tmall_index.csv")
+    visualizer = PriceIndexVisualizer(str(data_dir))
+
+    def index_task(method: str):
+        def run():
+            calculator = PriceIndexCalculator(ch_factory(), output_dir=str(data_dir))
+            try:
+                if not getattr(calculator, f"calculate_{method}_index")():
+                    raise RuntimeError(f"{method} 指数计算结果为空")
+            finally:
+                calculator.ch.close()
+        return run
+
+    def plot_task(filename: str, title: str, png: str):
+        def run():
+            df = visualizer.load_index_data(filename)
+            if df is None:
+                raise FileNotFoundError(filename)
+            visualizer.plot_single_index(df, title, data_dir / png)
+        return run
+
+    def plot_comparison():
+        cavallo = visualizer.load_index_data("cavallo_index.csv")
+        tmall = visualizer.load_index_data("tmall_index.csv")
+        if cavallo is None or tmall is None:
+            raise FileNotFoundError("指数 CSV 缺失")
+        visualizer.plot_dual_indices(cavallo, tmall, data_dir / "price_indices_comparison.png")
+
+    etl_deps = []
+    if generate is not None:
+        dag.add(Task('generate', generate, inputs=[DateResource()], outputs=[raw]))
+        etl_deps = ['generate']
+
+    dag.add(Task('etl', pipeline.run_etl, inputs=[raw], outputs=[price], deps=etl_deps))
+    dag.add(Task('cavallo_index', index_task('cavallo'), inputs=[price], outputs=[cavallo_csv], deps=['etl']))
+    dag.add(Task('tmall_index', index_task('tmall'), inputs=[price, item, category], outputs=[tmall_csv],
+                 deps=['etl']))
+    dag.add(Task('plot_cavallo', plot_task("cavallo_index.csv", "Cavallo价格指数", "cavallo_index.png"),
+                 inputs=[cavallo_csv], outputs=[FileResource(data_dir / "cavallo_index.png")],
+                 deps=['cavallo_index']))
+    dag.add(Task('plot_tmall', plot_task("tmall_index.csv", "Tmall价格指数", "tmall_index.png"),
+                 inputs=[tmall_csv], outputs=[FileResource(data_dir / "tmall_index.png")],
+                 deps=['tmall_index']))
+    dag.add(Task('plot_comparison', plot_comparison, inputs=[cavallo_csv, tmall_csv],
+                 outputs=[FileResource(data_dir / "price_indices_comparison.png")],
+                 deps=['cavallo_index', 'tmall_index']))
+
+    logger.info(f"Daily DAG built: {dag.topological_order()}")
+    return dag
+
+
+if __name__ == "__main__":
+    import argparse
+    from processing.data_pipeline import DataPipeline
+
+    parser = argparse.ArgumentParser(description="运行每日 ETL 与指数计算 DAG")
+    parser.add_argument('--force', action='store_true', help="忽略状态文件，全部重新执行")
+    parser.add_argument('--target', action='append', help="只运行指定任务及其上游，可重复")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    status = build_daily_dag(DataPipeline(), max_workers=args.workers).run(targets=args.target, force=args.force)
+    print(status)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional, Sequence
+
+import pandas as pd
+
+from storage.clickhouse_connector import ClickHouseConnector
+from storage.oss_connector import OSSConnector
+
+
+class AsyncClickHouseConnector:
+    """
+    ClickHouseConnector 的 asyncio 包装
+
+    clickhouse_driver 是同步驱动，且单个 Client 不能被多个线程同时使用，
+    因此维护一个连接池：每次调用借出一个连接，在线程池中执行，完成后归还；
+    池大小即该后端的并发上限
+    """
+
+    def __init__(self, pool_size: int = 4, factory: Callable[[], ClickHouseConnector] = ClickHouseConnector):
+        self.logger = logging.getLogger('async_clickhouse')
+        self.pool_size = pool_size
+        self._factory = factory
+        self._pool: Optional[asyncio.Queue] = None
+        self._pool_lock = asyncio.Lock()
+        self._connections = []
+
+    async def _ensure_pool(self) -> asyncio.Queue:
+        # 连接在首次使用时于事件循环内创建，建连本身也放到线程中执行；
+        # 建连期间会让出事件循环，并发的首批调用在锁上等待，只建一个池
+        if self._pool is not None:
+            return self._pool
+        async with self._pool_lock:
+            if self._pool is None:
+                pool = asyncio.Queue()
+                for _ in range(self.pool_size):
+                    connector = await asyncio.to_thread(self._factory)
+                    self._connections.append(connector)
+                    pool.put_nowait(connector)
+                self._pool = pool
+                self.logger.info(f"ClickHouse connection pool ready (size={self.pool_size})")
+        return self._pool
+
+    @asynccontextmanager
+    async def connection(self):
+        """借出一个同步连接，供需要在线程中连续执行多条查询的调用方使用"""
+        pool = await self._ensure_pool()
+        connector = await pool.get()
+        try:
+            yield connector
+        finally:
+            pool.put_nowait(connector)
+
+    async def _call(self, method: str, *args, **kwargs):
+        async with self.connection() as connector:
+            return await asyncio.to_thread(getattr(connector, method), *args, **kwargs)
+
+    async def execute(self, query: str, params=None):
+        return await self._call('execute', query, params)
+
+    async def execute_query(self, query: str, params=None, return_dataframe: bool = False):
+        return await self._call('execute_query', query, params, return_dataframe=return_dataframe)
+
+    async def insert_columns(self, table: str, columns: Dict[str, Sequence]) -> int:
+        return await self._call('insert_columns', table, columns)
+
+    async def insert_dataframe(self, table: str, df: pd.DataFrame) -> int:
+        return await self._call('insert_dataframe', table, df)
+
+    async def close(self):
+        for connector in self._connections:
+            await asyncio.to_thread(connector.close)
+        self._connections.clear()
+        self._pool = None
+
+
+class AsyncOSSConnector:
+    """
+    OSSConnector 的 asyncio 包装：上传下载在线程中执行，信号量限制同时进行的传输数
+    （oss2 / minio 客户端本身可在多线程间共享）
+    """
+
+    def __init__(self, storage: OSSConnector = None, max_concurrency: int = 8):
+        self.storage = storage or OSSConnector()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def download_dataframe(self, object_key: str, **kwargs) -> Optional[pd.DataFrame]:
+        async with self._semaphore:
+            return await asyncio.to_thread(self.storage.download_dataframe, object_key, **kwargs)
+
+    async def upload_dataframe(self, df: pd.DataFrame, object_key: str, **kwargs) -> bool:
+        async with self._semaphore:
+            return await asyncio.to_thread(self.storage.upload_dataframe, df, object_key, **kwargs)
+
+    async def upload_parquet(self, df: pd.DataFrame, object_key: str, **kwargs) -> bool:
+        async with self._semaphore:
+            return await asyncio.to_thread(self.storage.upload_parquet, df, object_key, **kwargs)
@@ -1,7 +1,8 @@
 import os
 import logging
-from clickhouse_driver import Client
-from cloud_config import settings
+from typing import Any, Dict, Sequence, Tuple
+from config.cloud_settings import settings
+from monitoring.spans import enabled as spans_enabled, span
 
 class ClickHouseConnector:
     def __init__(self):
@@ -11,13 +12,19 @@ class ClickHouseConnector:
 
     def _create_client(self):
         """创建适配阿里云的ClickHouse客户端"""
+        from clickhouse_driver import Client  # 首次建立连接时才加载驱动
+
         # 基础连接参数
         conn_params = {
             'host': settings.CH_HOST,
             'port': settings.CH_PORT,
             'user': settings.CH_USER,
             'password': settings.CH_PASSWORD,
-            'database': 'default'
+            'database': 'default',
+            'settings': {
+                # 查询参数以 {name:Type} 占位符交给服务端绑定，SQL 文本不随参数变化
+                'server_side_params': True
+            }
         }
 
         # 阿里云专用配置
@@ -27,10 +34,10 @@ class ClickHouseConnector:
                 'verify': False,  # 阿里云通常使用自签名证书，设为False
                 'connect_timeout': 15,
                 'send_receive_timeout': 30,
-                'settings': {
-                    'insert_distributed_sync': 1,
-                    'max_memory_usage': 10_000_000_000
-                }
+            })
+            conn_params['settings'].update({
+                'insert_distributed_sync': 1,
+                'max_memory_usage': 10_000_000_000
             })
             self.logger.debug("使用阿里云ClickHouse专用配置")
 
@@ -40,25 +47,38 @@ class ClickHouseConnector:
         """统一执行 SQL 查询接口"""
         try:
             self.logger.debug(f"Executing query: {query}")
-            if params:
-                result = self.client.execute(query, params)
-            else:
-                result = self.client.execute(query)
+            with span('clickhouse.execute') as s:
+                if params:
+                    result = self.client.execute(query, params)
+                else:
+                    result = self.client.execute(query)
+                if spans_enabled():
+                    s.set(bytes=self.last_query_bytes())
             return result
         except Exception as e:
             self.logger.error(f"Error executing query: {e}")
             raise
 
+    def last_query_bytes(self) -> int:
+        """上一条查询在服务端读取和写入的字节数（取自驱动的查询进度），无进度信息时为 0"""
+        progress = getattr(getattr(self.client, 'last_query', None), 'progress', None)
+        if progress is None:
+            return 0
+        return getattr(progress, 'bytes', 0) + getattr(progress, 'written_bytes', 0)
+
     def execute_query(self, query: str, params=None, return_dataframe: bool = False):
         """
         执行查询并返回格式化结果
         """
         try:
             self.logger.debug(f"Executing query: {query}")
-            if params:
-                result, columns = self.client.execute(query, params, with_column_types=True)
-            else:
-                result, columns = self.client.execute(query, with_column_types=True)
+            with span('clickhouse.query') as s:
+                if params:
+                    result, columns = self.client.execute(query, params, with_column_types=True)
+                else:
+                    result, columns = self.client.execute(query, with_column_types=True)
+                if spans_enabled():
+                    s.set(rows_out=len(result), bytes=self.last_query_bytes())
 
             if return_dataframe:
                 import pandas as pd
@@ -72,9 +92,18 @@ class ClickHouseConnector:
             self.logger.error(f"Query execution failed: {str(e)}")
             raise
 
-    def initialize_tables(self):
-        """初始化数据库表格，创建 category、item 和 price 表"""
+    def initialize_tables(self, item_keys: bool = False, partitioned: bool = False, change_log: bool = False):
+        """
+        初始化数据库表格，创建 category、item 和 price 表
+        item_keys=True 时建字典编码模式：item_dict 保存 item_id ↔ UInt32 代理键，
+        item/price 以 item_key 排序和关联，item_id 仅以 LowCardinality 冗余保留用于展示
+        partitioned=True 时 price 按月分区并带列压缩编码和按商品排序的投影，见 _price_table_ddl
+        change_log=True 时另建价格变更日志表 price_change，见 _price_change_table_ddl
+        """
         try:
+            if change_log:
+                self.client.execute(self._price_change_table_ddl('price_change', item_keys=item_keys))
+
             # 创建 category 表
             self.client.execute('''
                                 CREATE TABLE IF NOT EXISTS category
@@ -87,6 +116,11 @@ class ClickHouseConnector:
                                       ORDER BY category_id;
                                 ''')
 
+            if item_keys:
+                self._create_keyed_tables(partitioned)
+                self.logger.info("Keyed tables initialized successfully.")
+                return
+
             # 创建 item 表
             self.client.execute('''
                                 CREATE TABLE IF NOT EXISTS item
@@ -98,21 +132,153 @@ class ClickHouseConnector:
                                 ''')
 
             # 创建 price 表
-            self.client.execute('''
-                                CREATE TABLE IF NOT EXISTS price
-                                (
-                                    date    Date,
-                                    item_id String,
-                                    price   Float64
-                                ) ENGINE = MergeTree()
-                                      ORDER BY (date, item_id);
-                                ''')
+            self.client.execute(self._price_table_ddl('price', partitioned=partitioned))
 
             self.logger.info("Tables initialized successfully.")
         except Exception as e:
             self.logger.error(f"Failed to initialize tables: {str(e)}")
             raise
 
+    def _create_keyed_tables(self, partitioned: bool = False):
+        """创建字典编码模式的 item_dict、item 和 price 表"""
+        self.client.execute('''
+                            CREATE TABLE IF NOT EXISTS item_dict
+                            (
+                                item_key UInt32,
+                                item_id  String
+                            ) ENGINE = ReplacingMergeTree()
+                                  ORDER BY item_key;
+                            ''')
+
+        self.client.execute('''
+                            CREATE TABLE IF NOT EXISTS item
+                            (
+                                item_key    UInt32,
+                                item_id     LowCardinality(String),
+                                category_id UInt32
+                            ) ENGINE = MergeTree()
+                                  ORDER BY item_key;
+                            ''')
+
+        self.client.execute(self._price_table_ddl('price', item_keys=True, partitioned=partitioned))
+
+    @staticmethod
+    def _price_table_ddl(table: str, item_keys: bool = False, partitioned: bool = False) -> str:
+        """
+        生成 price 表建表语句
+
+        partitioned=True 时：
+            - 按月分区，按日期过滤的指数查询只读取相关月份的分区
+            - date 用 Delta+ZSTD、price 用 Gorilla+ZSTD 编码，排序后的日期和相邻价格压缩率更高
+            - 投影 by_item 按 (商品键, date) 排序，基期价格和单品历史查询由优化器自动选用
+        """
+        key = 'item_key' if item_keys else 'item_id'
+        key_columns = (
+            'item_key UInt32,\n    item_id LowCardinality(String),' if item_keys
+            else 'item_id String,'
+        )
+
+        if not partitioned:
+            return f'''
+CREATE TABLE IF NOT EXISTS {table}
+(
+    date Date,
+    {key_columns}
+    price Float64
+) ENGINE = MergeTree()
+      ORDER BY (date, {key});
+'''
+
+        return f'''
+CREATE TABLE IF NOT EXISTS {table}
+(
+    date Date CODEC(Delta, ZSTD),
+    {key_columns}
+    price Float64 CODEC(Gorilla, ZSTD),
+    PROJECTION by_item
+    (
+        SELECT *
+        ORDER BY ({key}, date)
+    )
+) ENGINE = MergeTree()
+      PARTITION BY toYYYYMM(date)
+      ORDER BY (date, {key});
+'''
+
+    @staticmethod
+    def _price_change_table_ddl(table: str, item_keys: bool = False) -> str:
+        """
+        生成价格变更日志表建表语句：每行是一次入样、变价或出样（price 为 NULL），
+        行数约为每日全量快照的 2%；按商品排序，便于按商品顺序扫描还原每日价格
+        """
+        key = 'item_key' if item_keys else 'item_id'
+        key_columns = (
+            'item_key UInt32,\n    item_id LowCardinality(String),' if item_keys
+            else 'item_id String,'
+        )
+        return f'''
+CREATE TABLE IF NOT EXISTS {table}
+(
+    effective_date Date CODEC(Delta, ZSTD),
+    {key_columns}
+    price Nullable(Float64)
+) ENGINE = MergeTree()
+      ORDER BY ({key}, effective_date);
+'''
+
+    def migrate_price_schema(self, item_keys: bool = False, keep_backup: bool = True) -> int:
+        """
+        把现有 price 表迁移为分区、编码、带投影的结构
+
+        前提：迁移期间暂停所有写入 price 的任务（ETL、回填等）。
+        流程：记录原表 count() 与 max(date) → 建 price_v2 → INSERT SELECT 全量复制 → 校验行数
+        → 换表前再次读取原表 count() 与 max(date)，与复制前不一致说明仍有写入，删除 price_v2 并中止
+        → EXCHANGE TABLES 换表。EXCHANGE TABLES 对读写方是原子的（需要 Atomic 库引擎），
+        换表前任何一步失败都不影响原表
+        参数:
+            item_keys: 现有 price 表是否为字典编码模式
+            keep_backup: 保留原表为 price_backup，否则删除
+        返回:
+            int: 迁移行数
+        """
+        columns = 'date, item_key, item_id, price' if item_keys else 'date, item_id, price'
+        try:
+            snapshot = self._price_snapshot()
+
+            self.client.execute('DROP TABLE IF EXISTS price_v2')
+            self.client.execute(self._price_table_ddl('price_v2', item_keys=item_keys, partitioned=True))
+            self.client.execute(f'INSERT INTO price_v2 ({columns}) SELECT {columns} FROM price')
+
+            copied_rows = self.client.execute('SELECT count() FROM price_v2')[0][0]
+            if copied_rows != snapshot[0]:
+                raise RuntimeError(f"price 迁移行数不一致: {snapshot[0]} -> {copied_rows}")
+
+            # 换表前确认复制期间没有写入，否则这些行不在 price_v2 中，换表后会丢失
+            current = self._price_snapshot()
+            if current != snapshot:
+                self.client.execute('DROP TABLE IF EXISTS price_v2')
+                raise RuntimeError(
+                    f"price 在迁移期间被写入 (count, max(date)): {snapshot} -> {current}，"
+                    f"已中止迁移，请暂停写入后重试"
+                )
+
+            self.client.execute('EXCHANGE TABLES price AND price_v2')
+            self.client.execute('DROP TABLE IF EXISTS price_backup')
+            self.client.execute('RENAME TABLE price_v2 TO price_backup')
+            if not keep_backup:
+                self.client.execute('DROP TABLE price_backup')
+
+            self.logger.info(f"Migrated {copied_rows} rows into partitioned price table.")
+            return copied_rows
+        except Exception as e:
+            self.logger.error(f"Failed to migrate price schema: {str(e)}")
+            raise
+
+    def _price_snapshot(self) -> Tuple[int, Any]:
+        """price 表的 (count(), max(date))，用于确认迁移期间没有写入"""
+        rows, latest = self.client.execute('SELECT count(), max(date) FROM price')[0]
+        return rows, latest
+
     def insert_category(self, category_data):
         """批量插入类别数据"""
         try:
@@ -152,6 +318,35 @@ class ClickHouseConnector:
             self.logger.error(f"Failed to insert price data: {str(e)}")
             raise
 
+    def insert_columns(self, table: str, columns: Dict[str, Sequence]) -> int:
+        """
+        按列批量插入（columnar 块），省去逐行组装元组
+        参数:
+            table: 目标表名
+            columns: {列名: 列数据}，各列长度一致
+        返回:
+            int: 写入行数
+        """
+        try:
+            names = ', '.join(columns)
+            data = [list(values) for values in columns.values()]
+            rows = len(data[0]) if data else 0
+            if rows == 0:
+                return 0
+
+            with span('clickhouse.insert', table=table) as s:
+                s.set(rows_in=rows)
+                self.client.execute(f"INSERT INTO {table} ({names}) VALUES", data, columnar=True)
+            self.logger.info(f"Inserted {rows} rows into {table} table (columnar).")
+            return rows
+        except Exception as e:
+            self.logger.error(f"Failed to insert columns into {table}: {str(e)}")
+            raise
+
+    def insert_dataframe(self, table: str, df) -> int:
+        """把 DataFrame 按列写入表，列名即表字段名"""
+        return self.insert_columns(table, {column: df[column].tolist() for column in df.columns})
+
     def close(self):
         """关闭连接"""
         try:
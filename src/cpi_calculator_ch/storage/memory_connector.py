@@ -0,0 +1,174 @@
+import logging
+import re
+import threading
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class InMemoryClickHouseConnector:
+    """
+    进程内 ClickHouse 替身（用于压测和本地调试）
+
+    数据按表保存在内存中的 DataFrame 里，只实现 initialize_tables / insert_* 写入接口，
+    以及 PriceIndexCalculator 用到的几类查询；其他 SQL 会抛出 NotImplementedError。
+    """
+
+    TABLE_COLUMNS = {
+        'category': ['category_id', 'name', 'weight', 'timestamp'],
+        'item': ['item_id', 'category_id'],
+        'price': ['date', 'item_id', 'price'],
+        'price_change': ['effective_date', 'item_id', 'price'],
+    }
+
+    def __init__(self):
+        self.logger = logging.getLogger('memory_connector')
+        self._lock = threading.Lock()
+        self._tables: Dict[str, pd.DataFrame] = {}
+        self._pending: Dict[str, List[pd.DataFrame]] = {}
+
+    def initialize_tables(self):
+        """创建空表（已存在则保留）"""
+        with self._lock:
+            for table, columns in self.TABLE_COLUMNS.items():
+                self._tables.setdefault(table, pd.DataFrame(columns=columns))
+                self._pending.setdefault(table, [])
+        self.logger.info("In-memory tables initialized.")
+
+    def insert_columns(self, table: str, columns: Dict[str, Sequence]) -> int:
+        """按列追加数据，返回写入行数"""
+        block = pd.DataFrame({name: list(values) for name, values in columns.items()})
+        if block.empty:
+            return 0
+        with self._lock:
+            self._pending.setdefault(table, []).append(block)
+        return len(block)
+
+    def insert_dataframe(self, table: str, df: pd.DataFrame) -> int:
+        return self.insert_columns(table, {column: df[column].tolist() for column in df.columns})
+
+    def insert_category(self, category_data):
+        return self._insert_rows('category', category_data)
+
+    def insert_item(self, item_data):
+        return self._insert_rows('item', item_data)
+
+    def insert_price(self, price_data):
+        return self._insert_rows('price', price_data)
+
+    def execute(self, query: str, params=None):
+        return [tuple(row.values()) for row in self.execute_query(query, params)]
+
+    def execute_query(self, query: str, params=None, return_dataframe: bool = False):
+        """按查询形状分派到对应的 pandas 实现"""
+        sql = re.sub(r'\s+', ' ', query.replace('\\', ' ')).strip().lower()
+
+        key = 'item_key' if 'item_key' in sql else 'item_id'
+
+        if 'laginframe(' in sql:
+            result = self._category_daily_links(key)
+        elif 'from price_change' in sql and 'argmax(' in sql:
+            result = self._latest_changes(key, params['before'])
+        elif 'count() as row_count from price_change' in sql:
+            result = pd.DataFrame({'row_count': [len(self._table('price_change'))]})
+        elif 'min(effective_date)' in sql:
+            changes = self._table('price_change')
+            result = pd.DataFrame({'min_date': [pd.to_datetime(changes['effective_date']).min().date()]})
+        elif 'from price_change' in sql and 'count(distinct' in sql:
+            changes = self._table('price_change')
+            entered = (pd.to_datetime(changes['effective_date']) == pd.Timestamp(params['day'])) & changes['price'].notna()
+            result = pd.DataFrame({'item_count': [changes.loc[entered, key].nunique()]})
+        elif 'from price_change' in sql:
+            result = self._table('price_change').rename(columns={'effective_date': 'date'})
+            result = result[['date', key, 'price']].sort_values([key, 'date'], kind='stable')
+        elif sql.startswith(f'select {key}, category_id from item'):
+            result = self._table('item')[[key, 'category_id']]
+        elif 'from price p' in sql and 'join item' in sql:
+            result = self._daily_category_data(key)
+        elif sql.startswith('select category_id, weight from category'):
+            result = self._table('category')[['category_id', 'weight']]
+        elif 'count(distinct' in sql:
+            if params and 'day' in params:
+                day = pd.Timestamp(params['day'])
+            else:
+                day = pd.Timestamp(re.search(r"date = '([^']+)'", sql).group(1))
+            price = self._table('price')
+            count = price.loc[pd.to_datetime(price['date']) == day, key].nunique()
+            result = pd.DataFrame({'item_count' if 'as item_count' in sql else 'count()': [count]})
+        elif 'min(date)' in sql:
+            price = self._table('price')
+            result = pd.DataFrame({'min_date': [pd.to_datetime(price['date']).min().date()]})
+        elif 'count() as row_count from price' in sql:
+            result = pd.DataFrame({'row_count': [len(self._table('price'))]})
+        elif 'count() from price' in sql:
+            result = pd.DataFrame({'count()': [len(self._table('price'))]})
+        elif 'from price' in sql:
+            result = self._table('price')[['date', key, 'price']].sort_values('date', kind='stable')
+        else:
+            raise NotImplementedError(f"InMemoryClickHouseConnector 不支持该查询: {query}")
+
+        if return_dataframe:
+            return result.reset_index(drop=True)
+        return result.to_dict('records')
+
+    def close(self):
+        with self._lock:
+            self._tables.clear()
+            self._pending.clear()
+
+    def _insert_rows(self, table: str, rows) -> int:
+        block = pd.DataFrame(list(rows), columns=self.TABLE_COLUMNS[table])
+        with self._lock:
+            self._pending.setdefault(table, []).append(block)
+        return len(block)
+
+    def _table(self, table: str) -> pd.DataFrame:
+        """合并尚未归并的写入块（类似 MergeTree 的后台合并）后返回整表"""
+        with self._lock:
+            pending = self._pending.get(table, [])
+            if pending:
+                base = self._tables.get(table)
+                parts = ([base] if base is not None and not base.empty else []) + pending
+                self._tables[table] = pd.concat(parts, ignore_index=True)
+                self._pending[table] = []
+            return self._tables.get(table, pd.DataFrame(columns=self.TABLE_COLUMNS[table]))
+
+    def _latest_changes(self, key: str, before) -> pd.DataFrame:
+        """各商品在 before 之前的最后一条变更记录"""
+        changes = self._table('price_change')
+        changes = changes[pd.to_datetime(changes['effective_date']) < pd.Timestamp(before)]
+        latest = changes.sort_values('effective_date', kind='stable').drop_duplicates(key, keep='last')
+        return latest[[key, 'price']].sort_values(key, kind='stable')
+
+    def _category_daily_links(self, key: str) -> pd.DataFrame:
+        """category_daily_links：商品在上一个有价格的日期和当天都有正价格时计入类内对数环比均值"""
+        price = self._table('price')
+        price = price.assign(date=pd.to_datetime(price['date']).dt.date, price=pd.to_numeric(price['price']))
+        days = sorted(price['date'].unique())
+        day_before = pd.Series(days[:-1], index=days[1:], dtype=object)
+
+        items = price[price['price'] > 0].drop_duplicates(['date', key]).merge(
+            self._table('item')[[key, 'category_id']], on=key
+        ).sort_values([key, 'date'], kind='stable')
+        previous = items.groupby(key)[['date', 'price']].shift()
+        matched = previous['date'].eq(items['date'].map(day_before)) & (previous['price'] > 0)
+        items['link'] = np.log(items['price'] / previous['price']).where(matched)
+
+        grouped = items.groupby(['date', 'category_id'], as_index=False).agg(
+            link=('link', 'mean'),
+            item_count=(key, 'count')
+        )
+        return grouped.sort_values(['date', 'category_id'], kind='stable')
+
+    def _daily_category_data(self, key: str = 'item_id') -> pd.DataFrame:
+        price = self._table('price')
+        item = self._table('item')
+        category = self._table('category')
+
+        merged = price.merge(item, on=key).merge(category, on='category_id')
+        grouped = merged.groupby(['date', 'category_id', 'name', 'weight'], as_index=False).agg(
+            avg_price=('price', 'mean'),
+            item_count=(key, 'count')
+        )
+        return grouped.rename(columns={'name': 'category_name'}).sort_values('date', kind='stable')
@@ -1,7 +1,15 @@
+import importlib.util
 import pandas as pd
 from io import StringIO, BytesIO
-from typing import Union
+from typing import Iterator, Union
 from config.cloud_settings import settings
+from monitoring.spans import span
+
+
+def require_parquet_engine() -> None:
+    """Parquet 写入依赖 pyarrow（可选依赖 parquet），缺失时直接报错，而不是混在上传失败里"""
+    if importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("写入 Parquet 需要 pyarrow，请安装可选依赖：pip install .[parquet]")
 
 
 class OSSConnector:
@@ -41,36 +49,113 @@ class OSSConnector:
         try:
             csv_buffer = StringIO()
             df.to_csv(csv_buffer, index=False, **kwargs)
+            # 只编码一次，上传和字节统计共用；length 须为字节数，非 ASCII 内容时与字符数不同
+            data = csv_buffer.getvalue().encode('utf-8')
+            del csv_buffer
+
+            with span('oss.upload', format='csv') as s:
+                s.set(rows_in=len(df), bytes=len(data))
+                if settings.IS_LOCAL:
+                    self.client.put_object(settings.OSS_BUCKET, object_key, BytesIO(data), length=len(data))
+                else:
+                    self.bucket.put_object(object_key, data)
+
+            return True
+        except Exception as e:
+            self._log_error(e)
+            return False
+
+    def upload_parquet(self, df: pd.DataFrame, object_key: str, **kwargs) -> bool:
+        """DataFrame 以 Parquet 格式上传；未安装 pyarrow 时抛出 ImportError"""
+        require_parquet_engine()
+        try:
+            buffer = BytesIO()
+            df.to_parquet(buffer, index=False, **kwargs)
+            data = buffer.getvalue()
+
+            with span('oss.upload', format='parquet') as s:
+                s.set(rows_in=len(df), bytes=len(data))
+                if settings.IS_LOCAL:
+                    self.client.put_object(settings.OSS_BUCKET, object_key, BytesIO(data), length=len(data))
+                else:
+                    self.bucket.put_object(object_key, data)
+
+            return True
+        except Exception as e:
+            self._log_error(e)
+            return False
+
+    def object_url(self, object_key: str) -> str:
+        """ClickHouse 服务端 s3() 表函数访问该对象使用的 URL"""
+        if settings.IS_LOCAL:
+            return f"http://{settings.MINIO_SERVER_ENDPOINT}/{settings.OSS_BUCKET}/{object_key}"
+        return f"https://{settings.OSS_BUCKET}.{settings.OSS_ENDPOINT}/{object_key}"
 
+    def s3_named_collection(self) -> str:
+        """s3() 表函数使用的 ClickHouse 命名集合，凭证保存在服务端，不随 SQL 发送"""
+        if settings.IS_LOCAL:
+            return settings.MINIO_S3_COLLECTION
+        return settings.OSS_S3_COLLECTION
+
+    def delete_object(self, object_key: str) -> bool:
+        """删除对象，对象不存在时同样视为成功"""
+        try:
             if settings.IS_LOCAL:
-                self.client.put_object(
-                    settings.OSS_BUCKET,
-                    object_key,
-                    BytesIO(csv_buffer.getvalue().encode()),
-                    length=len(csv_buffer.getvalue())
-                )
+                self.client.remove_object(settings.OSS_BUCKET, object_key)
             else:
-                self.bucket.put_object(object_key, csv_buffer.getvalue())
-
+                self.bucket.delete_object(object_key)
             return True
         except Exception as e:
             self._log_error(e)
             return False
 
+    def object_etag(self, object_key: str) -> Union[str, None]:
+        """对象的 ETag（内容版本标识），对象不存在时返回 None"""
+        try:
+            if settings.IS_LOCAL:
+                return self.client.stat_object(settings.OSS_BUCKET, object_key).etag
+            return self.bucket.head_object(object_key).etag
+        except Exception as e:
+            if getattr(e, 'status', None) == 404 or getattr(e, 'code', None) in ('NoSuchKey', 'NoSuchObject'):
+                return None
+            raise
+
     def download_dataframe(self, object_key: str, **kwargs) -> Union[pd.DataFrame, None]:
         """下载CSV为DataFrame"""
         try:
-            if settings.IS_LOCAL:
-                response = self.client.get_object(settings.OSS_BUCKET, object_key)
-                data = response.read().decode('utf-8')
-            else:
-                data = self.bucket.get_object(object_key).read().decode('utf-8')
+            with span('oss.download') as s:
+                if settings.IS_LOCAL:
+                    response = self.client.get_object(settings.OSS_BUCKET, object_key)
+                    raw = response.read()
+                else:
+                    raw = self.bucket.get_object(object_key).read()
 
-            return pd.read_csv(StringIO(data), **kwargs)
+                df = pd.read_csv(StringIO(raw.decode('utf-8')), **kwargs)
+                s.set(rows_out=len(df), bytes=len(raw))
+            return df
         except Exception as e:
             self._log_error(e)
             return None
 
+    def iter_dataframe_chunks(self, object_key: str, chunksize: int = 100_000, **kwargs) -> Iterator[pd.DataFrame]:
+        """流式下载CSV，按 chunksize 行逐块产出 DataFrame，不把整个对象读入内存"""
+        if settings.IS_LOCAL:
+            response = self.client.get_object(settings.OSS_BUCKET, object_key)
+        else:
+            response = self.bucket.get_object(object_key)
+
+        try:
+            with pd.read_csv(response, chunksize=chunksize, **kwargs) as reader:
+                for chunk in reader:
+                    yield chunk
+        except Exception as e:
+            self._log_error(e)
+            raise
+        finally:
+            response.close()
+            if settings.IS_LOCAL:
+                response.release_conn()
+
     def _log_error(self, error: Exception):
         """统一错误处理"""
         import logging
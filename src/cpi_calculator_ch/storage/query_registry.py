@@ -0,0 +1,124 @@
+import logging
+import re
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, NamedTuple
+
+import pandas as pd
+
+from monitoring.spans import enabled as spans_enabled, span
+
+# ClickHouse 服务端参数占位符：{name:Type}
+_PLACEHOLDER = re.compile(r'\{(\w+):([^}]+)\}')
+
+
+class NamedQuery(NamedTuple):
+    name: str
+    sql: str
+    params: Dict[str, str]  # {参数名: ClickHouse 类型}
+
+
+def _coerce_param(value: Any, type_: str) -> Any:
+    """把 Python 参数值转换为与占位符类型匹配的值，日期统一转为 date/datetime"""
+    if type_ == 'Date':
+        return pd.Timestamp(value).date()
+    if type_.startswith('DateTime'):
+        return pd.Timestamp(value).to_pydatetime()
+    if isinstance(value, (date, datetime)):
+        return value
+    if type_.startswith(('UInt', 'Int')):
+        return int(value)
+    if type_.startswith('Float'):
+        return float(value)
+    return value
+
+
+class QueryRegistry:
+    """
+    具名查询注册表
+
+    每条 SQL 只定义一次，参数以 {name:Type} 占位符声明，执行时通过驱动的服务端参数绑定
+    （客户端设置 server_side_params）发送，SQL 文本在多次调用间保持不变，不再拼接参数值；
+    同时按查询名累计调用次数和耗时
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('query_registry')
+        self._queries: Dict[str, NamedQuery] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, sql: str) -> NamedQuery:
+        """注册查询，参数名和类型从占位符中解析"""
+        params = {}
+        for param, type_ in _PLACEHOLDER.findall(sql):
+            type_ = type_.strip()
+            if params.setdefault(param, type_) != type_:
+                raise ValueError(f"查询 {name} 中参数 {param} 的类型声明不一致")
+        query = NamedQuery(name, sql, params)
+        self._queries[name] = query
+        return query
+
+    def __getitem__(self, name: str) -> NamedQuery:
+        return self._queries[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._queries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._queries)
+
+    def run(self, ch_connector, name: str, return_dataframe: bool = False, **params):
+        """
+        执行具名查询
+        参数:
+            ch_connector: ClickHouseConnector（或实现 execute_query 的替身）
+            name: 查询名
+            return_dataframe: 是否返回 DataFrame
+            **params: 查询参数，必须与注册时声明的参数完全一致
+        """
+        query = self._queries[name]
+        missing = query.params.keys() - params.keys()
+        unexpected = params.keys() - query.params.keys()
+        if missing or unexpected:
+            raise ValueError(f"查询 {name} 参数不匹配: 缺少 {sorted(missing)}，多余 {sorted(unexpected)}")
+
+        bound = {key: _coerce_param(params[key], type_) for key, type_ in query.params.items()}
+
+        start = time.perf_counter()
+        try:
+            with span(f'query.{name}') as s:
+                result = ch_connector.execute_query(query.sql, bound or None, return_dataframe=return_dataframe)
+                if spans_enabled():
+                    # 测试替身等未实现 last_query_bytes 的连接器只记录行数
+                    last_query_bytes = getattr(ch_connector, 'last_query_bytes', None)
+                    s.set(rows_out=len(result), bytes=last_query_bytes() if last_query_bytes else None)
+            return result
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各查询的调用统计 {name: {'calls', 'total_ms', 'avg_ms', 'max_ms'}}"""
+        with self._lock:
+            return {
+                name: {
+                    'calls': int(s['calls']),
+                    'total_ms': round(s['total'] * 1000, 3),
+                    'avg_ms': round(s['total'] / s['calls'] * 1000, 3),
+                    'max_ms': round(s['max'] * 1000, 3),
+                }
+                for name, s in self._stats.items()
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def _record(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            s = self._stats.setdefault(name, {'calls': 0, 'total': 0.0, 'max': 0.0})
+            s['calls'] += 1
+            s['total'] += elapsed
+            s['max'] = max(s['max'], elapsed)
+        self.logger.debug(f"Query {name} took {elapsed * 1000:.3f} ms")
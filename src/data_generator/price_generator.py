@@ -2,7 +2,7 @@ import random
 import csv
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import NamedTuple, List
+from typing import NamedTuple, List, Iterator, Tuple, Dict, Optional
 from collections import defaultdict
 
 # 假设之前定义好的 Product 类型
@@ -76,7 +76,7 @@ class PriceGenerator:
         for p in self.current_products:
             # 高斯分布决定价格变动次数
             change_count = max(1, int(random.gauss(6, 2)))
-            change_count = min(change_count, total_days)
+            change_count = min(change_count, total_days - 1)
             # 从第 1 天到 total_days-1 天中采样
             change_dates = sorted(random.sample(range(1, total_days), change_count))
             self.price_change_plan[p.product_id] = change_dates
@@ -102,28 +102,79 @@ class PriceGenerator:
 
         self.current_products = updated
 
-def price_generator(products: List[Product], days: int = 365):
+    def iter_days(self, start_date: datetime, days: int = 365) -> Iterator[Tuple[datetime, List[Product]]]:
+        """逐日模拟：首次选品并生成价格变动计划，之后每天换品、调价，产出 (日期, 当日商品)"""
+        self.produce_init()
+        # 生成一次全年的价格变动计划
+        self.init_price_plan(start_date, total_days=days)
+
+        for day in range(days):
+            current = start_date + timedelta(days=day)
+            if day > 0:
+                self.adjust_products()
+                self.adjust_prices(current, start_date)
+            yield current, self.current_products
+
+    def iter_changes(self, start_date: datetime, days: int = 365) -> Iterator[Tuple[datetime, List[Tuple[int, Optional[float]]]]]:
+        """
+        逐日模拟，但只产出与前一天相比的变化 (日期, [(product_id, price), ...])：
+        首日为全部在样商品；之后为新入样或变价的商品，以及出样的商品（price 为 None）
+        同一商品在当日样本中出现多次时取第一条，与按日快照透视时 aggfunc='first' 一致
+        """
+        previous: Dict[int, float] = {}
+        for current, current_products in self.iter_days(start_date, days):
+            snapshot: Dict[int, float] = {}
+            for p in current_products:
+                snapshot.setdefault(p.product_id, p.price)
+
+            changes = [(pid, price) for pid, price in snapshot.items() if previous.get(pid) != price]
+            changes.extend((pid, None) for pid in previous if pid not in snapshot)
+            previous = snapshot
+            yield current, changes
+
+
+def write_price_changes(gen: PriceGenerator, start_date: datetime, days: int, path: Path) -> int:
+    """
+    以变更日志格式写出价格：每行 (product_id, effective_date, price)，
+    价格在下一条记录之前一直有效，price 为空表示商品自该日起出样；返回写入行数
+    """
+    rows = 0
+    with path.open('w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(["product_id", "effective_date", "price"])
+        for current, changes in gen.iter_changes(start_date, days):
+            effective_date = current.strftime("%Y-%m-%d")
+            for product_id, price in changes:
+                w.writerow([product_id, effective_date, "" if price is None else price])
+            rows += len(changes)
+    return rows
+
+
+def price_generator(products: List[Product], days: int = 365, price_format: str = 'daily'):
+    """
+    生成模拟价格数据
+    参数:
+        price_format: 'daily' 每天一个全量快照文件（data/daily_price/daily_prices_YYYYMMDD.csv）；
+            'changes' 只写价格变更日志（data/price_changes.csv），每个商品一年约 6 次变价，
+            行数约为全量快照的 2%
+    """
     gen = PriceGenerator(products)
-    gen.produce_init()
-
     today = datetime.now()
-    # 生成一次全年的价格变动计划
-    gen.init_price_plan(today, total_days=days)
+
+    if price_format == 'changes':
+        return write_price_changes(gen, today, days, Path(__file__).parent.parent.parent / 'data' / 'price_changes.csv')
+    if price_format != 'daily':
+        raise ValueError(f"不支持的价格格式: {price_format}")
 
     out_dir = Path(__file__).parent.parent.parent / 'data' / 'daily_price'
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    for day in range(days):
-        current = today + timedelta(days=day)
-        if day > 0:
-            gen.adjust_products()
-            gen.adjust_prices(current, today)
-
+    for current, current_products in gen.iter_days(today, days):
         fn = out_dir / f"daily_prices_{current.strftime('%Y%m%d')}.csv"
         with fn.open('w', newline='', encoding='utf-8') as f:
             w = csv.writer(f)
             w.writerow(["product_id", "category_id", "name", "price", "change_date"])
-            for p in gen.current_products:
+            for p in current_products:
                 w.writerow([
                     p.product_id,
                     p.category_id,
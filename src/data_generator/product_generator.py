@@ -1,8 +1,11 @@
 import csv
 import random
-from typing import List, Set, Dict, NamedTuple
+from typing import List, Dict, NamedTuple, Optional
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 class Category(NamedTuple):
     category_id: int
     category_name: str
@@ -31,96 +34,114 @@ def load_leaf_categories() -> List[Category]:
     return categories
 
 
-# 生成唯一商品 ID
-def generate_unique_product_id(existing_ids: Set[int]) -> int:
-    while True:
-        new_id = random.randint(100000000000, 999999999999)
-        if new_id not in existing_ids:
-            return new_id
-
-
 # 生成商品名称
 def generate_product_name(category_name: str, index: int) -> str:
     return f"{category_name}_{index}"
 
 
-# 生成初始价格
-def generate_initial_price(base_price: float, fluctuation: float = 0.3) -> float:
-    min_price = base_price * (1 - fluctuation)
-    max_price = base_price * (1 + fluctuation)
-    return round(random.uniform(min_price, max_price), 2)
-
-
-# 生成权重
-def generate_weight() -> float:
-    return round(random.uniform(0.1, 1.0), 6)
-
-
-# 构建单条商品记录
-def build_product(
-    existing_ids: Set[int],
-    category: Category,
-    name_index: Dict[int, int],
-    base_prices: Dict[int, float]
-) -> Product:
-    product_id = generate_unique_product_id(existing_ids)
-    existing_ids.add(product_id)
-
-    name_index[category.category_id] = name_index.get(category.category_id, 0) + 1
-    name = generate_product_name(category.category_name, name_index[category.category_id])
-
-    if category.category_id not in base_prices:
-        base_prices[category.category_id] = random.uniform(10, 1000)
-
-    price = generate_initial_price(base_prices[category.category_id])
-    weight = generate_weight()
-
-    return Product(
+# 商品池的列式表示：每个字段一个 NumPy 数组，行在输出时才物化
+class ProductColumns(NamedTuple):
+    product_id: np.ndarray
+    category_id: np.ndarray
+    name_index: np.ndarray
+    weight: np.ndarray
+    price: np.ndarray
+    category_names: Dict[int, str]
+
+
+# 列式构建商品池
+def build_product_columns(
+    categories: List[Category],
+    count: int,
+    seed: Optional[int] = None
+) -> ProductColumns:
+    """一次性生成全部商品的列数组，并按类别一次分组除法归一化 weight"""
+    rng = np.random.default_rng(seed)
+    n_categories = len(categories)
+
+    # 与逐条生成一致：前 remainder 个类别各多分一个商品
+    per_category = count // n_categories
+    remainder = count % n_categories
+    counts = np.full(n_categories, per_category, dtype=np.int64)
+    counts[:remainder] += 1
+
+    # 按 category_id 排序输出
+    order = np.argsort([c.category_id for c in categories], kind='stable')
+    category_ids = np.array([c.category_id for c in categories], dtype=np.int64)[order]
+    counts = counts[order]
+    codes = np.repeat(np.arange(n_categories), counts)
+
+    # 12 位唯一商品 ID：不放回抽样
+    product_id = rng.choice(900000000000, size=count, replace=False) + 100000000000
+
+    # 类别内名称序号 1..n
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    name_index = (np.arange(count) - starts + 1).astype(np.int32)
+
+    # 每个类别一个基准价，商品价格在基准价 ±30% 内
+    base_prices = rng.uniform(10, 1000, size=n_categories)[codes]
+    price = np.round(rng.uniform(base_prices * 0.7, base_prices * 1.3), 2)
+
+    # 随机 weight 后按类别归一化
+    raw_weight = np.round(rng.uniform(0.1, 1.0, size=count), 6)
+    totals = np.bincount(codes, weights=raw_weight, minlength=n_categories)
+    weight = np.round(raw_weight / totals[codes], 6)
+
+    return ProductColumns(
         product_id=product_id,
-        category_id=category.category_id,
-        name=name,
+        category_id=category_ids[codes],
+        name_index=name_index,
         weight=weight,
         price=price,
-        change_count=0
+        category_names={c.category_id: c.category_name for c in categories}
     )
 
 
+# 列式商品池转为 Product 列表
+def columns_to_products(columns: ProductColumns) -> List[Product]:
+    names = columns.category_names
+    return [
+        Product(
+            product_id=product_id,
+            category_id=category_id,
+            name=generate_product_name(names[category_id], index),
+            weight=weight,
+            price=price,
+            change_count=0
+        )
+        for product_id, category_id, index, weight, price in zip(
+            columns.product_id.tolist(),
+            columns.category_id.tolist(),
+            columns.name_index.tolist(),
+            columns.weight.tolist(),
+            columns.price.tolist()
+        )
+    ]
+
+
+# 列式商品池转为 DataFrame（与 products.csv 字段一致）
+def columns_to_dataframe(columns: ProductColumns) -> pd.DataFrame:
+    category_name = pd.Series(columns.category_id).map(columns.category_names)
+    return pd.DataFrame({
+        'product_id': columns.product_id,
+        'category_id': columns.category_id,
+        'name': category_name + '_' + pd.Series(columns.name_index).astype(str),
+        'weight': columns.weight,
+        'price': columns.price,
+        'change_count': np.zeros(len(columns.product_id), dtype=np.int32)
+    })
+
+
 # 生成商品池
-def generate_product_pool(categories: List[Category], count: int) -> List[Product]:
-    products = []
-    existing_ids = set()
-    name_index = {}
-    base_prices = {}
-
-    per_category = count // len(categories)
-    remainder = count % len(categories)
-
-    # 首先生成所有商品（随机 weight）
-    for category in categories:
-        num = per_category + (1 if remainder > 0 else 0)
-        remainder -= 1
-        for _ in range(num):
-            product = build_product(existing_ids, category, name_index, base_prices)
-            products.append(product)
-
-    # 按类别归一化 weight
-    category_products: Dict[int, List[Product]] = {}
-    for p in products:
-        category_products.setdefault(p.category_id, []).append(p)
-
-    # 处理每个类别
-    for cat_id, prod_list in category_products.items():
-        total_weight = sum(p.weight for p in prod_list)
-        for i, p in enumerate(prod_list):
-            new_weight = round(p.weight / total_weight, 6)
-            prod_list[i] = p._replace(weight=new_weight)
-
-    # 重新组合（因为 prod_list 是引用）
-    normalized_products = []
-    for cat_id in sorted(category_products.keys()):
-        normalized_products.extend(category_products[cat_id])
-
-    return normalized_products
+def generate_product_pool(
+    categories: List[Category],
+    count: int,
+    seed: Optional[int] = None
+) -> List[Product]:
+    """未指定 seed 时从 random 模块取种子，使 random.seed 仍能复现商品池"""
+    if seed is None:
+        seed = random.getrandbits(64)
+    return columns_to_products(build_product_columns(categories, count, seed=seed))
 
 # 写入 CSV
 def write_products_to_csv(products: List[Product]) -> None:
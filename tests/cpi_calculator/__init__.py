@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""计算器测试共用的数据目录写入工具：categories.csv、products.csv 和 daily_price/ 下的每日快照"""
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def write_tables(data_dir: Path, categories, products) -> None:
+    """写出分类表和商品表，参数为列字典或 DataFrame"""
+    pd.DataFrame(categories).to_csv(data_dir / 'categories.csv', index=False)
+    pd.DataFrame(products).to_csv(data_dir / 'products.csv', index=False)
+
+
+def write_daily_prices(data_dir: Path, start_date: date, frames: Iterable[pd.DataFrame]) -> None:
+    """从 start_date 起逐日写出 daily_prices_YYYYMMDD.csv，每个 DataFrame 一天"""
+    price_dir = data_dir / 'daily_price'
+    price_dir.mkdir(parents=True, exist_ok=True)
+    for day, frame in enumerate(frames):
+        current_date = start_date + timedelta(days=day)
+        frame.to_csv(price_dir / f'daily_prices_{current_date.strftime("%Y%m%d")}.csv', index=False)
+
+
+def write_price_fixture(data_dir: Path, categories, products, start_date: date, days: int, seed: int = 0,
+                        price_range: Tuple[float, float] = (5.0, 50.0), presence: float = 1.0,
+                        priced_products: Optional[Sequence[int]] = None) -> None:
+    """
+    写出完整的数据目录：价格在 price_range 内随机初始化，之后每天随机变动 ±5%，保留两位小数
+
+    参数:
+        presence: 每个商品每天出现在快照中的概率，小于 1 时模拟缺价
+        priced_products: 有价格的商品，默认为商品表中的全部商品
+    """
+    write_tables(data_dir, categories, products)
+
+    rng = np.random.default_rng(seed)
+    product_ids = np.asarray(pd.DataFrame(products)['product_id'] if priced_products is None else priced_products)
+    prices = rng.uniform(*price_range, len(product_ids)).round(2)
+    frames = []
+    for _ in range(days):
+        present = rng.random(len(product_ids)) < presence
+        frames.append(pd.DataFrame({'product_id': product_ids[present], 'price': prices[present]}))
+        prices = (prices * rng.uniform(0.95, 1.05, len(product_ids))).round(2)
+    write_daily_prices(data_dir, start_date, frames)
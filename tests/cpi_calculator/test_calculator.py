@@ -1,3 +1,4 @@
+import tempfile
 import unittest
 from pathlib import Path
 from datetime import date, timedelta
@@ -96,5 +97,82 @@ class TestDailyCPI(unittest.TestCase):
         self.assertEqual(result.iloc[0], 1.0, "基期CPI应为1.0")
 
 
+class TestChangeLogCPI(unittest.TestCase):
+    """变更日志格式与每日快照格式的计算结果应一致"""
+
+    # 每日在样商品及价格：商品 3 在第 2 天出样、第 4 天以新价格回样，商品 4 第 1 天才入样（不进入基期）
+    SNAPSHOTS = [
+        {1: 100.0, 2: 200.0, 3: 50.0},
+        {1: 100.0, 2: 210.0, 3: 50.0, 4: 80.0},
+        {1: 100.0, 2: 210.0, 4: 80.0},
+        {1: 105.0, 2: 210.0, 4: 85.0},
+        {1: 105.0, 2: 220.0, 3: 55.0, 4: 85.0},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.test_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 5, 1)
+
+        pd.DataFrame({
+            'category_id': [1001, 1002],
+            'parent': [None, None],
+            'weight': [0.6, 0.4]
+        }).to_csv(cls.test_dir / 'categories.csv', index=False)
+        pd.DataFrame({
+            'product_id': [1, 2, 3, 4],
+            'category_id': [1001, 1002, 1001, 1002]
+        }).to_csv(cls.test_dir / 'products.csv', index=False)
+
+        price_dir = cls.test_dir / 'daily_price'
+        price_dir.mkdir()
+        changes, previous = [], {}
+        for day, snapshot in enumerate(cls.SNAPSHOTS):
+            current_date = cls.start_date + timedelta(days=day)
+            pd.DataFrame({'product_id': list(snapshot), 'price': list(snapshot.values())}).to_csv(
+                price_dir / f'daily_prices_{current_date.strftime("%Y%m%d")}.csv', index=False
+            )
+            changes += [(pid, current_date, price) for pid, price in snapshot.items() if previous.get(pid) != price]
+            changes += [(pid, current_date, None) for pid in previous if pid not in snapshot]
+            previous = snapshot
+
+        cls.changes = pd.DataFrame(changes, columns=['product_id', 'effective_date', 'price'])
+        cls.changes.to_csv(cls.test_dir / 'price_changes.csv', index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_matches_daily_snapshots(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        end_date = self.start_date + timedelta(days=len(self.SNAPSHOTS) - 1)
+        daily = PandasCPICalculator(self.test_dir).compute_daily_cpi(self.start_date, end_date)
+        changes = PandasCPICalculator(self.test_dir, price_format='changes').compute_daily_cpi(
+            self.start_date, end_date
+        )
+
+        self.assertLess(len(self.changes), sum(len(snapshot) for snapshot in self.SNAPSHOTS))
+        pd.testing.assert_series_equal(changes, daily)
+
+    def test_later_base_date(self):
+        """基期不是变更日志首日时，期初状态由基期及以前的记录折叠得到"""
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        start_date = self.start_date + timedelta(days=2)
+        end_date = self.start_date + timedelta(days=4)
+        daily = PandasCPICalculator(self.test_dir).compute_daily_cpi(start_date, end_date)
+        changes = PandasCPICalculator(self.test_dir, price_format='changes').compute_daily_cpi(start_date, end_date)
+
+        pd.testing.assert_series_equal(changes, daily)
+
+    def test_invalid_format(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        with self.assertRaises(ValueError):
+            PandasCPICalculator(self.test_dir, price_format='parquet')
+
+
 if __name__ == '__main__':
     unittest.main()
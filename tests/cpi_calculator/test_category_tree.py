@@ -0,0 +1,93 @@
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.category_tree import CategoryTree
+
+from . import write_price_fixture
+
+# 1 ─┬─ 11 ─┬─ 111
+#    │      └─ 112
+#    └─ 12
+# 2 ─── 21
+CATEGORIES = pd.DataFrame({
+    'category_id': [112, 2, 11, 1, 21, 12, 111],
+    'parent': [11, None, 1, None, 2, 1, 11],
+    'weight': [0.2, 0.3, 0.5, 0.7, 0.3, 0.1, 0.4]
+})
+
+
+class TestCategoryTree(unittest.TestCase):
+    def test_flat_arrays(self):
+        tree = CategoryTree(CATEGORIES)
+
+        np.testing.assert_array_equal(tree.ids, [1, 11, 111, 112, 12, 2, 21])
+        np.testing.assert_array_equal(tree.parent, [-1, 0, 1, 1, 0, -1, 5])
+        np.testing.assert_array_equal(tree.level, [1, 2, 3, 3, 2, 1, 2])
+        np.testing.assert_array_equal(tree.end, [5, 4, 3, 4, 5, 7, 7])
+        np.testing.assert_array_equal(tree.leaf_ids, [111, 112, 12, 21])
+        np.testing.assert_array_equal(tree.leaf_start, [0, 0, 0, 1, 2, 3, 3])
+        np.testing.assert_array_equal(tree.leaf_end, [3, 2, 1, 2, 3, 4, 4])
+        np.testing.assert_array_equal(tree.level_ids(2), [11, 12, 21])
+
+    def test_cycle_rejected(self):
+        with self.assertRaises(ValueError):
+            CategoryTree(pd.DataFrame({'category_id': [1, 2], 'parent': [2, 1], 'weight': [0.5, 0.5]}))
+
+    def test_rollup_matches_weighted_mean(self):
+        tree = CategoryTree(CATEGORIES)
+        leaf_index = pd.DataFrame(
+            {111: [1.0, 1.1], 112: [1.0, np.nan], 12: [1.0, 0.9], 21: [1.0, np.nan]},
+            index=['d0', 'd1']
+        )
+        result = tree.rollup(leaf_index)
+
+        self.assertAlmostEqual(result.loc['d1', 11], 1.1)  # 112 无数据，只剩 111
+        self.assertAlmostEqual(result.loc['d1', 1], (0.4 * 1.1 + 0.1 * 0.9) / 0.5)
+        self.assertTrue(np.isnan(result.loc['d1', 2]))
+        self.assertTrue(np.isnan(result.loc['d1', 112]))
+        np.testing.assert_allclose(result.loc['d0'].to_numpy(), 1.0)
+
+
+class TestHierarchyCPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 5, 1)
+
+        write_price_fixture(
+            cls.data_dir, CATEGORIES,
+            products={'product_id': [1, 2, 3, 4, 5, 6], 'category_id': [111, 111, 112, 12, 21, 21]},
+            start_date=cls.start_date, days=6, seed=1, price_range=(10.0, 100.0)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_levels_consistent_with_daily_cpi(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        calculator = PandasCPICalculator(self.data_dir)
+        end_date = self.start_date + timedelta(days=5)
+        leaf_index = calculator.compute_leaf_index_matrix(self.start_date, end_date)
+        hierarchy = calculator.compute_hierarchy_cpi(self.start_date, end_date)
+
+        # 叶子列与叶子矩阵相同；叶子权重和为 1 时，一级分类按权重加总即总 CPI
+        pd.testing.assert_frame_equal(hierarchy[leaf_index.columns], leaf_index, check_names=False)
+        weights = calculator.leaf_weights()
+        top = hierarchy[[1, 2]].mul([weights[[111, 112, 12]].sum(), weights[[21]].sum()], axis=1).sum(axis=1)
+        np.testing.assert_allclose(
+            top.round(4).to_numpy(),
+            calculator.compute_daily_cpi(self.start_date, end_date).to_numpy(),
+            atol=1e-4
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
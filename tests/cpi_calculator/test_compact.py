@@ -0,0 +1,140 @@
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.calculator import PandasCPICalculator
+
+from . import write_price_fixture
+
+# 12 位商品编号，超出 int32 范围
+BASE_ID = 600_000_000_000
+
+
+class TestCompactCalculator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 6, 1)
+        cls.end_date = cls.start_date + timedelta(days=11)
+
+        # 商品 29 没有任何价格记录，1003 下只有它
+        cls.product_ids = BASE_ID + np.arange(30) * 104_729
+        write_price_fixture(
+            cls.data_dir,
+            categories={
+                'category_id': [1, 1001, 1002, 1003],
+                'parent': [None, 1, 1, 1],
+                'weight': [1.0, 0.5, 0.3, 0.2]
+            },
+            products={'product_id': cls.product_ids, 'category_id': [1001, 1002] * 14 + [1001, 1003]},
+            start_date=cls.start_date, days=12, seed=21, price_range=(3.0, 80.0), presence=0.75,
+            priced_products=cls.product_ids[:29]
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_compact_matches_default(self):
+        default = PandasCPICalculator(self.data_dir)
+        compact = PandasCPICalculator(self.data_dir, compact=True)
+        for start_date in (self.start_date, self.start_date + timedelta(days=4)):
+            expected = default.compute_leaf_index_matrix(start_date, self.end_date)
+            actual = compact.compute_leaf_index_matrix(start_date, self.end_date)
+            self.assertEqual(list(actual.columns), list(expected.columns))
+            np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-6)
+            self.assertTrue(actual[1003].isna().all())
+
+            pd.testing.assert_series_equal(
+                compact.compute_daily_cpi(start_date, self.end_date),
+                default.compute_daily_cpi(start_date, self.end_date),
+                atol=1e-4
+            )
+
+    def test_compact_sparse_matches_default(self):
+        expected = PandasCPICalculator(self.data_dir).compute_leaf_index_matrix(self.start_date, self.end_date)
+        actual = PandasCPICalculator(self.data_dir, compact=True, panel='sparse').compute_leaf_index_matrix(
+            self.start_date, self.end_date
+        )
+        np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-6)
+
+    def test_preloaded_price_panel(self):
+        """load_prices 的结果传给 compute_daily_cpi 与直接计算一致（稠密、紧凑、稀疏三种面板）"""
+        for options in ({}, {'compact': True}, {'panel': 'sparse'}):
+            calculator = PandasCPICalculator(self.data_dir, **options)
+            price_panel = calculator.load_prices(self.start_date, self.end_date)
+            pd.testing.assert_series_equal(
+                calculator.compute_daily_cpi(self.start_date, self.end_date, price_panel=price_panel),
+                calculator.compute_daily_cpi(self.start_date, self.end_date)
+            )
+
+    def test_compact_matrix_matches_pivot(self):
+        calculator = PandasCPICalculator(self.data_dir, compact=True)
+        all_dates = pd.date_range(self.start_date, self.end_date, freq='D').date
+
+        matrix = calculator._build_compact_matrix(all_dates)
+        pivot = PandasCPICalculator(self.data_dir)._build_price_pivot(all_dates)
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(
+            matrix[calculator.product_index.get_indexer(pivot.index)], pivot.to_numpy(dtype=float), rtol=1e-6
+        )
+
+    def test_blocked_forward_fill(self):
+        """按行分块向前填充与整块填充结果相同"""
+        calculator = PandasCPICalculator(self.data_dir, compact=True)
+        all_dates = pd.date_range(self.start_date, self.end_date, freq='D').date
+        expected = calculator._build_compact_matrix(all_dates)
+        with mock.patch('cpi_calculator.calculator.FFILL_BLOCK_CELLS', 7 * len(all_dates)):
+            actual = calculator._build_compact_matrix(all_dates)
+        np.testing.assert_array_equal(actual, expected)
+        self.assertEqual(actual.dtype, np.float32)
+
+    def test_compact_row_size(self):
+        calculator = PandasCPICalculator(self.data_dir, compact=True)
+        all_dates = pd.date_range(self.start_date, self.end_date, freq='D').date
+        observations = calculator._load_prices_for_dates(tuple(all_dates), day_offsets=True)
+
+        # product_code(int32) + day(int32) + price(float32)
+        self.assertEqual(observations.memory_usage(index=False).sum() / len(observations), 12)
+        self.assertEqual(calculator.products['product_id'].dtype, np.int64)
+        self.assertEqual(calculator.products['product_id'].tolist(), self.product_ids.tolist())
+        self.assertEqual(calculator.products['product_code'].tolist(), list(range(30)))
+
+
+class TestCompactIdCollision(unittest.TestCase):
+    """product_id 相差 2**32 的两个商品，按 int32 读入会被当成同一商品"""
+
+    def test_ids_differing_by_2_pow_32(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            first, second = BASE_ID + 12_345, BASE_ID + 12_345 + 2 ** 32
+            pd.DataFrame({
+                'category_id': [1, 1001, 1002], 'parent': [None, 1, 1], 'weight': [1.0, 0.5, 0.5]
+            }).to_csv(data_dir / 'categories.csv', index=False)
+            pd.DataFrame({'product_id': [first, second], 'category_id': [1001, 1002]}).to_csv(
+                data_dir / 'products.csv', index=False
+            )
+            (data_dir / 'daily_price').mkdir()
+            for day, prices in (('20250601', [1.0, 1.0]), ('20250602', [2.0, 1.5])):
+                pd.DataFrame({'product_id': [first, second], 'price': prices}).to_csv(
+                    data_dir / 'daily_price' / f'daily_prices_{day}.csv', index=False
+                )
+
+            start_date, end_date = date(2025, 6, 1), date(2025, 6, 2)
+            for options in ({'compact': True}, {'compact': True, 'panel': 'sparse'}):
+                with self.subTest(**options):
+                    leaf_index = PandasCPICalculator(data_dir, **options).compute_leaf_index_matrix(
+                        start_date, end_date
+                    )
+                    np.testing.assert_allclose(leaf_index[1001].to_numpy(), [1.0, 2.0])
+                    np.testing.assert_allclose(leaf_index[1002].to_numpy(), [1.0, 1.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from datetime import date
+from multiprocessing import AuthenticationError
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.distributed import DistributedCPICoordinator, shard_categories, start_local_workers
+
+from . import write_price_fixture
+
+
+class TestDistributedCPI(unittest.TestCase):
+    """本机启动多个工作进程，分布式结果应与单机 compute_daily_cpi 一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 5, 1)
+        cls.end_date = date(2025, 5, 8)
+
+        leaf_ids = [1001, 1002, 1003, 1004, 1005]
+        write_price_fixture(
+            cls.data_dir,
+            categories={
+                'category_id': [1] + leaf_ids,
+                'parent': [None] + [1] * len(leaf_ids),
+                'weight': [1.0, 0.3, 0.2, 0.2, 0.15, 0.15]
+            },
+            products={'product_id': range(60), 'category_id': np.random.default_rng(2).choice(leaf_ids, 60)},
+            start_date=cls.start_date, days=(cls.end_date - cls.start_date).days + 1, seed=2, presence=0.9
+        )
+
+        cls.processes, cls.addresses, cls.authkey = start_local_workers(cls.data_dir, shards=3)
+        cls.coordinator = DistributedCPICoordinator(cls.addresses, cls.data_dir, cls.authkey)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.coordinator.stop_workers()
+        for process in cls.processes:
+            process.join(timeout=10)
+        cls._tmp.cleanup()
+
+    def test_matches_single_machine(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        expected = PandasCPICalculator(self.data_dir).compute_daily_cpi(self.start_date, self.end_date)
+        actual = self.coordinator.compute_daily_cpi(self.start_date, self.end_date)
+        pd.testing.assert_series_equal(actual, expected)
+
+    def test_each_worker_owns_disjoint_shard(self):
+        log_means = self.coordinator.compute_leaf_log_means(self.start_date, self.end_date)
+        self.assertEqual(sorted(log_means.columns), [1001, 1002, 1003, 1004, 1005])
+        self.assertEqual(log_means.iloc[0].abs().max(), 0.0)  # 基期对数均值为 0
+
+    def test_generated_authkey(self):
+        self.assertEqual(len(self.authkey), 32)
+        self.assertNotEqual(self.authkey, b'cpi')
+        with self.assertRaises(ValueError):
+            DistributedCPICoordinator(self.addresses, self.data_dir, b'')
+
+    def test_wrong_authkey_rejected(self):
+        coordinator = DistributedCPICoordinator(self.addresses[:1], self.data_dir, b'wrong key')
+        with self.assertRaises(AuthenticationError):
+            coordinator.compute_leaf_log_means(self.start_date, self.end_date)
+        # 认证失败的连接不影响节点继续服务
+        self.assertEqual(len(self.coordinator.compute_leaf_log_means(self.start_date, self.end_date).columns), 5)
+
+    def test_shard_categories(self):
+        categories = pd.read_csv(self.data_dir / 'categories.csv')
+        self.assertEqual(shard_categories(categories, 2), [[1001, 1003, 1005], [1002, 1004]])
+
+
+if __name__ == '__main__':
+    unittest.main()
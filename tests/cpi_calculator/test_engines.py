@@ -0,0 +1,182 @@
+import importlib.util
+import tempfile
+import time
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.calculator import PandasCPICalculator
+from cpi_calculator.engines import create_calculator
+
+from . import write_price_fixture
+
+HAS_POLARS = importlib.util.find_spec('polars') is not None
+HAS_DUCKDB = importlib.util.find_spec('duckdb') is not None
+
+
+class EngineTestData:
+    """两级分类、部分商品缺价/出样的每日快照"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 7, 1)
+        cls.end_date = cls.start_date + timedelta(days=13)
+
+        write_price_fixture(
+            cls.data_dir,
+            categories={
+                'category_id': [1, 2, 1001, 1002, 2001],
+                'parent': [None, None, 1, 1, 2],
+                'weight': [0.7, 0.3, 0.4, 0.3, 0.3]
+            },
+            products={'product_id': range(40), 'category_id': [1001, 1002, 2001, 1] * 10},
+            start_date=cls.start_date, days=14, seed=17, price_range=(2.0, 60.0), presence=0.7
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+
+class DuplicateRowTestData(EngineTestData):
+    """每日快照中同一商品重复出现且价格冲突（生成器 random.choices 会产生这种数据），含先空后有价的记录"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(29)
+        for file_path in sorted((cls.data_dir / 'daily_price').glob('daily_prices_*.csv')):
+            snapshot = pd.read_csv(file_path)
+            repeated = snapshot.sample(n=8, random_state=rng.integers(1 << 31))
+            repeated['price'] = (repeated['price'] * rng.uniform(0.5, 1.5, len(repeated))).round(2)
+            blank = snapshot.head(2).assign(price=np.nan)
+            pd.concat([blank, snapshot, repeated]).to_csv(file_path, index=False)
+
+
+@unittest.skipUnless(HAS_POLARS and HAS_DUCKDB, "polars or duckdb is not installed")
+class TestDuplicateRows(DuplicateRowTestData, unittest.TestCase):
+    def test_engines_keep_first_row(self):
+        """三个引擎都按文件顺序保留每个商品每天的首条非空价格"""
+        expected = PandasCPICalculator(self.data_dir).compute_daily_cpi(self.start_date, self.end_date)
+        pd.testing.assert_series_equal(
+            create_calculator(self.data_dir, engine='polars').compute_daily_cpi(self.start_date, self.end_date),
+            expected
+        )
+        calculator = create_calculator(self.data_dir, engine='duckdb', threads=2)
+        pd.testing.assert_series_equal(
+            calculator.compute_daily_cpi(self.start_date, self.end_date), expected, atol=1e-4
+        )
+        calculator.close()
+
+    def test_duckdb_parquet_keeps_first_row(self):
+        from cpi_calculator.polars_engine import write_price_parquet
+
+        write_price_parquet(self.data_dir)
+        expected = PandasCPICalculator(self.data_dir).compute_daily_cpi(self.start_date, self.end_date)
+        calculator = create_calculator(self.data_dir, engine='duckdb', file_format='parquet')
+        pd.testing.assert_series_equal(
+            calculator.compute_daily_cpi(self.start_date, self.end_date), expected, atol=1e-4
+        )
+        calculator.close()
+
+
+class TestCreateCalculator(EngineTestData, unittest.TestCase):
+    def test_pandas_engine(self):
+        calculator = create_calculator(self.data_dir, engine='pandas', panel='sparse')
+        self.assertIsInstance(calculator, PandasCPICalculator)
+        self.assertEqual(calculator.panel, 'sparse')
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            create_calculator(self.data_dir, engine='spark')
+
+
+@unittest.skipUnless(HAS_POLARS, "polars is not installed")
+class TestPolarsEngine(EngineTestData, unittest.TestCase):
+    def test_matches_pandas(self):
+        expected_calculator = PandasCPICalculator(self.data_dir)
+        calculator = create_calculator(self.data_dir, engine='polars')
+        for start_date in (self.start_date, self.start_date + timedelta(days=5)):
+            pd.testing.assert_frame_equal(
+                calculator.compute_leaf_index_matrix(start_date, self.end_date),
+                expected_calculator.compute_leaf_index_matrix(start_date, self.end_date),
+                check_dtype=False, rtol=1e-9
+            )
+            pd.testing.assert_series_equal(
+                calculator.compute_daily_cpi(start_date, self.end_date),
+                expected_calculator.compute_daily_cpi(start_date, self.end_date)
+            )
+
+    def test_parquet_matches_csv(self):
+        from cpi_calculator.polars_engine import write_price_parquet
+
+        write_price_parquet(self.data_dir)
+        start_date = self.start_date + timedelta(days=2)
+        end_date = self.end_date - timedelta(days=3)
+        pd.testing.assert_series_equal(
+            create_calculator(self.data_dir, engine='polars', file_format='parquet').compute_daily_cpi(
+                start_date, end_date
+            ),
+            create_calculator(self.data_dir, engine='polars').compute_daily_cpi(start_date, end_date)
+        )
+
+
+@unittest.skipUnless(HAS_DUCKDB, "duckdb is not installed")
+class TestDuckDBEngine(EngineTestData, unittest.TestCase):
+    def test_matches_pandas(self):
+        expected_calculator = PandasCPICalculator(self.data_dir)
+        calculator = create_calculator(self.data_dir, engine='duckdb', threads=2)
+        for start_date in (self.start_date, self.start_date + timedelta(days=5)):
+            pd.testing.assert_frame_equal(
+                calculator.compute_leaf_index_matrix(start_date, self.end_date),
+                expected_calculator.compute_leaf_index_matrix(start_date, self.end_date),
+                check_dtype=False, rtol=1e-9
+            )
+            pd.testing.assert_series_equal(
+                calculator.compute_daily_cpi(start_date, self.end_date),
+                expected_calculator.compute_daily_cpi(start_date, self.end_date),
+                atol=1e-4
+            )
+        calculator.close()
+
+    def test_runtime_grows_linearly(self):
+        """商品数放大 4 倍，耗时不应接近 16 倍（价格去重未物化时 ASOF JOIN 随商品数平方增长）"""
+        timings = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for products in (5000, 20000):
+                data_dir = Path(tmp) / str(products)
+                data_dir.mkdir()
+                write_price_fixture(
+                    data_dir,
+                    categories={'category_id': [1, 2], 'parent': [None, None], 'weight': [0.5, 0.5]},
+                    products={'product_id': range(products), 'category_id': [1, 2] * (products // 2)},
+                    start_date=self.start_date, days=3, seed=products
+                )
+                calculator = create_calculator(data_dir, engine='duckdb', threads=2)
+                end_date = self.start_date + timedelta(days=2)
+                elapsed = []
+                for _ in range(2):
+                    started = time.perf_counter()
+                    calculator.compute_daily_cpi(self.start_date, end_date)
+                    elapsed.append(time.perf_counter() - started)
+                calculator.close()
+                timings.append(min(elapsed))
+        self.assertLess(timings[1], 8 * timings[0])
+
+    def test_sql_is_engine_neutral(self):
+        """查询只引用 ClickHouse 同名的逻辑表，不含 DuckDB 的表函数"""
+        from cpi_calculator.sql_engine import CPI_SQL
+
+        self.assertNotIn('read_csv', CPI_SQL)
+        self.assertNotIn('read_parquet', CPI_SQL)
+        for table in ('FROM category', 'FROM product', 'FROM price'):
+            self.assertIn(table, CPI_SQL)
+
+
+if __name__ == '__main__':
+    unittest.main()
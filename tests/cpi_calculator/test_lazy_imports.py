@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent.parent / 'src'
+
+
+def _loaded_modules(code: str, modules) -> list:
+    """在全新子进程中执行 code，返回其中已被加载的模块"""
+    probe = f"{code}\nimport sys, json\nprint(json.dumps([m for m in {list(modules)!r} if m in sys.modules]))"
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    out = subprocess.run([sys.executable, '-c', probe], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+    HEAVY = ('matplotlib', 'plotly', 'dynaconf', 'clickhouse_driver', 'sqlalchemy')
+
+    def test_compute_only_import_skips_heavy_modules(self):
+        """只做计算时不加载绘图、配置和数据库依赖"""
+        loaded = _loaded_modules("from cpi_calculator.calculator import PandasCPICalculator", self.HEAVY)
+        self.assertEqual(loaded, [])
+
+    def test_package_attribute_loads_on_first_access(self):
+        """包级导出在首次访问时才导入对应子模块"""
+        self.assertEqual(_loaded_modules("import cpi_calculator", ('dynaconf',)), [])
+        self.assertEqual(_loaded_modules("import cpi_calculator; cpi_calculator.settings", ('dynaconf',)), ['dynaconf'])
+
+
+class TestScriptMode(unittest.TestCase):
+    def test_default_path_without_package(self):
+        """calculator.py 以脚本方式（不作为 cpi_calculator 包的子模块）导入时，默认的单进程计算可用"""
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            (data_dir / 'categories.csv').write_text('category_id,parent,weight\n1,,1.0\n1001,1,1.0\n')
+            (data_dir / 'products.csv').write_text('product_id,category_id\n1,1001\n2,1001\n')
+            (data_dir / 'daily_price').mkdir()
+            for day, prices in (('20250601', (10.0, 20.0)), ('20250602', (11.0, 22.0))):
+                (data_dir / 'daily_price' / f'daily_prices_{day}.csv').write_text(
+                    'product_id,price\n' + ''.join(f'{i + 1},{p}\n' for i, p in enumerate(prices))
+                )
+
+            code = (
+                "import json\nfrom datetime import date\nfrom pathlib import Path\nimport calculator\n"
+                f"cpi = calculator.PandasCPICalculator(Path({str(data_dir)!r}))"
+                ".compute_daily_cpi(date(2025, 6, 1), date(2025, 6, 2))\n"
+                "print(json.dumps(cpi.tolist()))"
+            )
+            env = dict(os.environ, PYTHONPATH=str(SRC / 'cpi_calculator'))
+            out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(json.loads(out.stdout.strip().splitlines()[-1]), [1.0, 1.1])
+
+
+if __name__ == '__main__':
+    unittest.main()
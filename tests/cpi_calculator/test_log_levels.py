@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.log_levels import CategoryLogLevels
+
+from . import write_price_fixture
+
+
+class TestCategoryLogLevels(unittest.TestCase):
+    """样本不变时，查表得到的任意基期指数应与 PandasCPICalculator 直接计算一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 5, 1)
+        cls.days = 10
+
+        write_price_fixture(
+            cls.data_dir,
+            categories={'category_id': [1, 1001, 1002], 'parent': [None, 1, 1], 'weight': [1.0, 0.6, 0.4]},
+            products={'product_id': [1, 2, 3, 4, 5], 'category_id': [1001, 1001, 1002, 1002, 1002]},
+            start_date=cls.start_date, days=cls.days, price_range=(10.0, 50.0)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def _calculator(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+        return PandasCPICalculator(self.data_dir)
+
+    def test_matches_direct_computation_for_any_base(self):
+        calculator = self._calculator()
+        end_date = self.start_date + timedelta(days=self.days - 1)
+        levels = calculator.build_log_levels(self.start_date, end_date)
+        weights = calculator.leaf_weights()
+
+        for offset in (0, 3, 7):
+            base_date = self.start_date + timedelta(days=offset)
+            direct = calculator.compute_daily_cpi(base_date, end_date)
+            rebased = levels.series(base_date, weights, dates=direct.index).round(4)
+            np.testing.assert_allclose(rebased.to_numpy(), direct.to_numpy(), atol=1e-4)
+            self.assertAlmostEqual(levels.index(base_date, end_date, weights), direct.iloc[-1], places=4)
+
+    def test_category_index_chains(self):
+        """I(a, c) = I(a, b) · I(b, c)"""
+        levels = self._calculator().build_log_levels(self.start_date, self.start_date + timedelta(days=self.days - 1))
+        a, b, c = (self.start_date + timedelta(days=d) for d in (1, 4, 8))
+        pd.testing.assert_series_equal(
+            levels.category_index(a, c),
+            levels.category_index(a, b) * levels.category_index(b, c)
+        )
+
+    def test_missing_category_day_is_nan(self):
+        pivot = pd.DataFrame(
+            [[10.0, 11.0, np.nan, 12.0], [np.nan, np.nan, 5.0, 6.0]],
+            index=[1, 2],
+            columns=[self.start_date + timedelta(days=d) for d in range(4)]
+        )
+        levels = CategoryLogLevels.from_price_pivot(pivot, pd.Series({1: 100, 2: 200}))
+
+        self.assertTrue(np.isnan(levels.levels.loc[pivot.columns[2], 100]))
+        self.assertTrue(np.isnan(levels.levels.loc[pivot.columns[0], 200]))
+        # 商品 1 第 2 天无价格，第 3 天与第 1 天之间没有相邻匹配，水平沿用 ln(11/10)
+        self.assertAlmostEqual(levels.levels.loc[pivot.columns[3], 100], np.log(1.1))
+        self.assertAlmostEqual(levels.levels.loc[pivot.columns[3], 200], np.log(1.2))
+
+    def test_csv_round_trip(self):
+        levels = self._calculator().build_log_levels(self.start_date, self.start_date + timedelta(days=3))
+        path = self.data_dir / 'log_levels.csv'
+        levels.to_csv(path)
+        pd.testing.assert_frame_equal(CategoryLogLevels.read_csv(path).levels, levels.levels, check_index_type=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
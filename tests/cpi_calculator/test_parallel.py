@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.parallel import _partition, partitioned_category_geo_means
+
+
+class TestPartitionedGeoMeans(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.prices = rng.uniform(1, 100, size=(400, 30))
+        self.prices[rng.random(self.prices.shape) < 0.1] = np.nan  # 当日无价格
+        self.prices[:5, 0] = 0.0  # 基期无效
+        self.codes = rng.integers(0, 12, size=400)
+        self.codes[self.codes == 7] = 6  # 类别 7 没有商品
+
+    def _expected(self):
+        base = self.prices[:, :1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_ratios = np.where(base > 0, np.log(self.prices / base), np.nan)
+        return np.exp(pd.DataFrame(log_ratios).groupby(self.codes).mean()).reindex(range(12)).to_numpy()
+
+    def test_serial_matches_groupby(self):
+        result = partitioned_category_geo_means(self.prices, self.codes, 12, workers=1)
+        np.testing.assert_allclose(result, self._expected())
+        self.assertTrue(np.isnan(result[7]).all())
+
+    def test_process_pool_matches_serial(self):
+        serial = partitioned_category_geo_means(self.prices, self.codes, 12, workers=1)
+        parallel = partitioned_category_geo_means(self.prices, self.codes, 12, workers=3)
+        np.testing.assert_array_equal(parallel, serial)
+
+    def test_partition_balances_products(self):
+        parts = _partition([(0, 50), (50, 60), (60, 100), (100, 110), (110, 112)], workers=2)
+        loads = sorted(sum({0: 50, 1: 10, 2: 40, 3: 10, 4: 2}[k] for k in part) for part in parts)
+        self.assertEqual(loads, [52, 60])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import pstats
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from cpi_calculator.__main__ import main
+from cpi_calculator.profiling import StageProfiler
+
+from . import write_daily_prices, write_tables
+
+
+def _busy(n: int = 200_000) -> int:
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+class TestStageProfiler(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_disabled_is_noop(self):
+        """未开启剖析时不产生任何输出"""
+        profiler = StageProfiler(None, self.output_dir / 'off')
+        with profiler.stage('compute'):
+            _busy(1000)
+        self.assertIsNone(profiler.write_report())
+        self.assertFalse((self.output_dir / 'off').exists())
+
+    def test_cprofile_report(self):
+        """cprofile 模式：每阶段输出 .prof，报告含耗时、峰值内存和热点函数"""
+        profiler = StageProfiler('cprofile', self.output_dir)
+        with profiler.stage('load'):
+            data = list(range(100_000))
+        with profiler.stage('compute'):
+            _busy()
+
+        report = json.loads(profiler.write_report().read_text(encoding='utf-8'))
+        self.assertEqual([s['stage'] for s in report['stages']], ['load', 'compute'])
+        self.assertGreater(report['stages'][0]['peak_mem_mb'], 1.0)
+        self.assertTrue((self.output_dir / 'compute.prof').exists())
+        self.assertTrue(any('_busy' in f['function'] for f in report['stages'][1]['top_functions']))
+        del data
+
+    def test_sample_collapsed_stacks(self):
+        """sample 模式：collapsed stack 以阶段名为根"""
+        profiler = StageProfiler('sample', self.output_dir, sample_interval=0.001)
+        with profiler.stage('compute'):
+            _busy(2_000_000)
+
+        report = json.loads(profiler.write_report().read_text(encoding='utf-8'))
+        lines = (self.output_dir / 'stacks.collapsed').read_text(encoding='utf-8').splitlines()
+        self.assertGreater(report['samples'], 0)
+        self.assertTrue(any(line.startswith('compute;') and '_busy' in line for line in lines))
+
+    def test_rejects_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            StageProfiler('perf')
+
+
+def _write_fixture(root: Path):
+    """两件商品、两天价格的最小数据目录，返回 (数据目录, 剖析输出目录)"""
+    data_dir = root / 'data'
+    data_dir.mkdir()
+    write_tables(
+        data_dir,
+        categories={'category_id': [1, 1001], 'parent': [None, 1], 'weight': [1.0, 1.0]},
+        products={'product_id': [1, 2], 'category_id': [1001, 1001]}
+    )
+    write_daily_prices(data_dir, date(2025, 6, 1), (
+        pd.DataFrame({'product_id': [1, 2], 'price': prices}) for prices in ((10.0, 20.0), (11.0, 22.0))
+    ))
+    return data_dir, root / 'profile'
+
+
+class TestEntryPointProfile(unittest.TestCase):
+    def test_sample_profile_of_main(self):
+        """python -m cpi_calculator --profile sample 写出各阶段报告和 collapsed stack"""
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir, profile_dir = _write_fixture(Path(tmp))
+
+            cpi = main([
+                '--data-dir', str(data_dir), '--start-date', '2025-06-01', '--end-date', '2025-06-02',
+                '--plot-engine', 'matplotlib', '--output', str(Path(tmp) / 'cpi_{date}.png'),
+                '--profile', 'sample', '--profile-dir', str(profile_dir), '--sample-interval', '0.001',
+            ])
+
+            self.assertEqual(cpi.tolist(), [1.0, 1.1])
+            self.assertTrue((Path(tmp) / 'cpi_2025-06-02.png').exists())
+            report = json.loads((profile_dir / 'profile_report.json').read_text(encoding='utf-8'))
+            self.assertEqual([s['stage'] for s in report['stages']], ['load', 'compute', 'visualize'])
+            self.assertEqual(report['mode'], 'sample')
+            self.assertTrue((profile_dir / 'stacks.collapsed').exists())
+
+    def test_prices_are_read_in_load_stage(self):
+        """价格文件只在 load 阶段读取，compute 阶段不再有文件 I/O"""
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir, profile_dir = _write_fixture(Path(tmp))
+            main([
+                '--data-dir', str(data_dir), '--start-date', '2025-06-01', '--end-date', '2025-06-02',
+                '--plot-engine', 'matplotlib', '--output', str(Path(tmp) / 'cpi_{date}.png'),
+                '--profile', 'cprofile', '--profile-dir', str(profile_dir),
+            ])
+
+            def functions(stage):
+                return {name for _, _, name in pstats.Stats(str(profile_dir / f'{stage}.prof')).stats}
+
+            self.assertIn('load_prices', functions('load'))
+            self.assertIn('read_csv', functions('load'))
+            self.assertNotIn('read_csv', functions('compute'))
+
+
+if __name__ == '__main__':
+    unittest.main()
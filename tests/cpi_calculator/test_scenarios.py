@@ -0,0 +1,107 @@
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.scenarios import ScenarioEvaluator
+
+from . import write_daily_prices, write_tables
+
+
+class TestScenarioEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.leaf_index = pd.DataFrame(
+            {1001: [1.0, 1.1, 1.2], 1002: [1.0, np.nan, 0.9]},
+            index=[date(2025, 5, 1) + timedelta(days=d) for d in range(3)]
+        )
+        self.evaluator = ScenarioEvaluator(self.leaf_index)
+
+    def test_single_weights(self):
+        result = self.evaluator.evaluate(pd.Series({1001: 0.6, 1002: 0.4}))
+        np.testing.assert_allclose(result.to_numpy(), [1.0, 0.66, 0.72 + 0.36])
+
+    def test_many_scenarios(self):
+        result = self.evaluator.evaluate({
+            'base': pd.Series({1001: 0.6, 1002: 0.4}),
+            'only_1002': pd.Series({1002: 1.0, 9999: 5.0}),  # 未知类别被忽略
+        })
+        self.assertEqual(list(result.columns), ['base', 'only_1002'])
+        np.testing.assert_allclose(result['only_1002'].to_numpy(), [1.0, 0.0, 0.9])
+
+    def test_hundreds_of_scenarios(self):
+        rng = np.random.default_rng(0)
+        leaf_index = pd.DataFrame(rng.uniform(0.9, 1.1, size=(365, 300)))
+        weights = pd.DataFrame(rng.dirichlet(np.ones(300), size=500))
+        evaluator = ScenarioEvaluator(leaf_index)
+
+        result = evaluator.evaluate(weights)
+
+        self.assertEqual(result.shape, (365, 500))
+        np.testing.assert_allclose(result[7].to_numpy(), leaf_index.to_numpy() @ weights.loc[7].to_numpy())
+
+
+class TestCachedLeafIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 5, 1)
+        cls.end_date = date(2025, 5, 4)
+
+        write_tables(
+            cls.data_dir,
+            categories={'category_id': [1001, 1002], 'parent': [None, None], 'weight': [0.6, 0.4]},
+            products={'product_id': [1, 2, 3], 'category_id': [1001, 1002, 1002]}
+        )
+        write_daily_prices(cls.data_dir, cls.start_date, (
+            pd.DataFrame({'product_id': [1, 2, 3], 'price': [100.0 + day, 200.0 - day, 50.0 * 1.01 ** day]})
+            for day in range(4)
+        ))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_scenarios_match_daily_cpi_and_cache_is_reused(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        cache_dir = self.data_dir / 'cache'
+        calculator = PandasCPICalculator(self.data_dir, cache_dir=cache_dir)
+        expected = PandasCPICalculator(self.data_dir).compute_daily_cpi(self.start_date, self.end_date)
+
+        scenarios = calculator.weight_scenarios(self.start_date, self.end_date)
+        np.testing.assert_allclose(
+            scenarios.evaluate(calculator.leaf_weights()).round(4).to_numpy(), expected.to_numpy()
+        )
+        self.assertEqual(len(list(cache_dir.glob('*.npz'))), 1)
+
+        # 缓存命中时不再计算叶子矩阵
+        calculator.compute_leaf_index_matrix = None
+        pd.testing.assert_series_equal(calculator.compute_daily_cpi(self.start_date, self.end_date), expected)
+
+    def test_cache_files_are_keyed_by_calculation_options(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        cache_dir = self.data_dir / 'keyed_cache'
+        full = PandasCPICalculator(self.data_dir, cache_dir=cache_dir)
+        shard = PandasCPICalculator(self.data_dir, cache_dir=cache_dir, category_ids=[1002])
+        sparse = PandasCPICalculator(self.data_dir, cache_dir=cache_dir, panel='sparse', compact=True)
+        leaf_indexes = [
+            calculator.weight_scenarios(self.start_date, self.end_date).leaf_index
+            for calculator in (full, shard, sparse)
+        ]
+        self.assertEqual(len(list(cache_dir.glob('*.npz'))), 3)
+
+        # 分片的缓存不会覆盖全量结果，交替读取时各自命中
+        full.compute_leaf_index_matrix = shard.compute_leaf_index_matrix = None
+        pd.testing.assert_frame_equal(full.weight_scenarios(self.start_date, self.end_date).leaf_index,
+                                      leaf_indexes[0])
+        pd.testing.assert_frame_equal(shard.weight_scenarios(self.start_date, self.end_date).leaf_index,
+                                      leaf_indexes[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
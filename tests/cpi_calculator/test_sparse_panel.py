@@ -0,0 +1,117 @@
+import tempfile
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from cpi_calculator.parallel import partitioned_category_geo_means
+from cpi_calculator.sparse_panel import SparsePricePanel
+
+from . import write_price_fixture
+
+
+class TestSparsePricePanel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.n_products, self.n_days = 80, 40
+        prices = rng.uniform(1, 20, self.n_products).round(2)
+        rows = []
+        for day in range(self.n_days):
+            present = rng.random(self.n_products) < 0.6
+            rows += [(pid, day, prices[pid]) for pid in np.flatnonzero(present)]
+            changed = rng.random(self.n_products) < 0.05
+            prices[changed] = (prices[changed] * rng.uniform(0.9, 1.1, changed.sum())).round(2)
+        prices_zero = [(3, 10, 0.0)]  # 当日价格为 0
+        self.observations = pd.DataFrame(rows + prices_zero, columns=['product_id', 'day', 'price']).drop_duplicates(
+            ['product_id', 'day'], keep='last'
+        )
+        self.panel = SparsePricePanel.from_observations(self.observations, list(range(self.n_days)))
+
+        # 稠密参照：透视后向前填充
+        self.dense = self.observations.pivot(index='product_id', columns='day', values='price').reindex(
+            columns=range(self.n_days)
+        ).ffill(axis=1)
+
+    def test_dense_round_trip(self):
+        np.testing.assert_allclose(
+            self.panel.to_dense().to_numpy(),
+            self.dense.loc[self.panel.product_ids].to_numpy(dtype=np.float32),
+            rtol=1e-6
+        )
+        self.assertEqual(self.panel.indptr.dtype, np.int32)
+        self.assertEqual(self.panel.price.dtype, np.float32)
+        self.assertLess(len(self.panel.price), len(self.observations))
+
+    def test_geo_means_match_dense(self):
+        members = self.panel.product_ids
+        codes = members % 7
+        sparse = self.panel.category_geo_means(members, codes, 7)
+        dense = partitioned_category_geo_means(
+            self.dense.loc[members].to_numpy(dtype=np.float32).astype(float), codes, 7, workers=1
+        )
+        np.testing.assert_allclose(sparse, dense, rtol=1e-9)
+        self.assertEqual(sparse[3, 10], 0.0)
+
+    def test_daily_frames_match_observations(self):
+        """逐日并入的面板与整表构建相同；当天重复的商品取首条非空价格"""
+        frames = []
+        for day, frame in self.observations.groupby('day'):
+            noise = frame.head(3).assign(price=frame.head(3)['price'] * 2)
+            blank = frame.tail(2).assign(price=np.nan)
+            frames.append(pd.concat([blank, frame, noise]))
+        panel = SparsePricePanel.from_daily_frames(iter(frames), list(range(self.n_days)))
+
+        np.testing.assert_array_equal(panel.product_ids, self.panel.product_ids)
+        np.testing.assert_array_equal(panel.indptr, self.panel.indptr)
+        np.testing.assert_array_equal(panel.run_start, self.panel.run_start)
+        np.testing.assert_array_equal(panel.price, self.panel.price)
+
+    def test_daily_frames_empty(self):
+        panel = SparsePricePanel.from_daily_frames(iter([]), list(range(3)))
+        self.assertEqual((len(panel.product_ids), len(panel.price)), (0, 0))
+
+
+class TestSparseCalculator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.data_dir = Path(cls._tmp.name)
+        cls.start_date = date(2025, 5, 1)
+
+        write_price_fixture(
+            cls.data_dir,
+            categories={'category_id': [1001, 1002], 'parent': [None, None], 'weight': [0.6, 0.4]},
+            products={'product_id': range(20), 'category_id': [1001, 1002] * 10},
+            start_date=cls.start_date, days=10, seed=8, presence=0.8
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_sparse_matches_dense(self):
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        for start_date in (self.start_date, self.start_date + timedelta(days=3)):
+            end_date = self.start_date + timedelta(days=9)
+            dense = PandasCPICalculator(self.data_dir).compute_daily_cpi(start_date, end_date)
+            sparse = PandasCPICalculator(self.data_dir, panel='sparse').compute_daily_cpi(start_date, end_date)
+            pd.testing.assert_series_equal(sparse, dense)
+
+    def test_daily_snapshots_are_not_concatenated(self):
+        """稀疏模式逐日并入快照，不构建覆盖全部天数的长表"""
+        from cpi_calculator.calculator import PandasCPICalculator
+
+        calculator = PandasCPICalculator(self.data_dir, panel='sparse')
+        end_date = self.start_date + timedelta(days=9)
+        with mock.patch.object(PandasCPICalculator, '_load_prices_for_dates', side_effect=AssertionError):
+            sparse = calculator.compute_daily_cpi(self.start_date, end_date)
+        dense = PandasCPICalculator(self.data_dir).compute_daily_cpi(self.start_date, end_date)
+        pd.testing.assert_series_equal(sparse, dense)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""cpi_calculator_ch 以自身目录为根导入（from storage... / from processing...），测试时把它加入搜索路径"""
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent.parent / 'src'
+for path in (SRC, SRC / 'cpi_calculator_ch'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
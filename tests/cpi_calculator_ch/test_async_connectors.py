@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from storage.async_connectors import AsyncClickHouseConnector
+
+
+class SlowConnector:
+    """记录同时执行的查询数的同步连接替身"""
+
+    created = 0
+    active = 0
+    peak = 0
+    closed = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        time.sleep(0.01)  # 建连耗时，让并发的首批调用都进入 _ensure_pool
+        with SlowConnector.lock:
+            SlowConnector.created += 1
+
+    def execute_query(self, query, params=None, return_dataframe=False):
+        with SlowConnector.lock:
+            SlowConnector.active += 1
+            SlowConnector.peak = max(SlowConnector.peak, SlowConnector.active)
+        time.sleep(0.01)
+        with SlowConnector.lock:
+            SlowConnector.active -= 1
+        return [(query,)]
+
+    def close(self):
+        with SlowConnector.lock:
+            SlowConnector.closed += 1
+
+
+class TestAsyncClickHouseConnector(unittest.TestCase):
+    def setUp(self):
+        SlowConnector.created = SlowConnector.active = SlowConnector.peak = SlowConnector.closed = 0
+
+    def test_pool_bounds_concurrency(self):
+        async def main():
+            connector = AsyncClickHouseConnector(pool_size=2, factory=SlowConnector)
+            results = await asyncio.gather(*(connector.execute_query(f'SELECT {i}') for i in range(20)))
+            await connector.close()
+            return results
+
+        results = asyncio.run(main())
+        self.assertEqual([r[0][0] for r in results], [f'SELECT {i}' for i in range(20)])
+        self.assertEqual(SlowConnector.created, 2)
+        self.assertLessEqual(SlowConnector.peak, 2)
+        self.assertEqual(SlowConnector.closed, 2)
+
+    def test_pool_recreated_after_close(self):
+        async def main():
+            connector = AsyncClickHouseConnector(pool_size=1, factory=SlowConnector)
+            await connector.execute_query('SELECT 1')
+            await connector.close()
+            await connector.execute_query('SELECT 2')
+            await connector.close()
+
+        asyncio.run(main())
+        self.assertEqual(SlowConnector.created, 2)
+        self.assertEqual(SlowConnector.closed, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
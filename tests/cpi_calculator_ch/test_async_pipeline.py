@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+import pandas as pd
+
+from processing.async_pipeline import AsyncDataPipeline
+from storage.async_connectors import AsyncClickHouseConnector, AsyncOSSConnector
+from storage.memory_connector import InMemoryClickHouseConnector
+
+
+class DictStorage:
+    """按对象键返回原始价格数据的对象存储替身，未知的键下载失败（返回 None）"""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def download_dataframe(self, object_key, **kwargs):
+        frame = self.objects.get(object_key)
+        return None if frame is None else frame.copy()
+
+
+class TestAsyncDataPipeline(unittest.TestCase):
+    OBJECTS = {
+        'raw/a.csv': pd.DataFrame({
+            'date': ['2025-01-01', '2025-01-01', '2025-01-02'],
+            'item_id': ['a', 'b', 'a'],
+            'price': [10.0, 20.0, 11.0],
+        }),
+        'raw/b.csv': pd.DataFrame({
+            'date': ['2025-01-03', '2025-01-03'],
+            'item_id': ['a', 'b'],
+            'price': [12.0, 21.0],
+        }),
+    }
+
+    def setUp(self):
+        self.ch = InMemoryClickHouseConnector()
+        self.ch.initialize_tables()
+        self.pipeline = AsyncDataPipeline(
+            storage=AsyncOSSConnector(DictStorage(self.OBJECTS), max_concurrency=2),
+            ch=AsyncClickHouseConnector(pool_size=2, factory=lambda: self.ch)
+        )
+
+    def test_run_etl_many_isolates_failing_key(self):
+        keys = ['raw/a.csv', 'raw/missing.csv', 'raw/b.csv']
+        with self.assertLogs('async_pipeline', level='ERROR') as logs:
+            result = asyncio.run(self.pipeline.run_etl_many(keys))
+
+        self.assertEqual(result['loaded'], {'raw/a.csv': 3, 'raw/b.csv': 2})
+        self.assertEqual(list(result['failed']), ['raw/missing.csv'])
+        self.assertIn('下载失败', result['failed']['raw/missing.csv'])
+        self.assertEqual(result['rows'], 5)
+        self.assertIn('raw/missing.csv', logs.output[0])
+
+        # 失败的对象不影响其他对象写入 price
+        self.assertEqual(self.ch.execute_query('SELECT count() FROM price'), [{'count()': 5}])
+
+    def test_object_without_valid_prices_loads_nothing(self):
+        self.pipeline.storage = AsyncOSSConnector(DictStorage({
+            'raw/empty.csv': pd.DataFrame({'date': ['2025-01-01'], 'item_id': ['a'], 'price': [0.0]})
+        }))
+        with self.assertLogs('async_pipeline', level='WARNING'):
+            self.assertEqual(asyncio.run(self.pipeline.run_etl('raw/empty.csv')), 0)
+        self.assertEqual(self.ch.execute_query('SELECT count() FROM price'), [{'count()': 0}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from processing.bulk_loader import S3BulkLoader
+from storage.oss_connector import OSSConnector
+
+
+class RecordingStorage:
+    def __init__(self):
+        self.uploads = []
+        self.deleted = []
+
+    def upload_parquet(self, df, object_key, **kwargs):
+        self.uploads.append((object_key, len(df)))
+        return True
+
+    def delete_object(self, object_key):
+        self.deleted.append(object_key)
+        return True
+
+    def s3_named_collection(self):
+        return 'minio_s3'
+
+    def object_url(self, object_key):
+        return f'http://minio/bucket/{object_key}'
+
+
+class RecordingClickHouse:
+    def __init__(self, fail_on=None, named_collections=('minio_s3', 'oss_s3')):
+        self.statements = []
+        self.fail_on = fail_on
+        self.named_collections = named_collections
+
+    def execute_query(self, query, params=None):
+        return [{'n': int(params['name'] in self.named_collections)}]
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+        if self.fail_on and self.fail_on in query:
+            raise RuntimeError('s3() failed')
+
+
+class TestS3BulkLoader(unittest.TestCase):
+    def setUp(self):
+        self.storage, self.ch = RecordingStorage(), RecordingClickHouse()
+        self.loader = S3BulkLoader(self.storage, self.ch, max_workers=2)
+        self.df = pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-30', '2025-01-31', '2025-02-01']).date,
+            'item_id': ['A', 'B', 'A'],
+            'price': [1.0, 2.0, 3.0],
+        })
+
+    def test_monthly_partitions(self):
+        with mock.patch('processing.bulk_loader.require_parquet_engine'):
+            result = self.loader.load(self.df, 'price')
+
+        self.assertEqual(result, {'partitions': 2, 'rows': 3})
+        self.assertEqual(sorted(n for _, n in self.storage.uploads), [1, 2])
+
+        create, *from_s3, publish, drop = self.ch.statements
+        staging = create.split()[2]
+        self.assertEqual(create, f'CREATE TABLE {staging} AS price')
+        self.assertEqual(len(from_s3), 2)
+        self.assertTrue(all(f'INSERT INTO {staging} (date, item_id, price)' in sql and 'minio_s3' in sql
+                            for sql in from_s3))
+        self.assertEqual(publish, f'INSERT INTO price (date, item_id, price) SELECT date, item_id, price FROM {staging}')
+        self.assertEqual(drop, f'DROP TABLE IF EXISTS {staging}')
+        # 凭证不出现在 SQL 中，暂存对象导入后删除
+        self.assertFalse(any('secret' in sql for sql in self.ch.statements))
+        self.assertEqual(sorted(self.storage.deleted), sorted(key for key, _ in self.storage.uploads))
+
+    def test_failed_partition_leaves_target_unchanged(self):
+        self.ch.fail_on = 's3('
+        with mock.patch('processing.bulk_loader.require_parquet_engine'), \
+                self.assertLogs('bulk_loader', level='ERROR'):
+            with self.assertRaisesRegex(RuntimeError, 's3'):
+                self.loader.load(self.df, 'price')
+
+        self.assertFalse(any(sql.startswith('INSERT INTO price ') for sql in self.ch.statements))
+        self.assertTrue(self.ch.statements[-1].startswith('DROP TABLE IF EXISTS price_staging_'))
+        self.assertLessEqual({key for key, _ in self.storage.uploads}, set(self.storage.deleted))
+
+    def test_missing_named_collection_fails_before_upload(self):
+        self.ch.named_collections = ('oss_s3',)
+        with mock.patch('processing.bulk_loader.require_parquet_engine'):
+            with self.assertRaisesRegex(RuntimeError, 'minio_s3'):
+                self.loader.load(self.df, 'price')
+        self.assertEqual(self.storage.uploads, [])
+        self.assertEqual(self.ch.statements, [])
+
+    def test_missing_pyarrow_raises_import_error(self):
+        with mock.patch('storage.oss_connector.importlib.util.find_spec', return_value=None):
+            with self.assertRaisesRegex(ImportError, 'pyarrow'):
+                self.loader.load(self.df, 'price')
+        self.assertEqual(self.storage.uploads, [])
+
+    def test_empty_frame_needs_no_engine(self):
+        with mock.patch('storage.oss_connector.importlib.util.find_spec', return_value=None):
+            self.assertEqual(self.loader.load(self.df.iloc[:0], 'price'), {'partitions': 0, 'rows': 0})
+
+
+class TestUploadParquet(unittest.TestCase):
+    def test_import_error_not_swallowed(self):
+        storage = OSSConnector.__new__(OSSConnector)  # 不连接存储，只验证依赖检查
+        with mock.patch('storage.oss_connector.importlib.util.find_spec', return_value=None):
+            with self.assertRaisesRegex(ImportError, 'pip install'):
+                storage.upload_parquet(pd.DataFrame({'a': [1]}), 'x.parquet')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import tempfile
+import threading
+import unittest
+from datetime import date
+from pathlib import Path
+
+from scheduler.dag import DagScheduler, DateResource, FileResource, Resource, Task
+
+
+class TestDagScheduler(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self._tmp.name)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def scheduler(self):
+        return DagScheduler(state_path=str(self.tmp_dir / 'state.json'), max_workers=4)
+
+    def record(self, name, fail=False):
+        def func():
+            with self._lock:
+                self.calls.append(name)
+            if fail:
+                raise RuntimeError(f'{name} failed')
+        return func
+
+    def build(self, scheduler, fail=()):
+        """raw → clean → (index, report)，side 独立"""
+        raw, clean = self.tmp_dir / 'raw.csv', self.tmp_dir / 'clean.csv'
+        scheduler.add(Task('clean', self.record('clean', 'clean' in fail),
+                           inputs=[FileResource(raw)], outputs=[FileResource(clean)]))
+        scheduler.add(Task('index', self.record('index', 'index' in fail),
+                           inputs=[FileResource(clean)], deps=['clean']))
+        scheduler.add(Task('report', self.record('report', 'report' in fail), deps=['index']))
+        scheduler.add(Task('side', self.record('side', 'side' in fail)))
+        return raw
+
+    def test_resource_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Resource()
+
+        class NoFingerprint(Resource):
+            @property
+            def id(self):
+                return 'x'
+
+        with self.assertRaises(TypeError):
+            NoFingerprint()
+
+    def test_topological_order(self):
+        scheduler = self.scheduler()
+        scheduler.add(Task('c', self.record('c'), deps=['a', 'b']))
+        scheduler.add(Task('b', self.record('b'), deps=['a']))
+        scheduler.add(Task('a', self.record('a')))
+        self.assertEqual(scheduler.topological_order(), ['a', 'b', 'c'])
+
+        scheduler.run()
+        self.assertEqual(self.calls, ['a', 'b', 'c'])
+
+    def test_invalid_graphs(self):
+        scheduler = self.scheduler()
+        scheduler.add(Task('a', self.record('a'), deps=['b']))
+        scheduler.add(Task('b', self.record('b'), deps=['a']))
+        with self.assertRaises(ValueError):
+            scheduler.topological_order()
+
+        scheduler = self.scheduler()
+        scheduler.add(Task('a', self.record('a'), deps=['missing']))
+        with self.assertRaises(ValueError):
+            scheduler.topological_order()
+        with self.assertRaises(ValueError):
+            scheduler.add(Task('a', self.record('a')))
+
+    def test_skip_when_fresh(self):
+        scheduler = self.scheduler()
+        raw = self.build(scheduler)
+        raw.write_text('v1')
+        (self.tmp_dir / 'clean.csv').write_text('clean')
+        self.assertEqual(set(scheduler.run().values()), {DagScheduler.RAN})
+
+        self.calls.clear()
+        second = self.scheduler()
+        self.build(second)
+        self.assertEqual(set(second.run().values()), {DagScheduler.SKIPPED})
+        self.assertEqual(self.calls, [])
+
+        # 输入变化：该任务及其下游重新执行，无关任务仍跳过
+        raw.write_text('v2 changed')
+        third = self.scheduler()
+        self.build(third)
+        status = third.run()
+        self.assertEqual(status, {'clean': 'ran', 'index': 'ran', 'report': 'ran', 'side': 'skipped'})
+
+        self.calls.clear()
+        self.assertEqual(set(third.run(force=True).values()), {DagScheduler.RAN})
+        self.assertEqual(len(self.calls), 4)
+
+    def test_date_input_reruns_each_day(self):
+        today = [date(2025, 6, 1)]
+        output = self.tmp_dir / 'raw.csv'
+
+        def generate():
+            self.calls.append('generate')
+            output.write_text(today[0].isoformat())
+
+        def run():
+            scheduler = self.scheduler()
+            scheduler.add(Task('generate', generate, inputs=[DateResource(lambda: today[0])],
+                               outputs=[FileResource(output)]))
+            return scheduler.run()['generate']
+
+        self.assertEqual([run(), run()], [DagScheduler.RAN, DagScheduler.SKIPPED])
+        today[0] = date(2025, 6, 2)
+        self.assertEqual(run(), DagScheduler.RAN)
+        self.assertEqual(self.calls, ['generate', 'generate'])
+
+    def test_failure_propagates_downstream(self):
+        scheduler = self.scheduler()
+        self.build(scheduler, fail=('clean',))
+        status = scheduler.run()
+        self.assertEqual(status, {
+            'clean': 'failed', 'index': 'upstream_failed', 'report': 'upstream_failed', 'side': 'ran'
+        })
+        self.assertEqual(sorted(self.calls), ['clean', 'side'])
+
+        # 失败的任务不写状态，下次运行仍会执行
+        self.calls.clear()
+        retry = self.scheduler()
+        self.build(retry)
+        self.assertEqual(retry.run()['clean'], 'ran')
+
+    def test_targets_subset(self):
+        scheduler = self.scheduler()
+        self.build(scheduler)
+        status = scheduler.run(targets=['index'])
+        self.assertEqual(status, {'clean': 'ran', 'index': 'ran'})
+        self.assertEqual(self.calls, ['clean', 'index'])
+        with self.assertRaises(ValueError):
+            scheduler.run(targets=['unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import warnings
+
+import pandas as pd
+
+from processing.data_cleaning import DataCleaner, normalize_ids
+
+
+class TestNormalizeIds(unittest.TestCase):
+    def test_strip_and_upper(self):
+        ids = pd.Series([' a1 ', 'b2', 'A1', ' a1 ', 7], index=[3, 4, 5, 6, 7], name='item_id')
+        normalized = normalize_ids(ids)
+        self.assertEqual(normalized.tolist(), ['A1', 'B2', 'A1', 'A1', '7'])
+        self.assertEqual(normalized.index.tolist(), [3, 4, 5, 6, 7])
+        self.assertEqual(normalized.name, 'item_id')
+
+
+class TestCleanPriceData(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'date': ['2025-06-01', '2025-06-01', '2025-06-02', '2025-06-02'],
+            'item_id': [' a ', 'b', 'a', 'c'],
+            'price': [10.0, None, 11.0, -1.0],
+        })
+
+    def test_filters_and_normalizes(self):
+        df_clean, error = DataCleaner().clean_price_data(self.df)
+        self.assertIsNone(error)
+        self.assertEqual(df_clean['item_id'].tolist(), ['A', 'A'])
+        self.assertEqual(df_clean['date'].tolist(), [pd.Timestamp('2025-06-01'), pd.Timestamp('2025-06-02')])
+        self.assertEqual(df_clean.index.tolist(), [0, 1])
+        # 输入不被修改
+        self.assertEqual(self.df['item_id'].tolist(), [' a ', 'b', 'a', 'c'])
+
+    def test_no_setting_with_copy_warning(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            DataCleaner().clean_price_data(self.df)
+
+    def test_rejects_mismatched_date_format(self):
+        df = self.df.assign(date=['2025/06/01', '2025/06/01', '2025/06/02', '2025/06/02'])
+        with self.assertRaises(ValueError):
+            DataCleaner().clean_price_data(df)
+
+        # date_format=None 恢复自动推断
+        df_clean, _ = DataCleaner(date_format=None).clean_price_data(df)
+        self.assertEqual(df_clean['date'].iloc[-1], pd.Timestamp('2025-06-02'))
+
+    def test_no_valid_prices(self):
+        df_clean, error = DataCleaner().clean_price_data(self.df.assign(price=0.0))
+        self.assertIsNone(df_clean)
+        self.assertEqual(error, "清洗后无有效价格数据")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from processing.data_pipeline import DataPipeline
+from storage.memory_connector import InMemoryClickHouseConnector
+
+
+class ChunkStorage:
+    """按块产出原始价格数据的对象存储替身"""
+
+    def __init__(self, raw: pd.DataFrame):
+        self.raw = raw
+        self.requested = []
+
+    def iter_dataframe_chunks(self, object_key, chunksize=100_000, **kwargs):
+        self.requested.append((object_key, chunksize))
+        for start in range(0, len(self.raw), chunksize):
+            yield self.raw.iloc[start:start + chunksize].copy()
+
+
+def make_pipeline(raw: pd.DataFrame, **kwargs):
+    storage, ch = ChunkStorage(raw), InMemoryClickHouseConnector()
+    ch.initialize_tables()
+    with mock.patch('processing.data_pipeline.OSSConnector', return_value=storage), \
+            mock.patch('processing.data_pipeline.ClickHouseConnector', return_value=ch):
+        return DataPipeline(**kwargs), storage, ch
+
+
+class BatchStorage:
+    """run_etl 每次下载得到下一批原始数据"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    def download_dataframe(self, object_key, **kwargs):
+        return self.batches.pop(0)
+
+
+class TestChangeLogETL(unittest.TestCase):
+    def test_incremental_runs_write_only_changes(self):
+        batches = [
+            pd.DataFrame({
+                'date': ['2025-01-01'] * 3 + ['2025-01-02'] * 3,
+                'item_id': ['a', 'b', 'c'] * 2,
+                'price': [10, 20, 5, 10, 21, 5],
+            }),
+            # a 不变、b 变价、c 出样
+            pd.DataFrame({
+                'date': ['2025-01-03'] * 2 + ['2025-01-04'] * 2,
+                'item_id': ['a', 'b'] * 2,
+                'price': [10, 22, 10, 22],
+            }),
+        ]
+        pipeline, _, ch = make_pipeline(pd.DataFrame(), price_format='changes')
+        pipeline.storage = BatchStorage(batches)
+
+        def load(df, table, partition_by=None):
+            ch.insert_dataframe(table, df)
+            return {'rows': len(df)}
+
+        with mock.patch('processing.data_pipeline.config', mock.Mock(is_local=False)), \
+                mock.patch.object(pipeline.bulk_loader, 'load', side_effect=load):
+            pipeline.run_etl()
+            pipeline.run_etl()
+
+        changes = ch.execute_query("SELECT effective_date, item_id, price FROM price_change", return_dataframe=True)
+        second = changes[pd.to_datetime(changes['date']) >= pd.Timestamp('2025-01-03')]
+        self.assertEqual(len(changes), 6)
+        self.assertEqual(second['item_id'].tolist(), ['B', 'C'])
+        self.assertEqual(second['price'].iloc[0], 22)
+        self.assertTrue(pd.isna(second['price'].iloc[1]))
+
+
+class TestStreamingETL(unittest.TestCase):
+    def setUp(self):
+        self.raw = pd.DataFrame({
+            'date': ['2025-01-01'] * 5 + ['2025-01-02'] * 5,
+            'item_id': [' a1', 'b2', 'c3', 'd4', 'e5'] * 2,
+            'price': [10, 20, -1, 30, None, 11, 21, 5, 31, 6],
+        })
+
+    def test_chunks_cleaned_and_written(self):
+        pipeline, storage, ch = make_pipeline(self.raw)
+        stats = pipeline.run_etl_streaming('raw/prices.csv', chunksize=3)
+
+        self.assertEqual(storage.requested, [('raw/prices.csv', 3)])
+        self.assertEqual(stats, {'chunks': 4, 'rows_in': 10, 'rows_out': 8})
+
+        written = ch.execute_query("SELECT date, item_id, price FROM price", return_dataframe=True)
+        self.assertEqual(len(written), 8)
+        self.assertEqual(sorted(written['item_id'].unique()), ['A1', 'B2', 'C3', 'D4', 'E5'])
+        self.assertTrue((written['price'] > 0).all())
+
+    def test_chunk_without_valid_rows_is_skipped(self):
+        raw = self.raw.copy()
+        raw.loc[3:5, 'price'] = None  # 第二块（3~5 行）全部无效
+        pipeline, _, ch = make_pipeline(raw)
+        stats = pipeline.run_etl_streaming(chunksize=3)
+        self.assertEqual(stats['chunks'], 3)
+        self.assertEqual(stats['rows_out'], len(ch.execute_query("SELECT date, item_id, price FROM price")))
+
+    def test_transform_error_propagates(self):
+        raw = self.raw.copy()
+        raw.loc[7, 'price'] = 5000  # transform_price_data 拒绝异常高价
+        pipeline, _, _ = make_pipeline(raw)
+        with self.assertRaisesRegex(ValueError, "异常高价"):
+            pipeline.run_etl_streaming(chunksize=3)
+
+    def test_change_log_format_rejected(self):
+        pipeline, _, _ = make_pipeline(self.raw, price_format='changes')
+        with self.assertRaises(ValueError):
+            pipeline.run_etl_streaming()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from processing.id_dictionary import ItemIdDictionary
+
+
+class DictTable:
+    """只实现 item_dict 读写的连接替身"""
+
+    def __init__(self):
+        self.rows = pd.DataFrame({'item_key': pd.Series([], dtype='int64'), 'item_id': pd.Series([], dtype=object)})
+
+    def execute_query(self, query, params=None, return_dataframe=False):
+        if 'uniqExact(item_key)' in query:
+            return pd.DataFrame({'key_count': [self.rows['item_key'].nunique()]})
+        return self.rows.sort_values('item_key').reset_index(drop=True)
+
+    def insert_columns(self, table, columns):
+        self.rows = pd.concat([self.rows, pd.DataFrame(columns)], ignore_index=True)
+        return len(columns['item_key'])
+
+
+class TestItemIdDictionary(unittest.TestCase):
+    def test_encode_assigns_dense_keys(self):
+        ids = ItemIdDictionary()
+        keys = ids.encode([' a1', 'B2', 'a1 ', 'c3', 'b2'])
+        self.assertEqual(keys.dtype, np.uint32)
+        self.assertEqual(keys.tolist(), [0, 1, 0, 2, 1])
+        self.assertEqual(ids.decode(keys).tolist(), ['A1', 'B2', 'A1', 'C3', 'B2'])
+        # 已知 ID 不再分配新键
+        self.assertEqual(ids.encode(['c3', 'd4']).tolist(), [2, 3])
+        self.assertEqual(len(ids), 4)
+
+    def test_encode_without_add_rejects_unknown(self):
+        ids = ItemIdDictionary()
+        ids.encode(['a'])
+        with self.assertRaises(KeyError):
+            ids.encode(['a', 'zz'], add=False)
+        self.assertEqual(len(ids), 1)
+
+    def test_sync_and_load_round_trip(self):
+        table = DictTable()
+        writer = ItemIdDictionary()
+        writer.encode(['x', 'y'])
+        self.assertEqual(writer.sync(table), 2)
+        self.assertEqual(writer.sync(table), 0)
+        writer.encode(['z'])
+        self.assertEqual(writer.sync(table), 1)
+
+        reader = ItemIdDictionary()
+        self.assertEqual(reader.load(table), 3)
+        self.assertEqual(reader.encode(['Z', 'x'], add=False).tolist(), [2, 0])
+
+    def test_concurrent_writer_detected(self):
+        table = DictTable()
+        first, second = ItemIdDictionary(), ItemIdDictionary()
+        first.load(table)
+        second.load(table)
+
+        first.encode(['a'])
+        second.encode(['b'])  # 同样分到键 0
+        first.sync(table)
+        with self.assertRaises(RuntimeError):
+            second.sync(table)
+        self.assertEqual(table.rows['item_id'].tolist(), ['A'])
+
+    def test_load_rejects_gaps(self):
+        table = DictTable()
+        table.insert_columns('item_dict', {'item_key': [0, 2], 'item_id': ['A', 'C']})
+        with self.assertRaises(ValueError):
+            ItemIdDictionary().load(table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+
+from analysis.index_service import AsyncIndexService, IndexConfig
+from analysis.price_index import PriceIndexCalculator
+from storage.async_connectors import AsyncClickHouseConnector
+from storage.memory_connector import InMemoryClickHouseConnector
+
+
+class TestAsyncIndexService(unittest.TestCase):
+    def setUp(self):
+        self.ch = InMemoryClickHouseConnector()
+        self.ch.initialize_tables()
+        self.ch.insert_category([(1, 'food', 0.6, None), (2, 'home', 0.4, None)])
+        self.ch.insert_item([('A', 1), ('B', 1), ('C', 2)])
+        self.ch.insert_price([
+            (day, item, price * growth)
+            for day, growth in (('2025-06-01', 1.0), ('2025-06-02', 1.02), ('2025-06-03', 1.05))
+            for item, price in (('A', 10.0), ('B', 20.0), ('C', 5.0))
+        ])
+        self.service = AsyncIndexService(AsyncClickHouseConnector(pool_size=2, factory=lambda: self.ch))
+
+    def test_compute_many_returns_one_result_per_config(self):
+        configs = [
+            IndexConfig('cavallo'),
+            IndexConfig('tmall'),
+            IndexConfig('cavallo', 'fixed', '2025-06-02'),
+        ]
+        results = asyncio.run(self.service.compute_many(configs))
+
+        self.assertEqual(list(results), ['cavallo:auto', 'tmall:auto', 'cavallo:fixed:2025-06-02'])
+        self.assertEqual([row['index'] for row in results['cavallo:auto']], [100.0, 102.0, 105.0])
+        calculator = PriceIndexCalculator(self.ch, save_results=False)
+        for config in configs:
+            expected = getattr(calculator, f"calculate_{config.method}_index")(config.base_mode, config.base_date)
+            self.assertEqual(results[config.key], expected)
+
+    def test_unknown_method_rejected(self):
+        with self.assertRaisesRegex(ValueError, 'laspeyres'):
+            asyncio.run(self.service.compute_many([IndexConfig('cavallo'), IndexConfig('laspeyres')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from datetime import date, datetime
+
+from analysis.queries import INDEX_QUERIES
+from analysis.replay_load import PriceReplayLoadTest, RateLimiter, summarize_latencies
+from data_generator.price_generator import Product
+from storage.memory_connector import InMemoryClickHouseConnector
+
+# 每条登记查询在替身中应返回的列
+EXPECTED_COLUMNS = {
+    'all_prices': ['date', 'item_id', 'price'],
+    'daily_category': ['date', 'category_id', 'category_name', 'weight', 'avg_price', 'item_count'],
+    'items_on_date': ['item_count'],
+    'price_changes': ['date', 'item_id', 'price'],
+    'item_categories': ['item_id', 'category_id'],
+    'category_weights': ['category_id', 'weight'],
+    'price_count': ['row_count'],
+    'min_price_date': ['min_date'],
+    'items_on_change_date': ['item_count'],
+    'price_change_count': ['row_count'],
+    'min_change_date': ['min_date'],
+    'category_daily_links': ['date', 'category_id', 'link', 'item_count'],
+}
+
+
+class TestInMemoryClickHouseConnector(unittest.TestCase):
+    def setUp(self):
+        self.ch = InMemoryClickHouseConnector()
+        self.ch.initialize_tables()
+        now = datetime(2025, 1, 1)
+        self.ch.insert_category([(1, 'food', 0.6, now), (2, 'home', 0.4, now)])
+        self.ch.insert_columns('item', {'item_id': ['a', 'b', 'c'], 'category_id': [1, 1, 2]})
+        self.ch.insert_columns('price', {
+            'date': [date(2025, 1, 1)] * 3 + [date(2025, 1, 2)] * 2,
+            'item_id': ['a', 'b', 'c', 'a', 'c'],
+            'price': [10.0, 20.0, 5.0, 11.0, 6.0]
+        })
+        self.ch.insert_columns('price_change', {
+            'effective_date': [date(2025, 1, 2), date(2025, 1, 1)],
+            'item_id': ['a', 'a'],
+            'price': [11.0, 10.0]
+        })
+
+    def test_every_registered_query_is_supported(self):
+        """查询文本改动后替身仍能识别（键模式为 item_id 的版本）"""
+        for name in INDEX_QUERIES:
+            if name.endswith('_keyed'):
+                continue
+            with self.subTest(query=name):
+                params = {'day': date(2025, 1, 1)} if INDEX_QUERIES[name].params else {}
+                result = INDEX_QUERIES.run(self.ch, name, return_dataframe=True, **params)
+                self.assertEqual(list(result.columns), EXPECTED_COLUMNS[name])
+
+    def test_query_results(self):
+        self.assertEqual(INDEX_QUERIES.run(self.ch, 'price_count'), [{'row_count': 5}])
+        self.assertEqual(INDEX_QUERIES.run(self.ch, 'items_on_date', day='2025-01-02'), [{'item_count': 2}])
+        self.assertEqual(INDEX_QUERIES.run(self.ch, 'min_price_date'), [{'min_date': date(2025, 1, 1)}])
+
+        daily = INDEX_QUERIES.run(self.ch, 'daily_category', return_dataframe=True)
+        food = daily[(daily['category_id'] == 1) & (daily['date'] == date(2025, 1, 1))].iloc[0]
+        self.assertEqual((food['avg_price'], food['item_count'], food['category_name']), (15.0, 2, 'food'))
+
+        # 变更日志按商品、生效日排序
+        changes = INDEX_QUERIES.run(self.ch, 'price_changes', return_dataframe=True)
+        self.assertEqual(list(changes['price']), [10.0, 11.0])
+
+    def test_writes_visible_after_merge(self):
+        self.ch.insert_price([(date(2025, 1, 3), 'b', 21.0)])
+        self.assertEqual(INDEX_QUERIES.run(self.ch, 'price_count')[0]['row_count'], 6)
+
+    def test_unknown_query_raises(self):
+        with self.assertRaises(NotImplementedError):
+            self.ch.execute_query("SELECT name FROM system.tables")
+
+
+class TestPriceReplayLoadTest(unittest.TestCase):
+    def test_in_process_run(self):
+        products = [Product(1000 + i, 1 + i % 4, f'p{i}', 1.0, 10.0 + i) for i in range(80)]
+        ch = InMemoryClickHouseConnector()
+        report = PriceReplayLoadTest(ch, rows_per_sec=0, block_rows=50).run(
+            products, days=5, start_date=datetime(2025, 3, 1)
+        )
+
+        self.assertEqual(report['days'], 5)
+        self.assertEqual(report['rows'], INDEX_QUERIES.run(ch, 'price_count')[0]['row_count'])
+        # 写入块按整天切分，每天至多一块
+        self.assertTrue(1 <= report['insert_latency_ms']['count'] <= 5)
+        self.assertEqual(set(report['index_latency_ms']), {'cavallo', 'tmall'})
+
+    def test_summarize_latencies(self):
+        self.assertEqual(summarize_latencies([])['count'], 0)
+        summary = summarize_latencies([0.001, 0.002, 0.003])
+        self.assertEqual((summary['count'], summary['p50'], summary['max']), (3, 2.0, 3.0))
+
+    def test_unlimited_rate_does_not_sleep(self):
+        limiter = RateLimiter(0)
+        limiter.acquire(10_000)
+        self.assertEqual(limiter._sent, 10_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
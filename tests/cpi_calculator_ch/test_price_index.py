@@ -0,0 +1,131 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analysis.price_index import PriceIndexCalculator
+from storage.memory_connector import InMemoryClickHouseConnector
+
+CH_ROOT = Path(__file__).resolve().parent.parent.parent / 'src' / 'cpi_calculator_ch'
+
+
+class TestPriceIndexImports(unittest.TestCase):
+    def test_module_import_without_cpi_calculator(self):
+        """只有 cpi_calculator_ch 在路径上时也能导入，且不加载 cpi_calculator"""
+        probe = (
+            "import sys, json\nimport analysis.price_index\n"
+            "print(json.dumps('cpi_calculator' in sys.modules))"
+        )
+        env = dict(os.environ, PYTHONPATH=str(CH_ROOT))
+        out = subprocess.run([sys.executable, '-c', probe], env=env, capture_output=True, text=True, check=True)
+        self.assertFalse(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    def test_build_log_levels(self):
+        ch = InMemoryClickHouseConnector()
+        ch.initialize_tables()
+        ch.insert_category([(1, 'food', 1.0, None)])
+        ch.insert_item([('A', 1), ('B', 1)])
+        ch.insert_price([
+            ('2025-06-01', 'A', 10.0), ('2025-06-01', 'B', 20.0),
+            ('2025-06-02', 'A', 11.0), ('2025-06-02', 'B', 22.0),
+        ])
+        levels = PriceIndexCalculator(ch, save_results=False).build_log_levels()
+        column = levels[1]
+        self.assertAlmostEqual(column.iloc[-1] - column.iloc[0], np.log(1.1), places=9)
+
+    def test_log_levels_match_price_pivot(self):
+        """SQL 汇总的每日环比与 cpi_calculator 按价格透视表计算的累计水平一致（含缺价、零价格、断档）"""
+        from cpi_calculator.log_levels import CategoryLogLevels
+
+        rng = np.random.default_rng(11)
+        dates = pd.date_range('2025-06-01', periods=12, freq='D')
+        rows = []
+        for item in range(30):
+            price = rng.uniform(5, 50)
+            for day in dates:
+                if rng.random() < 0.8:
+                    rows.append((day.strftime('%Y-%m-%d'), f'I{item}', 0.0 if rng.random() < 0.03 else round(price, 2)))
+                price *= rng.uniform(0.95, 1.05)
+
+        ch = InMemoryClickHouseConnector()
+        ch.initialize_tables()
+        ch.insert_category([(1, 'food', 0.5, None), (2, 'home', 0.3, None), (3, 'toys', 0.2, None)])
+        ch.insert_item([(f'I{item}', item % 3 + 1) for item in range(30)])
+        ch.insert_price(rows)
+
+        prices = pd.DataFrame(rows, columns=['date', 'item_id', 'price'])
+        prices['date'] = pd.to_datetime(prices['date'])
+        pivot = prices.pivot_table(index='item_id', columns='date', values='price', aggfunc='first')
+        categories = pd.Series({f'I{item}': item % 3 + 1 for item in range(30)})
+        expected = CategoryLogLevels.from_price_pivot(pivot, categories).levels
+
+        actual = PriceIndexCalculator(ch, save_results=False).build_log_levels()
+        np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12)
+        self.assertEqual(list(actual.columns), list(expected.columns))
+
+
+class TestChangeLogIndex(unittest.TestCase):
+    """只有 price_change 表时，从校验到各指数都与等价的每日 price 表一致"""
+
+    EVENTS = [
+        ('2025-06-28', 'A', 10.0), ('2025-06-30', 'A', 11.0), ('2025-07-02', 'A', 12.0),
+        ('2025-06-28', 'B', 20.0), ('2025-06-29', 'B', None), ('2025-07-01', 'B', 21.0),
+        ('2025-06-28', 'C', 5.0), ('2025-07-01', 'C', 5.5),
+        ('2025-06-29', 'D', 8.0), ('2025-07-03', 'D', None),
+    ]
+
+    def setUp(self):
+        self.changes_ch, self.daily_ch = InMemoryClickHouseConnector(), InMemoryClickHouseConnector()
+        for ch in (self.changes_ch, self.daily_ch):
+            ch.initialize_tables()
+            ch.insert_category([(1, 'food', 0.6, None), (2, 'home', 0.4, None)])
+            ch.insert_item([('A', 1), ('B', 1), ('C', 2), ('D', 2)])
+
+        events = pd.DataFrame(self.EVENTS, columns=['effective_date', 'item_id', 'price'])
+        self.changes_ch.insert_dataframe('price_change', events)
+        self.daily_ch.insert_price(self.expand(events))
+
+    @staticmethod
+    def expand(events):
+        """逐日展开变更日志，作为对照的每日全量价格"""
+        end = pd.Timestamp(events['effective_date'].max())
+        rows = []
+        for item_id, group in events.groupby('item_id'):
+            group = group.sort_values('effective_date')
+            starts = list(pd.to_datetime(group['effective_date'])) + [end + pd.Timedelta(days=1)]
+            for start, stop, price in zip(starts, starts[1:], group['price']):
+                if not pd.isna(price):
+                    rows.extend((day.strftime('%Y-%m-%d'), item_id, price) for day in pd.date_range(start, stop, inclusive='left'))
+        return rows
+
+    def assertIndicesEqual(self, actual, expected):
+        self.assertEqual([(r['date'], r['base_date']) for r in actual], [(r['date'], r['base_date']) for r in expected])
+        for a, e in zip(actual, expected):
+            self.assertAlmostEqual(a['index'], e['index'], places=3)
+
+    def test_end_to_end(self):
+        changes = PriceIndexCalculator(self.changes_ch, save_results=False, price_format='changes')
+        daily = PriceIndexCalculator(self.daily_ch, save_results=False)
+
+        self.assertTrue(changes.validate_data_ready())
+        for mode, base in (('auto', None), ('monthly', None), ('fixed', '2025-06-30')):
+            self.assertIndicesEqual(changes.calculate_cavallo_index(mode, base), daily.calculate_cavallo_index(mode, base))
+            self.assertIndicesEqual(changes.calculate_tmall_index(mode, base), daily.calculate_tmall_index(mode, base))
+        self.assertIndicesEqual(changes.calculate_chained_index('2025-06-29'), daily.calculate_chained_index('2025-06-29'))
+
+    def test_validation_fails_without_changes(self):
+        ch = InMemoryClickHouseConnector()
+        ch.initialize_tables()
+        ch.insert_category([(1, 'food', 1.0, None)])
+        ch.insert_price([('2025-06-01', 'A', 10.0)])
+        with self.assertLogs('price_index', level='ERROR'):
+            self.assertFalse(PriceIndexCalculator(ch, save_results=False, price_format='changes').validate_data_ready())
+
+
+if __name__ == '__main__':
+    unittest.main()
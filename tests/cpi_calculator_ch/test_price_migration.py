@@ -0,0 +1,82 @@
+import logging
+import unittest
+
+from storage.clickhouse_connector import ClickHouseConnector
+
+
+class MigratingClient:
+    """按语句模拟 price 迁移；write_during_copy 为真时复制期间 ETL 向 price 写入一行"""
+
+    def __init__(self, rows, write_during_copy=False):
+        self.tables = {'price': set(rows)}
+        self.statements = []
+        self.write_during_copy = write_during_copy
+
+    def execute(self, query, params=None):
+        query = query.strip()
+        self.statements.append(query)
+        if query.startswith('SELECT count(), max(date) FROM price'):
+            rows = self.tables['price']
+            return [(len(rows), max(row[0] for row in rows))]
+        elif query.startswith('CREATE TABLE'):
+            self.tables['price_v2'] = set()
+        elif query.startswith('INSERT INTO price_v2'):
+            self.tables['price_v2'] |= self.tables['price']
+            if self.write_during_copy:
+                self.tables['price'].add(('2025-06-03', 'late', 1.0))
+        elif query.startswith('EXCHANGE TABLES'):
+            self.tables['price'], self.tables['price_v2'] = self.tables['price_v2'], self.tables['price']
+        elif query.startswith('RENAME TABLE price_v2 TO price_backup'):
+            self.tables['price_backup'] = self.tables.pop('price_v2')
+        elif query.startswith('DROP TABLE'):
+            self.tables.pop(query.split()[-1], None)
+        elif query.startswith('SELECT count() FROM'):
+            return [(len(self.tables[query.split()[-1]]),)]
+        return []
+
+
+def _connector(client):
+    # 跳过 __init__：不读取连接配置，只替换底层客户端
+    connector = ClickHouseConnector.__new__(ClickHouseConnector)
+    connector.logger = logging.getLogger('clickhouse_connector')
+    connector.client = client
+    return connector
+
+
+class TestMigratePriceSchema(unittest.TestCase):
+    ROWS = {('2025-06-01', 'a', 2.0), ('2025-06-02', 'a', 2.5)}
+
+    def test_paused_writes_migrate(self):
+        client = MigratingClient(self.ROWS)
+        self.assertEqual(_connector(client).migrate_price_schema(), 2)
+
+        self.assertEqual(client.tables['price'], self.ROWS)
+        self.assertEqual(client.tables['price_backup'], self.ROWS)
+        self.assertNotIn('price_v2', client.tables)
+        # 换表前紧接着再次检查 count() 和 max(date)，不再有补齐语句
+        exchange = client.statements.index('EXCHANGE TABLES price AND price_v2')
+        self.assertEqual(client.statements[exchange - 1], 'SELECT count(), max(date) FROM price')
+        self.assertFalse(any(query.startswith('INSERT INTO price ') for query in client.statements))
+
+    def test_write_during_copy_aborts(self):
+        client = MigratingClient(self.ROWS, write_during_copy=True)
+        with self.assertLogs('clickhouse_connector', level='ERROR'):
+            with self.assertRaisesRegex(RuntimeError, '迁移期间被写入'):
+                _connector(client).migrate_price_schema()
+
+        # 原表保留迁移期间写入的行，未换表，副本已删除
+        self.assertIn(('2025-06-03', 'late', 1.0), client.tables['price'])
+        self.assertNotIn('EXCHANGE TABLES price AND price_v2', client.statements)
+        self.assertNotIn('price_v2', client.tables)
+
+    def test_keep_backup_false_drops_old_table(self):
+        client = MigratingClient(self.ROWS)
+        _connector(client).migrate_price_schema(item_keys=True, keep_backup=False)
+
+        self.assertNotIn('price_backup', client.tables)
+        self.assertIn('INSERT INTO price_v2 (date, item_key, item_id, price) '
+                      'SELECT date, item_key, item_id, price FROM price', client.statements)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import date, datetime
+
+from storage.query_registry import QueryRegistry
+
+
+class RecordingConnector:
+    def __init__(self, result=None):
+        self.result = result if result is not None else []
+        self.calls = []
+
+    def execute_query(self, query, params=None, return_dataframe=False):
+        self.calls.append((query, params, return_dataframe))
+        return self.result
+
+
+class TestQueryRegistry(unittest.TestCase):
+    SQL = (
+        "SELECT item_id, price FROM price "
+        "WHERE date BETWEEN {start:Date} AND {end:Date} AND price > {min_price: Float64} AND date >= {start:Date}"
+    )
+
+    def setUp(self):
+        self.registry = QueryRegistry()
+
+    def test_register_parses_placeholders(self):
+        query = self.registry.register('range', self.SQL)
+        self.assertEqual(query.params, {'start': 'Date', 'end': 'Date', 'min_price': 'Float64'})
+        self.assertIn('range', self.registry)
+        self.assertEqual(list(self.registry), ['range'])
+        self.assertIs(self.registry['range'], query)
+
+    def test_conflicting_types_rejected(self):
+        with self.assertRaises(ValueError):
+            self.registry.register('bad', "SELECT {d:Date} AS a, {d:String} AS b")
+        self.assertNotIn('bad', self.registry)
+
+    def test_run_binds_coerced_params(self):
+        self.registry.register('range', self.SQL)
+        self.registry.register('since', "SELECT count() FROM price WHERE ts > {ts:DateTime} AND n = {n:UInt32}")
+        connector = RecordingConnector([(1,)])
+
+        self.registry.run(connector, 'range', start='2025-06-01', end=datetime(2025, 6, 3, 12), min_price='1.5')
+        self.registry.run(connector, 'since', return_dataframe=True, ts='2025-06-01 08:00', n='7')
+
+        sql, params, return_dataframe = connector.calls[0]
+        self.assertEqual(sql, self.SQL)
+        self.assertEqual(params, {'start': date(2025, 6, 1), 'end': date(2025, 6, 3), 'min_price': 1.5})
+        self.assertFalse(return_dataframe)
+        _, params, return_dataframe = connector.calls[1]
+        self.assertEqual(params, {'ts': datetime(2025, 6, 1, 8), 'n': 7})
+        self.assertTrue(return_dataframe)
+
+    def test_query_without_params_passes_none(self):
+        self.registry.register('all', "SELECT * FROM category")
+        connector = RecordingConnector()
+        self.registry.run(connector, 'all')
+        self.assertIsNone(connector.calls[0][1])
+
+    def test_param_mismatch_rejected(self):
+        self.registry.register('range', self.SQL)
+        connector = RecordingConnector()
+        with self.assertRaises(ValueError):
+            self.registry.run(connector, 'range', start='2025-06-01', end='2025-06-02')
+        with self.assertRaises(ValueError):
+            self.registry.run(connector, 'range', start='2025-06-01', end='2025-06-02', min_price=1, limit=3)
+        with self.assertRaises(KeyError):
+            self.registry.run(connector, 'missing')
+        self.assertEqual(connector.calls, [])
+        self.assertEqual(self.registry.stats(), {})
+
+    def test_stats_count_failed_calls(self):
+        class FailingConnector:
+            def execute_query(self, query, params=None, return_dataframe=False):
+                raise RuntimeError('connection lost')
+
+        self.registry.register('all', "SELECT * FROM category")
+        self.registry.run(RecordingConnector(), 'all')
+        with self.assertRaises(RuntimeError):
+            self.registry.run(FailingConnector(), 'all')
+
+        stats = self.registry.stats()['all']
+        self.assertEqual(stats['calls'], 2)
+        self.assertGreaterEqual(stats['max_ms'], stats['avg_ms'])
+        self.assertAlmostEqual(stats['avg_ms'], stats['total_ms'] / 2, places=2)
+
+        self.registry.reset_stats()
+        self.assertEqual(self.registry.stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from processing.schema_mapping import SchemaMapper, compile_schema
+
+
+class TestSchemaMapper(unittest.TestCase):
+    def setUp(self):
+        self.mapper = SchemaMapper()
+
+    def test_price_frame_types(self):
+        df = pd.DataFrame({
+            'date': ['2025-01-01', '2025-01-02T08:30:00'],
+            'item_id': [101, 'A2'],
+            'price': ['9.5', 3],
+            'extra': [1, 2],
+        })
+        mapped, errors = self.mapper.map_price_frame(df)
+
+        self.assertEqual(list(mapped.columns), ['date', 'item_id', 'price'])
+        self.assertTrue(errors.empty)
+        self.assertEqual(mapped['price'].dtype, np.float32)
+        self.assertEqual(list(mapped['item_id']), ['101', 'A2'])
+        # Date 类型截断到日
+        self.assertEqual(list(mapped['date']), [pd.Timestamp('2025-01-01'), pd.Timestamp('2025-01-02')])
+
+    def test_failed_cells_reported_and_rows_dropped(self):
+        df = pd.DataFrame({
+            'category_id': [1, -2, 'x', 4, 2 ** 32],
+            'name': ['a', 'b', 'c', 'd', 'e'],
+            'weight': [0.1, 0.2, 0.3, 'heavy', 0.5],
+            'timestamp': ['2025-01-01 00:00:00'] * 5,
+        }, index=[10, 11, 12, 13, 14])
+        mapped, errors = self.mapper.map_category_frame(df)
+
+        self.assertEqual(list(mapped.index), [10])
+        self.assertEqual(mapped['category_id'].dtype, 'UInt32')
+        self.assertEqual(
+            sorted(zip(errors['row'], errors['field'])),
+            [(11, 'category_id'), (12, 'category_id'), (13, 'weight'), (14, 'category_id')]
+        )
+        self.assertEqual(set(errors['type']), {'UInt32', 'Float32'})
+
+    def test_float32_overflow_is_error(self):
+        df = pd.DataFrame({'date': ['2025-01-01'] * 3, 'item_id': ['a', 'b', 'c'], 'price': [1.5, 1e39, 'inf']})
+        mapped, errors = self.mapper.map_price_frame(df)
+
+        self.assertEqual(list(mapped['item_id']), ['a'])
+        self.assertEqual(sorted(zip(errors['row'], errors['field'])), [(1, 'price'), (2, 'price')])
+        self.assertTrue(np.isfinite(mapped['price']).all())
+
+    def test_nulls_are_not_errors(self):
+        df = pd.DataFrame({'item_id': ['a', 'b'], 'category_id': [1, None]})
+        mapped, errors = self.mapper.map_item_frame(df)
+        self.assertTrue(errors.empty)
+        self.assertEqual(len(mapped), 2)
+        self.assertTrue(pd.isna(mapped['category_id'].iloc[1]))
+
+    def test_frame_matches_row_mapping(self):
+        """整表转换与逐行 map_price_schema 的结果一致"""
+        rows = [{'date': '2025-03-01', 'item_id': 7, 'price': '12.25'}, {'date': '2025-03-02', 'item_id': 'x', 'price': 1}]
+        mapped, _ = self.mapper.map_price_frame(pd.DataFrame(rows))
+        for (_, frame_row), row in zip(mapped.iterrows(), rows):
+            expected = self.mapper.map_price_schema(row)
+            self.assertEqual(frame_row['item_id'], expected['item_id'])
+            self.assertAlmostEqual(float(frame_row['price']), expected['price'], places=5)
+            self.assertEqual(frame_row['date'].strftime('%Y-%m-%d'), expected['date'])
+
+    def test_compile_schema(self):
+        plans = compile_schema({'fields': ['a', 'b'], 'types': ['Nullable(UInt32)', 'Decimal(10, 2)']})
+        self.assertEqual([p.field for p in plans], ['a', 'b'])
+        values, ok = plans[0].cast(pd.Series([1, 1.5]))
+        self.assertEqual(list(ok), [True, False])
+        # 未知类型原样保留
+        values, ok = plans[1].cast(pd.Series(['x']))
+        self.assertEqual((values.iloc[0], bool(ok.iloc[0])), ('x', True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+
+from monitoring import spans
+from storage.clickhouse_connector import ClickHouseConnector
+from storage.oss_connector import OSSConnector
+from storage.query_registry import QueryRegistry
+
+
+class TestSpans(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        spans.configure(None)
+        self._tmp.cleanup()
+
+    def test_disabled_returns_shared_noop(self):
+        spans.configure(None)
+        self.assertFalse(spans.enabled())
+        with spans.span('a') as first, spans.span('b') as second:
+            first.set(rows_out=3, table='price')
+        self.assertIs(first, second)
+
+    def test_json_lines(self):
+        path = self.tmp_dir / 'spans.jsonl'
+        spans.configure('json', str(path))
+        self.assertTrue(spans.enabled())
+
+        with spans.span('etl.load', table='price') as s:
+            s.set(rows_in=10, rows_out=8, bytes=256, day='2025-06-01')
+        with self.assertRaises(KeyError):
+            with spans.span('etl.fail'):
+                raise KeyError('x')
+
+        records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        self.assertEqual([r['span'] for r in records], ['etl.load', 'etl.fail'])
+        self.assertEqual(
+            {k: records[0][k] for k in ('rows_in', 'rows_out', 'bytes', 'table', 'day')},
+            {'rows_in': 10, 'rows_out': 8, 'bytes': 256, 'table': 'price', 'day': '2025-06-01'}
+        )
+        self.assertGreaterEqual(records[0]['wall_ms'], 0)
+        self.assertNotIn('error', records[0])
+        self.assertEqual(records[1]['error'], 'KeyError')
+
+    def test_prometheus_totals(self):
+        path = self.tmp_dir / 'spans.prom'
+        spans.configure('prometheus', str(path))
+        for rows in (3, 4):
+            with spans.span('query.range') as s:
+                s.set(rows_out=rows)
+        with spans.span('etl.load') as s:
+            s.set(rows_in=5)
+
+        # 未到刷新间隔时不写文件，flush 后写出快照
+        self.assertFalse(path.exists())
+        spans.flush()
+        text = path.read_text(encoding='utf-8')
+        self.assertIn('cpi_span_calls_total{span="query.range"} 2', text)
+        self.assertIn('cpi_span_rows_out_total{span="query.range"} 7', text)
+        self.assertIn('cpi_span_rows_in_total{span="etl.load"} 5', text)
+        self.assertIn('# TYPE cpi_span_seconds_total counter', text)
+        self.assertFalse(Path(f'{path}.tmp').exists())
+
+    def test_reconfigure_flushes_previous_exporter(self):
+        path = self.tmp_dir / 'spans.prom'
+        spans.configure('prometheus', str(path))
+        with spans.span('query.range'):
+            pass
+        spans.configure(None)
+        self.assertIn('cpi_span_calls_total{span="query.range"} 1', path.read_text(encoding='utf-8'))
+
+    def test_unknown_exporter(self):
+        with self.assertRaises(ValueError):
+            spans.configure('statsd')
+
+
+
+class _ProgressClient:
+    """记录查询进度的 ClickHouse 客户端替身，每条查询读 100 字节、写 20 字节"""
+
+    def __init__(self):
+        self.last_query = None
+
+    def execute(self, query, params=None, with_column_types=False):
+        self.last_query = SimpleNamespace(progress=SimpleNamespace(bytes=100, written_bytes=20))
+        rows = [(1,), (2,)]
+        return (rows, [('x', 'UInt8')]) if with_column_types else rows
+
+
+class TestStorageSpans(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / 'spans.jsonl'
+        spans.configure('json', str(self.path))
+
+    def tearDown(self):
+        spans.configure(None)
+        self._tmp.cleanup()
+
+    def _records(self):
+        return {r['span']: r for r in map(json.loads, self.path.read_text(encoding='utf-8').splitlines())}
+
+    def test_clickhouse_spans_record_bytes(self):
+        connector = ClickHouseConnector.__new__(ClickHouseConnector)
+        connector.logger = mock.Mock()
+        connector.client = _ProgressClient()
+
+        registry = QueryRegistry()
+        registry.register('xs', "SELECT x FROM t WHERE x <= {limit:UInt8}")
+
+        connector.execute("INSERT INTO t SELECT 1")
+        connector.execute_query("SELECT x FROM t")
+        registry.run(connector, 'xs', limit=2)
+
+        records = self._records()
+        self.assertEqual(records['clickhouse.execute']['bytes'], 120)
+        for name in ('clickhouse.query', 'query.xs'):
+            self.assertEqual((records[name]['rows_out'], records[name]['bytes']), (2, 120))
+
+    def test_csv_upload_encodes_once(self):
+        storage = OSSConnector.__new__(OSSConnector)
+        storage.client = mock.Mock()
+        df = pd.DataFrame({'item_id': ['商品1', 'b'], 'price': [1.5, 2.0]})
+
+        with mock.patch('storage.oss_connector.settings', SimpleNamespace(IS_LOCAL=True, OSS_BUCKET='bucket')):
+            self.assertTrue(storage.upload_dataframe(df, 'k.csv'))
+
+        _, _, body = storage.client.put_object.call_args.args
+        data = body.getvalue()
+        # length 为字节数：含中文时大于字符数
+        self.assertEqual(storage.client.put_object.call_args.kwargs['length'], len(data))
+        self.assertEqual(self._records()['oss.upload']['bytes'], len(data))
+        self.assertEqual(data.decode('utf-8'), df.to_csv(index=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
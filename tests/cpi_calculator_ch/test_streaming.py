@@ -0,0 +1,119 @@
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from data_generator.price_generator import Product
+from processing.generator_stream import GeneratorStreamLoader
+from processing.streaming import StagePipeline
+
+
+class TestStagePipeline(unittest.TestCase):
+    def test_all_items_pass_through_stages(self):
+        received = []
+        lock = threading.Lock()
+
+        def sink(item):
+            with lock:
+                received.append(item)
+
+        consumed = StagePipeline(
+            source=range(50),
+            stages=[lambda x: x * 2, lambda x: None if x % 4 else x],
+            sinks=[sink, sink],
+            queue_size=2
+        ).run()
+        self.assertEqual(sorted(received), list(range(0, 100, 4)))
+        self.assertEqual(consumed, 25)
+
+    def test_bounded_queue_backpressure(self):
+        """写入端很慢时，数据源最多领先 队列容量 + 各线程手中的一块"""
+        produced, consumed = [0], [0]
+        lead = []
+
+        def source():
+            for i in range(40):
+                produced[0] += 1
+                lead.append(produced[0] - consumed[0])
+                yield i
+
+        def slow_sink(item):
+            time.sleep(0.005)
+            consumed[0] += 1
+
+        queue_size = 2
+        StagePipeline(source=source(), stages=[lambda x: x], sinks=[slow_sink], queue_size=queue_size).run()
+        # 两个队列各 queue_size 块，加上数据源、处理阶段、写入端各持有一块
+        self.assertLessEqual(max(lead), 2 * queue_size + 3)
+        self.assertEqual(consumed[0], 40)
+
+    def test_stage_error_stops_source_and_propagates(self):
+        pulled = [0]
+
+        def endless():
+            while True:
+                pulled[0] += 1
+                yield pulled[0]
+
+        def failing(item):
+            if item == 5:
+                raise ValueError("bad chunk")
+            return item
+
+        with self.assertRaisesRegex(ValueError, "bad chunk"):
+            StagePipeline(source=endless(), stages=[failing], sinks=[lambda item: None], queue_size=2).run()
+        self.assertLess(pulled[0], 50)
+
+    def test_requires_sink(self):
+        with self.assertRaises(ValueError):
+            StagePipeline(source=[], sinks=[])
+
+
+class FakeConnector:
+    instances = []
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.closed = False
+        self.inserted = {'item': 0, 'price': 0}
+        FakeConnector.instances.append(self)
+
+    def insert_columns(self, table, columns):
+        if self.fail:
+            raise RuntimeError("insert failed")
+        self.inserted[table] += len(next(iter(columns.values())))
+
+    def close(self):
+        self.closed = True
+
+
+class TestGeneratorStreamLoader(unittest.TestCase):
+    def setUp(self):
+        FakeConnector.instances = []
+        self.products = [Product(i, 100 + i % 3, f'p{i}', 1.0, 10.0 + i) for i in range(30)]
+
+    def test_streams_all_days(self):
+        loader = GeneratorStreamLoader(FakeConnector(), block_rows=50, inserters=3)
+        with mock.patch('processing.generator_stream.ClickHouseConnector', FakeConnector):
+            stats = loader.run(self.products, start_date=datetime(2025, 1, 1), days=10)
+
+        self.assertEqual(stats['days'], 10)
+        self.assertEqual(sum(c.inserted['price'] for c in FakeConnector.instances), stats['rows'])
+        self.assertEqual(sum(c.inserted['item'] for c in FakeConnector.instances), stats['items'])
+        # 调用方传入的连接不由 run 关闭，额外创建的连接全部关闭
+        self.assertFalse(FakeConnector.instances[0].closed)
+        self.assertTrue(all(c.closed for c in FakeConnector.instances[1:]))
+
+    def test_extra_connectors_closed_on_failure(self):
+        loader = GeneratorStreamLoader(FakeConnector(fail=True), block_rows=10, inserters=3)
+        with mock.patch('processing.generator_stream.ClickHouseConnector', FakeConnector):
+            with self.assertRaisesRegex(RuntimeError, "insert failed"):
+                loader.run(self.products, start_date=datetime(2025, 1, 1), days=10)
+
+        self.assertEqual(len(FakeConnector.instances), 3)
+        self.assertTrue(all(c.closed for c in FakeConnector.instances[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from processing.id_dictionary import ItemIdDictionary
+from processing.transformer import DataTransformer
+
+
+def snapshot(rows):
+    """[(date, item_id, price)] → transform_price_data 的输入"""
+    return pd.DataFrame(rows, columns=['date', 'item_id', 'price'])
+
+
+def state_after(events: pd.DataFrame, key: str) -> pd.DataFrame:
+    """变更日志中各商品最后一条记录，模拟从 price_change 读回的状态"""
+    return events.sort_values('effective_date', kind='stable').drop_duplicates(key, keep='last')[[key, 'price']]
+
+
+class TestChangeLog(unittest.TestCase):
+    def setUp(self):
+        self.day1 = snapshot([
+            ('2025-06-01', 'a', 10.0), ('2025-06-01', 'b', 20.0), ('2025-06-01', 'c', 5.0),
+            ('2025-06-02', 'a', 10.0), ('2025-06-02', 'b', 21.0), ('2025-06-02', 'c', 5.0),
+        ])
+        # 第二批：a 不变、b 变价、c 出样、d 入样
+        self.day2 = snapshot([
+            ('2025-06-03', 'a', 10.0), ('2025-06-03', 'b', 22.0), ('2025-06-03', 'd', 7.0),
+            ('2025-06-04', 'a', 10.0), ('2025-06-04', 'b', 22.0), ('2025-06-04', 'd', 7.0),
+        ])
+
+    def events(self, df):
+        return [
+            (row.effective_date, row.item_id, None if np.isnan(row.price) else row.price)
+            for row in df.itertuples()
+        ]
+
+    def test_single_batch(self):
+        transformer = DataTransformer()
+        events = transformer.to_change_log(transformer.transform_price_data(self.day1))
+        self.assertEqual(self.events(events), [
+            (date(2025, 6, 1), 'A', 10.0), (date(2025, 6, 1), 'B', 20.0), (date(2025, 6, 1), 'C', 5.0),
+            (date(2025, 6, 2), 'B', 21.0),
+        ])
+
+    def test_second_batch_compares_with_previous_state(self):
+        transformer = DataTransformer()
+        first = transformer.to_change_log(transformer.transform_price_data(self.day1))
+        # price_change 以 Float32 保存
+        state = state_after(first, 'item_id').astype({'price': 'float32'})
+
+        second = transformer.to_change_log(transformer.transform_price_data(self.day2), previous_state=state)
+        self.assertEqual(self.events(second), [
+            (date(2025, 6, 3), 'B', 22.0), (date(2025, 6, 3), 'C', None), (date(2025, 6, 3), 'D', 7.0),
+        ])
+
+        # 出样后的状态为 NaN，再次出现时记为入样，不再重复记出样
+        state = state_after(pd.concat([first, second]), 'item_id')
+        third = transformer.to_change_log(
+            transformer.transform_price_data(snapshot([
+                ('2025-06-05', 'a', 10.0), ('2025-06-05', 'b', 22.0), ('2025-06-05', 'c', 5.0),
+            ])),
+            previous_state=state
+        )
+        self.assertEqual(self.events(third), [(date(2025, 6, 5), 'C', 5.0), (date(2025, 6, 5), 'D', None)])
+
+    def test_keyed_departure_outside_batch(self):
+        transformer = DataTransformer(id_dict=ItemIdDictionary())
+        first = transformer.to_change_log(transformer.transform_price_data(self.day1))
+        second = transformer.to_change_log(
+            transformer.transform_price_data(self.day2), previous_state=state_after(first, 'item_key')
+        )
+        departed = second[second['price'].isna()]
+        self.assertEqual(departed['item_id'].tolist(), ['C'])
+        self.assertEqual(departed['item_key'].tolist(), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 from datetime import datetime, timedelta
 from unittest import TestCase
@@ -60,5 +61,36 @@ class TestPriceAdjustment(TestCase):
         self.assertGreaterEqual(total_changes, 0, "应至少发生 0 次价格变化（随机允许）")
 
 
+class TestPriceChanges(TestCase):
+    def test_changes_replay_to_daily_snapshots(self):
+        """按日期回放变更日志应还原出每日样本（同一商品取第一条）"""
+        products = [
+            Product(product_id=i, category_id=100 + i % 3, name=f"P{i}", weight=1.0, price=10.0 + i)
+            for i in range(60)
+        ]
+        start_date = datetime(2024, 1, 1)
+
+        random.seed(7)
+        snapshots = []
+        for _, current_products in PriceGenerator(products).iter_days(start_date, 30):
+            snapshot = {}
+            for p in current_products:
+                snapshot.setdefault(p.product_id, p.price)
+            snapshots.append(snapshot)
+
+        random.seed(7)
+        state, total_changes = {}, 0
+        for day, (_, changes) in enumerate(PriceGenerator(products).iter_changes(start_date, 30)):
+            for product_id, price in changes:
+                if price is None:
+                    state.pop(product_id)
+                else:
+                    state[product_id] = price
+            total_changes += len(changes)
+            self.assertEqual(state, snapshots[day], f"第 {day + 1} 天回放结果不一致")
+
+        self.assertLess(total_changes, sum(len(snapshot) for snapshot in snapshots))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,6 @@
 import unittest
 import csv
 import tempfile
-from typing import Set
 from src.data_generator.product_generator import *
 
 class TestProductGenerator(unittest.TestCase):
@@ -15,31 +14,11 @@ class TestProductGenerator(unittest.TestCase):
         self.assertIsInstance(categories[0], Category)
         self.assertEqual(categories[1].category_name, "粮食")
 
-    def test_generate_unique_product_id(self):
-        """测试唯一ID生成"""
-        existing: Set[int] = {123456789012}
-        new_id = generate_unique_product_id(existing)
-        self.assertNotIn(new_id, existing)
-        self.assertTrue(100000000000 <= new_id <= 999999999999)
-
     def test_product_name_generation(self):
         """测试商品名称生成逻辑"""
         name = generate_product_name("Electronics", 5)
         self.assertEqual(name, "Electronics_5")
 
-    def test_price_generation(self):
-        """测试价格波动范围"""
-        base = 100.0
-        price = generate_initial_price(base)
-        self.assertTrue(70.0 <= price <= 130.0)
-        self.assertEqual(len(str(price).split('.')[1]), 2)  # 验证小数点后两位
-
-    def test_weight_generation(self):
-        """测试重量生成范围"""
-        weight = generate_weight()
-        self.assertTrue(0.1 <= weight <= 1.0)
-        self.assertEqual(len(str(weight).split('.')[1]), 6)  # 验证小数点后六位
-
     def test_product_pool_generation(self):
         """测试完整商品池生成"""
         categories = load_leaf_categories()
@@ -54,6 +33,70 @@ class TestProductGenerator(unittest.TestCase):
             category_counts[p.category_id] += 1
         self.assertTrue(all(20 <= count <= 80 for count in category_counts.values()))
 
+    def test_product_columns_generation(self):
+        """测试列式商品池生成"""
+        categories = [Category(30, "苹果"), Category(10, "粮食"), Category(20, "蔬菜")]
+        columns = build_product_columns(categories, 10, seed=0)
+
+        self.assertEqual(len(columns.product_id), 10)
+        self.assertEqual(len(set(columns.product_id.tolist())), 10)
+        # 前 remainder 个类别多分一个商品，输出按 category_id 排序
+        self.assertEqual(columns.category_id.tolist(), [10] * 3 + [20] * 3 + [30] * 4)
+        self.assertEqual(columns.name_index.tolist(), [1, 2, 3, 1, 2, 3, 1, 2, 3, 4])
+        # 同类 weight 之和为 1
+        for cat_id in (10, 20, 30):
+            total = columns.weight[columns.category_id == cat_id].sum()
+            self.assertAlmostEqual(total, 1.0, places=5)
+
+    def test_product_columns_price_and_weight(self):
+        """测试列式商品池的价格在类别基准价 ±30% 内且保留两位小数，weight 保留六位小数"""
+        categories = [Category(2, "蔬菜"), Category(1, "粮食"), Category(3, "水果")]
+        columns = build_product_columns(categories, 300, seed=5)
+
+        # 按 build_product_columns 的抽样顺序重放同一 seed：先抽商品 ID，再抽每个类别的基准价
+        rng = np.random.default_rng(5)
+        rng.choice(900000000000, size=300, replace=False)
+        base_prices = dict(zip([1, 2, 3], rng.uniform(10, 1000, size=3)))
+        base = np.array([base_prices[c] for c in columns.category_id.tolist()])
+
+        # 价格四舍五入到分，边界放宽半分
+        self.assertTrue(np.all(columns.price >= base * 0.7 - 0.005))
+        self.assertTrue(np.all(columns.price <= base * 1.3 + 0.005))
+        np.testing.assert_array_equal(columns.price, np.round(columns.price, 2))
+        np.testing.assert_array_equal(columns.weight, np.round(columns.weight, 6))
+        self.assertTrue(np.all(columns.weight > 0))
+
+    def test_product_pool_seed(self):
+        """测试商品池可由 seed 或 random.seed 复现"""
+        categories = [Category(1, "粮食"), Category(2, "蔬菜")]
+        self.assertEqual(generate_product_pool(categories, 6, seed=3),
+                         generate_product_pool(categories, 6, seed=3))
+
+        random.seed(7)
+        first = generate_product_pool(categories, 6)
+        random.seed(7)
+        self.assertEqual(generate_product_pool(categories, 6), first)
+
+    def test_product_columns_replace(self):
+        """测试列式商品池保留 NamedTuple 的 _replace"""
+        columns = build_product_columns([Category(1, "粮食")], 3, seed=0)
+        replaced = columns._replace(price=columns.price * 2)
+        self.assertEqual(replaced.price.tolist(), (columns.price * 2).tolist())
+
+    def test_product_columns_output(self):
+        """测试列式商品池输出为 Product 与 DataFrame"""
+        categories = [Category(1, "粮食"), Category(2, "蔬菜")]
+        columns = build_product_columns(categories, 4, seed=1)
+
+        products = columns_to_products(columns)
+        self.assertIsInstance(products[0], Product)
+        self.assertEqual([p.name for p in products], ["粮食_1", "粮食_2", "蔬菜_1", "蔬菜_2"])
+
+        df = columns_to_dataframe(columns)
+        self.assertEqual(list(df.columns), ["product_id", "category_id", "name", "weight", "price", "change_count"])
+        self.assertEqual(df["name"].tolist(), [p.name for p in products])
+        self.assertEqual(df["price"].tolist(), [p.price for p in products])
+
     def test_csv_writing(self):
         """测试CSV写入功能"""
         test_products = [